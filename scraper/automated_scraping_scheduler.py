@@ -1,4 +1,4 @@
-import schedule
+import asyncio
 import time
 import logging
 import json
@@ -15,6 +15,8 @@ except ImportError:
 import sys
 import traceback
 
+from command.job_scheduler import JobScheduler, ScheduledJob
+
 # Import our scrapers
 from expanded_city_scraper import ExpandedCityPropertyScraper
 from practical_property_scraper import PracticalPropertyScraper
@@ -58,12 +60,25 @@ class AutomatedScrapingScheduler:
             'thresholds': {
                 'min_properties_per_run': 10,
                 'max_failures_per_day': 3
+            },
+            'scheduler': {
+                'state_file': 'scheduler_state.json',
+                'jitter_seconds': 120,      # Start each run up to 2 minutes late
+                'catch_up_hours': 6,        # Make up runs missed this recently while down
+                'timeout_minutes': {
+                    'morning_scrape': 60,
+                    'afternoon_scrape': 180,
+                    'evening_scrape': 30
+                }
             }
         }
         
         if os.path.exists(self.config_file):
             with open(self.config_file, 'r', encoding='utf-8') as f:
                 self.config = json.load(f)
+            # Older config files lack newer sections
+            for section, values in default_config.items():
+                self.config.setdefault(section, values)
         else:
             self.config = default_config
             self.save_config()
@@ -300,15 +315,29 @@ Property Scraper Bot
     def setup_schedules(self):
         """Setup automated scraping schedules"""
         schedules = self.config['schedules']
+        options = self.config['scheduler']
+        timeouts = options.get('timeout_minutes', {})
+        catch_up = options.get('catch_up_hours')
+        
+        self.scheduler = JobScheduler(options.get('state_file', 'scheduler_state.json'), alert=self.send_alert)
         
-        # Schedule morning scrape
-        schedule.every().day.at(schedules['morning_scrape']).do(self.daily_morning_scrape)
+        def add_job(name, func, conflicts=()):
+            timeout = timeouts.get(name)
+            self.scheduler.add_job(ScheduledJob(
+                name, func, at=schedules[name],
+                conflicts=conflicts,
+                jitter=options.get('jitter_seconds', 0),
+                timeout=timeout * 60 if timeout else None,
+                catch_up=catch_up * 3600 if catch_up is not None else None
+            ))
         
-        # Schedule afternoon scrape
-        schedule.every().day.at(schedules['afternoon_scrape']).do(self.daily_afternoon_scrape)
+        # Morning and afternoon use different scrapers and may overlap
+        add_job('morning_scrape', self.daily_morning_scrape)
+        add_job('afternoon_scrape', self.daily_afternoon_scrape)
         
-        # Schedule evening validation
-        schedule.every().day.at(schedules['evening_scrape']).do(self.daily_evening_scrape)
+        # Evening validation reads both scrapes' files, so it waits for them
+        add_job('evening_scrape', self.daily_evening_scrape,
+                conflicts=('morning_scrape', 'afternoon_scrape'))
         
         self.logger.info("📅 Automated schedules configured:")
         self.logger.info(f"   Morning scrape: {schedules['morning_scrape']}")
@@ -321,9 +350,7 @@ Property Scraper Bot
         self.setup_schedules()
         
         try:
-            while True:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
+            asyncio.run(self.scheduler.run())
                 
         except KeyboardInterrupt:
             self.logger.info("🛑 Scheduler stopped by user")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Block Detection Benchmark
+Compares the old per-middleware check (decode and lowercase the whole body,
+then one substring scan per keyword) with the shared prefix scan in
+utils/block_detector.py.
+
+Usage:
+    python benchmark_block_detector.py saved_pages/*.html
+    python benchmark_block_detector.py            # synthetic list page
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_lianjia_extraction import build_sample_page
+from utils.block_detector import block_reason
+
+OLD_KEYWORDS = [
+    'access denied', 'forbidden', 'captcha', '验证码',
+    '人机验证', 'robot', 'blocked', 'temporarily unavailable',
+    'service unavailable', 'too many requests', 'verification required'
+]
+
+
+def old_is_blocked(response):
+    """The previous SimpleAntiBot.is_blocked, kept here as the reference"""
+    if response.status in [403, 429, 503]:
+        return True
+    if response.status != 200:
+        return False
+    content = response.body.decode('utf-8', errors='ignore').lower()
+    return any(keyword in content for keyword in OLD_KEYWORDS)
+
+
+def time_per_response(func, response, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(response)
+    return (time.perf_counter() - start) / rounds
+
+
+def run_benchmark(pages, rounds=200):
+    print("⏱️  Block detection benchmark")
+    print("=" * 60)
+
+    total_old = total_new = 0.0
+    for name, body in pages:
+        response = SimpleNamespace(status=200, body=body, headers={'Content-Type': b'text/html; charset=utf-8'})
+        old_time = time_per_response(old_is_blocked, response, rounds)
+        new_time = time_per_response(block_reason, response, rounds)
+        total_old += old_time
+        total_new += new_time
+
+        print(f"\n📄 {name}: {len(body) // 1024} KB, old={old_is_blocked(response)} new={block_reason(response)}")
+        print(f"   Lowercase + keyword scans: {old_time * 1e6:8.1f} µs/response")
+        print(f"   Marker scan over prefix:   {new_time * 1e6:8.1f} µs/response")
+        print(f"   Speedup:                   {old_time / max(new_time, 1e-9):8.1f}x")
+
+    print(f"\n📊 Overall speedup: {total_old / max(total_new, 1e-9):.1f}x across {len(pages)} page(s)")
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:]
+    if paths:
+        pages = [(Path(p).name, Path(p).read_bytes()) for p in paths]
+    else:
+        pages = [("synthetic (30 listings)", build_sample_page()),
+                 ("synthetic (300 listings)", build_sample_page(listings=300))]
+    run_benchmark(pages)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Lianjia Extraction Benchmark
+Compares the old BeautifulSoup(html.parser) listing extraction with the
+shared lxml/parsel engine in utils/lianjia_extraction.py.
+
+Usage:
+    python benchmark_lianjia_extraction.py saved_pages/*.html
+    python benchmark_lianjia_extraction.py            # synthetic 30-listing page
+"""
+
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bs4 import BeautifulSoup
+from utils.lianjia_extraction import extract_listings
+
+
+def build_sample_page(listings=30):
+    """Synthetic list page with Lianjia's sellListContent markup"""
+    items = []
+    for i in range(listings):
+        items.append(f"""
+        <li class="clear LOGCLICKDATA">
+          <a class="noresultRecommend img" href="https://bj.lianjia.com/ershoufang/1011{i:05d}.html"><img src="x.jpg"></a>
+          <div class="info clear">
+            <div class="title"><a href="https://bj.lianjia.com/ershoufang/1011{i:05d}.html">南北通透 精装两居 {i}</a></div>
+            <div class="flood"><div class="positionInfo"><a href="/xiaoqu/{i}/">马连洼小区{i}</a> - <a href="/ershoufang/malianwa/">马连洼</a></div></div>
+            <div class="address"><div class="houseInfo">2室1厅 | {60 + i}.5平米 | 南 北 | 中楼层(共6层) | 1998年建 | 板楼</div></div>
+            <div class="followInfo">12人关注 / 1个月以前发布</div>
+            <div class="priceInfo">
+              <div class="totalPrice totalPrice2"><span>{300 + i}</span><i>万</i></div>
+              <div class="unitPrice"><span>{45000 + i}元/平</span></div>
+            </div>
+          </div>
+        </li>""")
+    return f"""<html><head><title>北京二手房</title></head><body>
+    <ul class="sellListContent" log-mod="list">{''.join(items)}</ul>
+    <div class="page-box fr"><div class="page-box house-lst-page-box" page-data='{{"totalPage":100,"curPage":1}}'></div></div>
+    </body></html>""".encode('utf-8')
+
+
+def extract_with_beautifulsoup(body):
+    """The previous spider code path, kept here as the reference implementation"""
+    soup = BeautifulSoup(body, 'html.parser')
+    house_list = soup.find('ul', {'class': 'sellListContent'})
+    results = []
+    if not house_list:
+        return results
+    for house in house_list.find_all('li'):
+        info = house.find("div", {'class': 'info'})
+        if not info:
+            results.append(None)
+            continue
+        house_title = info.find("div", {'class': 'title'})
+        if not house_title or not house_title.a:
+            results.append(None)
+            continue
+        href = house_title.a.get('href', '')
+        match = re.search(r'/(\d+)\.html', href)
+        flood = info.find("div", {'class': 'flood'})
+        location = ''
+        if flood and flood.div and flood.div.a:
+            location = flood.div.a.get_text(strip=True)
+        address = info.find("div", {'class': 'address'})
+        total_price = 0
+        price_info = info.find("div", {'class': 'priceInfo'})
+        if price_info:
+            total_div = price_info.find("div", {'class': 'totalPrice'})
+            if total_div and total_div.span:
+                price_clean = re.sub(r'[^\d万.]', '', total_div.span.get_text(strip=True))
+                if '万' in price_clean:
+                    total_price = int(float(price_clean.replace('万', '')) * 10000)
+                else:
+                    total_price = int(float(price_clean))
+        results.append({
+            'house_id': int(match.group(1)) if match else 0,
+            'title': house_title.a.get_text(strip=True),
+            'location': location,
+            'address_parts': [p.strip() for p in address.get_text(strip=True).split('|')] if address else [],
+            'total_price': total_price,
+        })
+    return results
+
+
+def extract_with_lxml(body):
+    # Parsing the raw body is part of the measured cost so the comparison stays fair
+    return extract_listings(body)
+
+
+def time_per_page(func, body, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(body)
+    return (time.perf_counter() - start) / rounds
+
+
+def run_benchmark(pages, rounds=20):
+    print("⏱️  Lianjia extraction benchmark")
+    print("=" * 60)
+
+    total_bs4 = total_lxml = 0.0
+    for name, body in pages:
+        reference = extract_with_beautifulsoup(body)
+        current = extract_with_lxml(body)
+        keys = ('house_id', 'title', 'location', 'address_parts', 'total_price')
+        same = [r and {k: r[k] for k in keys} for r in reference] == [c and {k: c[k] for k in keys} for c in current]
+
+        bs4_time = time_per_page(extract_with_beautifulsoup, body, rounds)
+        lxml_time = time_per_page(extract_with_lxml, body, rounds)
+        total_bs4 += bs4_time
+        total_lxml += lxml_time
+
+        print(f"\n📄 {name}: {len(current)} listings, outputs {'match ✅' if same else 'DIFFER ❌'}")
+        print(f"   BeautifulSoup: {bs4_time * 1000:8.2f} ms/page")
+        print(f"   lxml/parsel:   {lxml_time * 1000:8.2f} ms/page")
+        print(f"   Speedup:       {bs4_time / max(lxml_time, 1e-9):8.1f}x")
+
+    print(f"\n📊 Overall speedup: {total_bs4 / max(total_lxml, 1e-9):.1f}x across {len(pages)} page(s)")
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:]
+    if paths:
+        pages = [(Path(p).name, Path(p).read_bytes()) for p in paths]
+    else:
+        pages = [("synthetic (30 listings)", build_sample_page())]
+    run_benchmark(pages)
@@ -1,20 +1,57 @@
 #!/usr/bin/env python3
 """
 Combined Daily Scraper for both House and Store properties
-Runs both spiders automatically for comprehensive data collection
+Runs both spiders side by side for comprehensive data collection
 """
 
 import os
 import sys
-import subprocess
 import json
 from datetime import datetime, timedelta
-import time
+from pathlib import Path
 
-def run_spider(spider_name, mode="daily", delay_between=300):
-    """Run a spider with proper anti-bot protection"""
-    print(f"\n🕷️  Starting {spider_name} spider...")
-    
+from command.spider_runner import SpiderJob, SpiderRunner, shared_host_groups
+from utils.config_loader import config_hosts
+
+CONFIG_DIR = Path(__file__).parent / "config"
+
+SPIDERS = ["house_spider", "store_spider"]
+
+def spider_hosts(runner, spider_name):
+    """Hosts a spider crawls, from the site configs it declares"""
+    spidercls = runner.spider_loader.load(spider_name)
+    hosts = set()
+    for config_file in getattr(spidercls, "config_files", ()):
+        try:
+            hosts |= config_hosts(CONFIG_DIR / config_file)
+        except Exception as e:
+            print(f"⚠️  Could not read {config_file} for {spider_name}: {e}")
+    return hosts
+
+def spider_job(spider_name, mode, output_dir, timestamp, group=None):
+    """Spider job with proper anti-bot protection"""
+    spider_type = spider_name.replace("_spider", "")
+    return SpiderJob(
+        spider_name,
+        spider_kwargs={"mode": mode},
+        settings={
+            # Fast operation settings optimized for ScraperAPI
+            # (concurrency and delays adapt per domain, see settings.py)
+            "RETRY_TIMES": 3,       # Reduced retries for faster operation
+            "DOWNLOAD_TIMEOUT": 15, # Reduced timeout for faster response
+        },
+        output=f"{output_dir}/{spider_type}_{timestamp}.json",
+        timeout=90,  # Reduced timeout for faster feedback
+        group=group,
+    )
+
+def run_spiders(spider_names, mode="daily"):
+    """
+    Run spiders side by side in this process. Politeness is per site:
+    each spider paces its own hosts (see settings.py), and spiders whose
+    configs share a host run one after another instead of doubling the
+    load on it. No fixed sleeps between spiders.
+    """
     # Create output directory
     today = datetime.now().strftime("%Y-%m-%d")
     output_dir = f"daily_output/{today}"
@@ -22,62 +59,47 @@ def run_spider(spider_name, mode="daily", delay_between=300):
     
     # Generate timestamped filenames
     timestamp = datetime.now().strftime("%H-%M-%S")
-    spider_type = spider_name.replace("_spider", "")
-    json_file = f"{output_dir}/{spider_type}_{timestamp}.json"
-    log_file = f"{output_dir}/{spider_type}_{timestamp}.log"
-    
-    # Build scrapy command with anti-bot protection
-    cmd = [
-        sys.executable, "-m", "scrapy", "crawl", spider_name,
-        "-a", f"mode={mode}",
-        "-L", "INFO",
-        "-o", json_file,
-        "--logfile", log_file,
-        # Fast operation settings optimized for ScraperAPI
-        "-s", "DOWNLOAD_DELAY=0",  # Let anti-bot middleware handle delays
-        "-s", "CONCURRENT_REQUESTS=1",
-        "-s", "AUTOTHROTTLE_ENABLED=True",
-        "-s", "AUTOTHROTTLE_TARGET_CONCURRENCY=0.5",
-        "-s", "RETRY_TIMES=3",      # Reduced retries for faster operation
-        "-s", "DOWNLOAD_TIMEOUT=15" # Reduced timeout for faster response
-    ]
-    
-    print(f"🚀 Command: {' '.join(cmd)}")
+    log_file = f"{output_dir}/combined_{timestamp}.log"
     
     try:
-        # Run the spider with reduced timeout for faster feedback
-        result = subprocess.run(cmd, capture_output=True, text=True, cwd=os.getcwd(), timeout=90)
-        
-        if result.returncode == 0:
-            print(f"✅ {spider_name} completed successfully!")
-            
-            # Check if data was scraped
-            if os.path.exists(json_file):
-                try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        content = f.read().strip()
-                        if content and content != "[]":
-                            data = json.loads(content)
-                            print(f"📊 {spider_name} found: {len(data)} items")
-                        else:
-                            print(f"ℹ️  {spider_name}: No new items found (normal for daily mode)")
-                except Exception as e:
-                    print(f"⚠️  Could not parse {spider_name} output: {e}")
-            
-            return True
-        else:
-            print(f"❌ {spider_name} failed!")
-            print(f"Error: {result.stderr}")
-            return False
-            
+        runner = SpiderRunner(log_file=log_file)
+        groups = shared_host_groups({name: spider_hosts(runner, name) for name in spider_names})
+        jobs = [spider_job(name, mode, output_dir, timestamp, group=groups[name]) for name in spider_names]
     except Exception as e:
-        print(f"💥 Error running {spider_name}: {e}")
+        print(f"💥 Error preparing {', '.join(spider_names)}: {e}")
+        return {name: False for name in spider_names}
+    
+    for group in sorted(set(groups.values())):
+        members = group.split("+")
+        if len(members) > 1:
+            print(f"🔗 Share a site, running one after another: {', '.join(members)}")
+    print(f"\n🕷️  Starting {', '.join(spider_names)} in-process (mode={mode})...")
+    
+    try:
+        results = runner.run(jobs)
+    except Exception as e:
+        print(f"💥 Error running {', '.join(spider_names)}: {e}")
+        return {name: False for name in spider_names}
+    
+    return {name: report_result(name, results[name]) for name in spider_names}
+
+def run_spider(spider_name, mode="daily"):
+    """Run a single spider with proper anti-bot protection"""
+    return run_spiders([spider_name], mode)[spider_name]
+
+def report_result(spider_name, result):
+    """Print one spider's outcome; True when it succeeded"""
+    if not result['success']:
+        print(f"❌ {spider_name} failed!")
+        print(f"Error: {result['error'] or result['finish_reason']}")
         return False
     
-    finally:
-        if delay_between > 0:
-            print(f"⏳ Waiting {delay_between} seconds before next spider...")
-            time.sleep(delay_between)
+    print(f"✅ {spider_name} completed successfully in {result['duration']:.0f}s!")
+    if result['items']:
+        print(f"📊 {spider_name} found: {result['items']} items")
+    else:
+        print(f"ℹ️  {spider_name}: No new items found (normal for daily mode)")
+    return True
 
 def cleanup_old_files():
     """Clean up files older than 7 days"""
@@ -147,18 +169,14 @@ def main():
     print(f"🕐 Time: {datetime.now().strftime('%H:%M:%S')}")
     print("🛡️  Anti-bot protection: ENABLED")
     print("💾 Database integration: ENABLED")
-    print("🕷️  Running: house_spider + store_spider")
-    
-    success_count = 0
-    total_spiders = 2
-    
-    # Run house spider first
-    if run_spider("house_spider", mode="daily", delay_between=60):  # Reduced from 300 to 60 seconds
-        success_count += 1
-    
-    # Run store spider second  
-    if run_spider("store_spider", mode="daily", delay_between=0):
-        success_count += 1
+    print(f"🕷️  Running: {' + '.join(SPIDERS)}")
+    
+    # Run all spiders together; wall time is set by the slowest site
+    started = datetime.now()
+    results = run_spiders(SPIDERS, mode="daily")
+    success_count = sum(results.values())
+    total_spiders = len(SPIDERS)
+    print(f"⏱️  Spiders finished in {(datetime.now() - started).total_seconds():.0f}s")
     
     # Show results
     show_daily_summary()
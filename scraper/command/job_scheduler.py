@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Asyncio job scheduler
+Runs daily and interval jobs as tasks, with overlap caps, jitter, timeouts
+and catch-up of runs missed while the scheduler was down
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+MAX_SLEEP = 60  # Re-read the clock at least this often (suspend, clock changes)
+
+
+class ScheduledJob:
+    """
+    func(*args, **kwargs) runs daily at each 'HH:MM' in `at`, or every
+    `every` seconds. Coroutine functions run on the event loop, plain
+    functions in a worker thread, so a long job never holds up the others.
+
+    max_instances caps overlapping runs of this job: a run that comes due
+    while the cap is reached is skipped. A job waits to start while any job
+    it conflicts with is running (either side may declare the conflict);
+    other jobs run alongside it. Each run starts up to `jitter` seconds late.
+
+    timeout cancels a coroutine job. A thread can't be cancelled, so a plain
+    job past its timeout is reported as timed out but keeps its instance
+    slot until it returns.
+
+    A run missed while the scheduler was down is made up once at start-up,
+    if it came due no more than catch_up seconds ago (None: any age).
+    """
+
+    def __init__(self, name, func, at=None, every=None, args=(), kwargs=None, max_instances=1,
+                 conflicts=(), jitter=0, timeout=None, catch_up=None):
+        if bool(at) == bool(every):
+            raise ValueError(f"Job {name} needs exactly one of `at` or `every`")
+        self.name = name
+        self.func = func
+        self.times = [at] if isinstance(at, str) else list(at or [])
+        self.every = every
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.max_instances = max_instances
+        self.conflicts = set(conflicts)
+        self.jitter = jitter
+        self.timeout = timeout
+        self.catch_up = catch_up
+
+    def next_run_after(self, moment):
+        """First time this job is due strictly after moment"""
+        if self.every:
+            return moment + timedelta(seconds=self.every)
+        candidates = []
+        for at in self.times:
+            hour, minute = (int(part) for part in at.split(':'))
+            due = moment.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if due <= moment:
+                due += timedelta(days=1)
+            candidates.append(due)
+        return min(candidates)
+
+
+class JobScheduler:
+    """
+    Runs ScheduledJobs until stop() is called. Each job's schedule is kept
+    by its own task, so runs start on time whatever else is running.
+
+    Per-job state (last due time handled, last start and finish, status,
+    run, failure and skip counts) is saved to state_file after every
+    change, so a restarted scheduler knows which runs it missed.
+
+        scheduler = JobScheduler()
+        scheduler.add_job(ScheduledJob('morning', scrape, at='08:00', timeout=3600))
+        asyncio.run(scheduler.run())
+    """
+
+    def __init__(self, state_file='scheduler_state.json', alert=None, clock=datetime.now):
+        self.logger = logging.getLogger(__name__)
+        self.state_path = Path(state_file)
+        self.alert = alert  # Called with a message when a run fails or times out
+        self.clock = clock
+        self.jobs = {}
+        self.running = {}   # job name -> tasks reserved for it (jittering, waiting or active)
+        self.active = {}    # job name -> runs actually executing
+        self.state = {}
+        self.changed = None
+        self.stopping = None
+        self.load_state()
+
+    def add_job(self, job):
+        self.jobs[job.name] = job
+        self.running[job.name] = set()
+        self.active[job.name] = 0
+        self.state.setdefault(job.name, {'runs': 0, 'failures': 0, 'skipped': 0})
+        return job
+
+    # State
+
+    def load_state(self):
+        if not self.state_path.exists():
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f).get('jobs', {})
+        except (OSError, ValueError):
+            self.state = {}
+
+    def save_state(self):
+        # Written aside and renamed, so a crash mid-write leaves the old state
+        temp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': self.state}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    def update_state(self, job, **values):
+        state = self.state[job.name]
+        for key, value in values.items():
+            if key in ('runs', 'failures', 'skipped'):
+                state[key] = state.get(key, 0) + value
+            else:
+                state[key] = value.isoformat() if isinstance(value, datetime) else value
+        self.save_state()
+
+    def first_due(self, job):
+        """When the job is next due: a missed run still worth making up, or the next one"""
+        now = self.clock()
+        last = self.state[job.name].get('last_scheduled')
+        if last:
+            missed = job.next_run_after(datetime.fromisoformat(last))
+            if missed <= now:
+                age = (now - missed).total_seconds()
+                if job.catch_up is None or age <= job.catch_up:
+                    self.logger.info(f"⏪ {job.name} missed its run at {missed:%Y-%m-%d %H:%M}, catching up")
+                    return missed
+                self.logger.info(f"⏭️  {job.name} missed its run at {missed:%Y-%m-%d %H:%M}, "
+                                 f"too old to catch up ({age / 3600:.1f}h)")
+        return job.next_run_after(now)
+
+    # Scheduling
+
+    async def run(self):
+        """Keep every job's schedule until stop(); running jobs are waited for"""
+        self.changed = asyncio.Condition()
+        self.stopping = asyncio.Event()
+        loops = [asyncio.create_task(self.job_loop(job)) for job in self.jobs.values()]
+        try:
+            await self.stopping.wait()
+        finally:
+            for loop in loops:
+                loop.cancel()
+            await asyncio.gather(*loops, return_exceptions=True)
+            running = [task for tasks in self.running.values() for task in tasks]
+            if running:
+                self.logger.info(f"⏳ Waiting for {len(running)} running job(s)")
+                await asyncio.wait(running)
+
+    def stop(self):
+        if self.stopping is not None:
+            self.stopping.set()
+
+    async def job_loop(self, job):
+        due = self.first_due(job)
+        self.logger.info(f"📅 {job.name}: next run {due:%Y-%m-%d %H:%M:%S}")
+        while True:
+            await self.sleep_until(due)
+            self.launch(job, due)
+            due = job.next_run_after(max(due, self.clock()))
+
+    async def sleep_until(self, due):
+        while True:
+            remaining = (due - self.clock()).total_seconds()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, MAX_SLEEP))
+
+    def launch(self, job, due):
+        running = self.running[job.name]
+        if len(running) >= job.max_instances:
+            self.logger.warning(f"⏭️  {job.name} due at {due:%H:%M:%S} skipped: "
+                                f"{len(running)} run(s) still going")
+            self.update_state(job, last_scheduled=due, last_status='skipped', skipped=1)
+            return
+        task = asyncio.create_task(self.run_job(job))
+        running.add(task)
+        task.add_done_callback(running.discard)
+        self.update_state(job, last_scheduled=due)
+
+    def conflicting(self, job):
+        return [name for name, count in self.active.items() if count and name != job.name
+                and (name in job.conflicts or job.name in self.jobs[name].conflicts)]
+
+    # Runs
+
+    async def run_job(self, job):
+        if job.jitter:
+            await asyncio.sleep(random.uniform(0, job.jitter))
+
+        async with self.changed:
+            if self.conflicting(job):
+                self.logger.info(f"⏸️  {job.name} waiting for {', '.join(self.conflicting(job))}")
+                await self.changed.wait_for(lambda: not self.conflicting(job))
+            self.active[job.name] += 1
+
+        started = time.time()
+        self.logger.info(f"▶️  Starting {job.name}")
+        self.update_state(job, last_started=datetime.now(), last_status='running')
+        try:
+            status, error = await self.execute(job)
+        finally:
+            async with self.changed:
+                self.active[job.name] -= 1
+                self.changed.notify_all()
+
+        duration = round(time.time() - started, 2)
+        self.update_state(job, last_finished=datetime.now(), last_status=status, last_error=error,
+                          last_duration=duration, runs=1, failures=int(status != 'success'))
+        if status == 'success':
+            self.logger.info(f"✅ {job.name} finished in {duration:.1f}s")
+        else:
+            self.logger.error(f"❌ {job.name} {status} after {duration:.1f}s: {error}")
+            if status == 'failed' and self.alert:
+                self.alert(f"Scheduled job {job.name} {status}: {error}")
+
+    async def execute(self, job):
+        """
+        Run the job once; (status, error). A job that reports a failure by
+        returning {'error': ...} instead of raising counts as failed too.
+        """
+        if inspect.iscoroutinefunction(job.func):
+            work = asyncio.ensure_future(job.func(*job.args, **job.kwargs))
+        else:
+            call = functools.partial(job.func, *job.args, **job.kwargs)
+            work = asyncio.get_running_loop().run_in_executor(None, call)
+
+        try:
+            # Shielded so a timeout only stops the wait; the job is dealt with below
+            result = await asyncio.wait_for(asyncio.shield(work), job.timeout)
+            if isinstance(result, dict) and result.get('error'):
+                return 'failed', str(result['error'])
+            return 'success', None
+        except asyncio.TimeoutError:
+            error = f"no result after {job.timeout}s"
+            # Alerted at the deadline, not when a stuck thread finally returns
+            if self.alert:
+                self.alert(f"Scheduled job {job.name} timed out: {error}")
+            if inspect.iscoroutinefunction(job.func):
+                work.cancel()
+            else:
+                self.logger.warning(f"⏰ {job.name} timed out; its thread can't be stopped, "
+                                    f"holding its slot until it returns")
+            await asyncio.wait([work])
+            return 'timeout', error
+        except Exception as e:
+            return 'failed', str(e) or e.__class__.__name__
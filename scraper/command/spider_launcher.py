@@ -1,18 +1,285 @@
+#!/usr/bin/env python3
+"""
+Registry-driven spider launcher
+Runs command/registry.yaml entries on a bounded pool of worker processes
+"""
+
+import argparse
+import json
+import os
+import signal
 import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
 import yaml
 
-def launch_spiders(registry_path):
-    with open(registry_path) as file:
+try:
+    import resource
+except ImportError:  # Windows: only the time limit can be enforced
+    resource = None
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+DEFAULT_WORKERS = 2
+DEFAULT_LIMITS = {
+    'timeout': 3600,       # Wall-clock seconds; the spider is closed gracefully at this point
+    'cpu_seconds': None,   # CPU seconds before the worker is stopped (RLIMIT_CPU)
+    'memory_mb': None,     # Address space cap for the worker (RLIMIT_AS)
+}
+KILL_GRACE = 60            # Seconds past the timeout before a worker is killed
+# Exit statuses of a worker stopped by RLIMIT_CPU
+CPU_LIMIT_EXITS = {-getattr(signal, name) for name in ('SIGXCPU', 'SIGKILL') if hasattr(signal, name)}
+POLL_INTERVAL = 0.5
+
+
+def parse_args(args):
+    """Split `scrapy crawl` style ['-a', 'k=v', '-s', 'K=V'] into spider kwargs and settings"""
+    spider_kwargs, settings = {}, {}
+    for flag, value in zip(args[::2], args[1::2]):
+        key, _, value = value.partition('=')
+        if flag == '-a':
+            spider_kwargs[key] = value
+        elif flag == '-s':
+            settings[key] = value
+    return spider_kwargs, settings
+
+
+def load_registry(registry_path):
+    """
+    Registry entries with their launch options filled in. Each entry may set
+    id (defaults to the spider name; needed when a spider is listed twice),
+    priority (higher starts first), after (ids that must succeed first) and
+    limits (overriding the registry-wide launcher.limits).
+    """
+    with open(registry_path, encoding='utf-8') as file:
         config = yaml.safe_load(file)
-        for spider in config['spiders']:
-            command = ['scrapy', 'crawl', spider['name'],
-                '-a', f"config={spider['config']}"
-            ]
-            if 'args' in spider:
-                command.extend(spider['args'])
-            
-            print(f"Launching spider: {spider['name']} with args: {spider.get('args', [])}")
-            subprocess.run(command)
+
+    launcher = config.get('launcher') or {}
+    default_limits = dict(DEFAULT_LIMITS, **(launcher.get('limits') or {}))
+
+    entries = []
+    for spider in config['spiders']:
+        spider_kwargs, settings = parse_args(spider.get('args', []))
+        if 'config' in spider:
+            spider_kwargs['config'] = spider['config']
+        entries.append({
+            'name': spider.get('id', spider['name']),
+            'spider': spider['name'],
+            'spider_kwargs': spider_kwargs,
+            'settings': settings,
+            'priority': spider.get('priority', 0),
+            'after': list(spider.get('after', [])),
+            'limits': dict(default_limits, **(spider.get('limits') or {})),
+        })
+    return entries, launcher.get('max_workers', DEFAULT_WORKERS)
+
+
+def limit_resources(limits):
+    """preexec_fn for a worker: CPU and memory rlimits (POSIX only)"""
+    if resource is None or os.name != 'posix':
+        return None
+
+    def apply():
+        if limits.get('cpu_seconds'):
+            cpu = int(limits['cpu_seconds'])
+            # SIGXCPU at the soft limit, SIGKILL a little later
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 5))
+        if limits.get('memory_mb'):
+            memory = int(limits['memory_mb']) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+    return apply
+
+
+def start_worker(entry, log_dir):
+    """Start one registry entry in its own process"""
+    fd, result_path = tempfile.mkstemp(prefix=f"{entry['name']}_", suffix='.json')
+    os.close(fd)
+    log_path = Path(log_dir) / f"{entry['name']}.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    job = {key: entry[key] for key in ('name', 'spider', 'spider_kwargs', 'settings')}
+    job['timeout'] = entry['limits'].get('timeout')
+
+    with open(log_path, 'ab') as log:
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--worker', json.dumps(job), '--result', result_path],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            preexec_fn=limit_resources(entry['limits']),
+        )
+    print(f"🚀 Launched {entry['name']} (pid {process.pid}, priority {entry['priority']})")
+    return {
+        'process': process,
+        'entry': entry,
+        'started': time.time(),
+        'started_at': datetime.now().isoformat(),
+        'result_path': result_path,
+        'log': str(log_path),
+        'killed': False,
+    }
+
+
+def finish_worker(worker):
+    """Summary record for a worker that has exited"""
+    process, entry = worker['process'], worker['entry']
+    result = {}
+    try:
+        with open(worker['result_path'], encoding='utf-8') as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        pass  # Worker died before writing a result
+    finally:
+        if os.path.exists(worker['result_path']):
+            os.remove(worker['result_path'])
+
+    exit_code = process.returncode
+    if worker['killed'] or result.get('finish_reason') == 'closespider_timeout':
+        status = 'timeout'
+    elif entry['limits'].get('cpu_seconds') and exit_code in CPU_LIMIT_EXITS:
+        status = 'cpu_limit'
+    elif exit_code == 0 and result.get('success'):
+        status = 'success'
+    else:
+        status = 'failed'
+
+    return {
+        'name': entry['name'],
+        'status': status,
+        'exit_code': exit_code,
+        'items': result.get('items', 0),
+        'finish_reason': result.get('finish_reason'),
+        'error': result.get('error') or (None if status == 'success' else f"exit code {exit_code}, see {worker['log']}"),
+        'duration': round(time.time() - worker['started'], 2),
+        'started_at': worker['started_at'],
+        'priority': entry['priority'],
+        'log': worker['log'],
+    }
+
+
+def skipped(entry, reason):
+    print(f"⏭️  Skipping {entry['name']}: {reason}")
+    return {'name': entry['name'], 'status': 'skipped', 'exit_code': None, 'items': 0,
+            'finish_reason': None, 'error': reason, 'duration': 0.0, 'started_at': None,
+            'priority': entry['priority'], 'log': None}
+
+
+def launch_spiders(registry_path, max_workers=None, summary_path=None, log_dir='logs/launcher'):
+    """
+    Run every registry entry in its own worker process, at most max_workers
+    at a time. Ready entries (all of their `after` entries succeeded) start
+    highest priority first; entries whose dependencies failed are skipped.
+    Each worker gets the entry's CPU and memory rlimits and is closed at its
+    timeout (killed KILL_GRACE seconds later if it hangs).
+
+    Returns the summary, one record per entry with status, exit code,
+    items and duration, and writes it as JSON to summary_path if given.
+    """
+    entries, registry_workers = load_registry(registry_path)
+    max_workers = max_workers or registry_workers
+    names = {entry['name'] for entry in entries}
+    # Stable sort: equal priorities keep registry order
+    pending = sorted(entries, key=lambda entry: -entry['priority'])
+    running = {}
+    results = {}
+    started = time.time()
+
+    print(f"🕷️ Launching {len(entries)} spiders, {max_workers} at a time")
+    while pending or running:
+        for entry in list(pending):
+            missing = [name for name in entry['after'] if name not in names]
+            failed = [name for name in entry['after']
+                      if name in results and results[name]['status'] != 'success']
+            if missing or failed:
+                pending.remove(entry)
+                reason = f"unknown dependency {missing}" if missing else f"dependency failed: {failed}"
+                results[entry['name']] = skipped(entry, reason)
+
+        for entry in list(pending):
+            if len(running) >= max_workers:
+                break
+            if all(name in results for name in entry['after']):
+                pending.remove(entry)
+                running[entry['name']] = start_worker(entry, log_dir)
+
+        if pending and not running:
+            # Nothing can start and nothing will finish: a dependency cycle
+            for entry in pending:
+                results[entry['name']] = skipped(entry, "dependency cycle")
+            pending = []
+
+        for name, worker in list(running.items()):
+            timeout = worker['entry']['limits'].get('timeout')
+            if worker['process'].poll() is None:
+                if timeout and time.time() - worker['started'] > timeout + KILL_GRACE:
+                    print(f"⏰ {name} still running {KILL_GRACE}s past its {timeout}s limit, killing it")
+                    worker['killed'] = True
+                    worker['process'].kill()
+                continue
+            result = finish_worker(worker)
+            del running[name]
+            results[name] = result
+            status = "✅" if result['status'] == 'success' else "❌"
+            print(f"{status} {name}: {result['status']}, {result['items']} items in {result['duration']:.1f}s")
+
+        if pending or running:
+            time.sleep(POLL_INTERVAL)
+
+    summary = {
+        'registry': str(registry_path),
+        'max_workers': max_workers,
+        'duration': round(time.time() - started, 2),
+        'succeeded': sum(result['status'] == 'success' for result in results.values()),
+        'failed': sum(result['status'] not in ('success', 'skipped') for result in results.values()),
+        'skipped': sum(result['status'] == 'skipped' for result in results.values()),
+        'spiders': [results[entry['name']] for entry in entries],
+    }
+    if summary_path:
+        Path(summary_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"💾 Summary saved to: {summary_path}")
+    return summary
+
+
+def run_worker(job_json, result_path):
+    """Worker process: run one job in-process and write its result for the launcher"""
+    from scrapy.utils.log import configure_logging
+    from command.spider_runner import SpiderJob, SpiderRunner
+
+    job = json.loads(job_json)
+    configure_logging({'LOG_LEVEL': job['settings'].get('LOG_LEVEL', 'INFO')})
+    spider_job = SpiderJob(job['spider'], name=job['name'], spider_kwargs=job['spider_kwargs'], timeout=job['timeout'])
+    # Registry settings apply to the whole worker, spider lookup included
+    result = SpiderRunner(settings=job['settings']).run([spider_job])[spider_job.name]
+    result.pop('stats', None)
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+    return 0 if result['success'] else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the spider registry on a bounded process pool')
+    parser.add_argument('registry', nargs='?', default='command/registry.yaml')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: launcher.max_workers)')
+    parser.add_argument('--summary', default=f"logs/launch_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                        help='Where to write the JSON summary')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args.worker, args.result)
+
+    summary = launch_spiders(args.registry, max_workers=args.workers, summary_path=args.summary)
+    print(f"📊 {summary['succeeded']} succeeded, {summary['failed']} failed, "
+          f"{summary['skipped']} skipped in {summary['duration']:.0f}s")
+    return 0 if summary['failed'] == 0 and summary['skipped'] == 0 else 1
+
 
 if __name__ == '__main__':
-    launch_spiders('command/registry.yaml')        
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+In-process spider runner
+Runs many spiders concurrently in one Twisted reactor and returns their stats
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Same project and import paths as `scrapy crawl` run from the scraper directory
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'scraper.settings')
+
+from scrapy import signals
+from scrapy.crawler import Crawler, CrawlerRunner
+from scrapy.spiderloader import get_spider_loader
+from scrapy.utils.log import configure_logging
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.reactor import install_reactor
+from twisted.internet.defer import DeferredList, DeferredLock, DeferredSemaphore, inlineCallbacks
+from twisted.internet.task import deferLater
+
+# Finish reasons that mean the spider did its job
+SUCCESS_REASONS = {'finished', 'closespider_itemcount', 'closespider_pagecount'}
+
+_reactor_thread = None
+_reactor_lock = threading.Lock()
+
+
+def shared_host_groups(hosts_by_job):
+    """
+    {job name: hosts it crawls} -> {job name: group}, where jobs that
+    reach the same host, directly or through another job, share a group
+    and so run one after another. Hosts are what Scrapy keys its
+    download slots (and so its politeness) by.
+    """
+    groups = {name: {name} for name in hosts_by_job}
+    owner = {}
+    for name, hosts in hosts_by_job.items():
+        for host in hosts:
+            other = owner.setdefault(host, name)
+            if groups[other] is not groups[name]:
+                merged = groups[other] | groups[name]
+                for member in merged:
+                    groups[member] = merged
+    return {name: '+'.join(sorted(members)) for name, members in groups.items()}
+
+
+def _start_reactor(settings):
+    """Start the process-wide reactor in a daemon thread, once"""
+    global _reactor_thread
+    with _reactor_lock:
+        if _reactor_thread is not None:
+            return
+        ready = threading.Event()
+
+        def serve():
+            if 'twisted.internet.reactor' not in sys.modules and settings.get('TWISTED_REACTOR'):
+                install_reactor(settings['TWISTED_REACTOR'], settings.get('ASYNCIO_EVENT_LOOP'))
+            from twisted.internet import reactor
+            reactor.callWhenRunning(ready.set)
+            reactor.run(installSignalHandlers=False)
+
+        _reactor_thread = threading.Thread(target=serve, name='spider-runner-reactor', daemon=True)
+        _reactor_thread.start()
+        ready.wait()
+
+
+class SpiderJob:
+    """
+    One spider run: the equivalent of
+    `scrapy crawl <spider> -a key=value -s KEY=VALUE -O <output>`.
+
+    timeout closes the spider gracefully after that many seconds
+    (CLOSESPIDER_TIMEOUT). A failed run is started again up to retries
+    times, retry_delay seconds apart. Jobs that share a group run one
+    after another; other jobs run alongside them.
+
+    on_item(job, count) is called on the reactor thread after every item
+    scraped, with the attempt's running item count, so progress can be
+    followed while the spider runs.
+    """
+
+    def __init__(self, spider, name=None, spider_kwargs=None, settings=None, output=None,
+                 timeout=None, retries=0, retry_delay=30, group=None, on_item=None):
+        self.spider = spider
+        self.name = name or (spider if isinstance(spider, str) else spider.name)
+        self.spider_kwargs = spider_kwargs or {}
+        self.settings = settings or {}
+        self.output = Path(output) if output else None
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.group = group
+        self.on_item = on_item
+
+
+class SpiderRunner:
+    """
+    Runs SpiderJobs in this process instead of one `scrapy crawl`
+    subprocess each, so interpreter start-up and the Scrapy, Selenium and
+    geopandas imports are paid once per process, and module-level pools
+    and caches are shared between spiders.
+
+    One reactor serves the whole process from a background thread (a
+    reactor can't be restarted), so run() can be called any number of
+    times, from plain code or, through run_async(), from asyncio.
+
+        runner = SpiderRunner()
+        results = runner.run([SpiderJob('house_spider', spider_kwargs={'mode': 'daily'},
+                                        output='houses.json')])
+        results['house_spider']['items']
+    """
+
+    def __init__(self, settings=None, max_concurrent=None, log_file=None, log_level='INFO'):
+        self.logger = logging.getLogger(__name__)
+        self.settings = get_project_settings()
+        self.settings.setdict(settings or {}, priority='cmdline')
+        self.spider_loader = get_spider_loader(self.settings)
+        self.max_concurrent = max_concurrent
+        if log_file:
+            self.settings.set('LOG_FILE', str(log_file), priority='cmdline')
+            self.settings.set('LOG_LEVEL', log_level, priority='cmdline')
+            configure_logging(self.settings)
+
+        _start_reactor(self.settings)
+        self.crawler_runner = None
+        self.semaphore = None
+        self.group_locks = {}
+
+    def run(self, jobs):
+        """Run jobs concurrently and block until all are done; {job name: result}"""
+        return self.submit(jobs).result()
+
+    async def run_async(self, jobs):
+        return await asyncio.wrap_future(self.submit(jobs))
+
+    def submit(self, jobs):
+        """Start jobs on the reactor thread; returns a concurrent.futures.Future"""
+        from twisted.internet import reactor
+        future = Future()
+        reactor.callFromThread(self._run_jobs, list(jobs), future)
+        return future
+
+    # Reactor thread from here on
+
+    def _run_jobs(self, jobs, future):
+        if self.crawler_runner is None:
+            self.crawler_runner = CrawlerRunner(self.settings)
+            if self.max_concurrent:
+                self.semaphore = DeferredSemaphore(self.max_concurrent)
+
+        self.logger.info(f"🕷️ Running {len(jobs)} spider job(s) in-process: "
+                         f"{', '.join(job.name for job in jobs)}")
+        finished = DeferredList([self._run_job(job) for job in jobs], consumeErrors=True)
+
+        def collect(outcomes):
+            results = {}
+            for job, (ok, result) in zip(jobs, outcomes):
+                results[job.name] = result if ok else self._result(job, None, 0, 0.0, str(result.value))
+            future.set_result(results)
+
+        finished.addCallback(collect)
+        finished.addErrback(lambda failure: future.set_exception(failure.value))
+
+    def _run_job(self, job):
+        if job.group is None:
+            return self._run_attempts(job)
+        lock = self.group_locks.setdefault(job.group, DeferredLock())
+        return lock.run(self._run_attempts, job)
+
+    @inlineCallbacks
+    def _run_attempts(self, job):
+        from twisted.internet import reactor
+
+        result = None
+        for attempt in range(1, job.retries + 2):
+            if attempt > 1:
+                self.logger.info(f"🔄 Retrying {job.name} in {job.retry_delay}s "
+                                 f"(attempt {attempt}/{job.retries + 1})")
+                yield deferLater(reactor, job.retry_delay, lambda: None)
+            if self.semaphore is not None:
+                result = yield self.semaphore.run(self._crawl, job, attempt)
+            else:
+                result = yield self._crawl(job, attempt)
+            if result['success']:
+                break
+        return result
+
+    @inlineCallbacks
+    def _crawl(self, job, attempt):
+        started = time.time()
+        crawler = None
+        follower = None
+        error = None
+        try:
+            crawler = self._create_crawler(job)
+            if job.on_item:
+                follower = self._follow_items(job, crawler)
+            yield self.crawler_runner.crawl(crawler, **job.spider_kwargs)
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+        finally:
+            if follower is not None:
+                crawler.signals.disconnect(follower, signal=signals.item_scraped)
+        result = self._result(job, crawler, attempt, time.time() - started, error)
+        status = "✅" if result['success'] else "❌"
+        self.logger.info(f"{status} {job.name}: {result['items']} items in {result['duration']:.1f}s "
+                         f"({result['finish_reason'] or result['error']})")
+        return result
+
+    def _follow_items(self, job, crawler):
+        count = 0
+
+        def item_scraped(item, response, spider):
+            nonlocal count
+            count += 1
+            try:
+                job.on_item(job, count)
+            except Exception as e:
+                self.logger.warning(f"⚠️ on_item callback for {job.name} failed: {e}")
+
+        # Held strongly (nothing else references the closure) until _crawl disconnects it
+        crawler.signals.connect(item_scraped, signal=signals.item_scraped, weak=False)
+        return item_scraped
+
+    def _create_crawler(self, job):
+        settings = self.settings.copy()
+        settings.setdict(job.settings, priority='cmdline')
+        if job.timeout:
+            settings.set('CLOSESPIDER_TIMEOUT', job.timeout, priority='cmdline')
+        if job.output:
+            job.output.parent.mkdir(parents=True, exist_ok=True)
+            feed_format = job.output.suffix.lstrip('.') or 'json'
+            # Overwrite, like -O: a retried attempt replaces the failed one's file
+            settings.set('FEEDS', {str(job.output): {'format': feed_format, 'overwrite': True}},
+                         priority='cmdline')
+        spidercls = job.spider
+        if isinstance(spidercls, str):
+            spidercls = self.spider_loader.load(spidercls)
+        return Crawler(spidercls, settings)
+
+    def _result(self, job, crawler, attempt, duration, error):
+        stats = {}
+        if crawler is not None:
+            try:
+                stats = crawler.stats.get_stats()
+            except RuntimeError:
+                pass  # The spider failed before the crawl started
+        stats = {key: value.isoformat() if isinstance(value, datetime) else value
+                 for key, value in stats.items()}
+        finish_reason = stats.get('finish_reason')
+        return {
+            'name': job.name,
+            'spider': job.spider if isinstance(job.spider, str) else job.spider.name,
+            'success': error is None and finish_reason in SUCCESS_REASONS,
+            'finish_reason': finish_reason,
+            'items': stats.get('item_scraped_count', 0),
+            'errors': stats.get('log_count/ERROR', 0),
+            'duration': round(duration, 2),
+            'attempts': attempt,
+            'output': str(job.output) if job.output else None,
+            'error': error,
+            'stats': stats,
+        }
@@ -5,13 +5,15 @@ Runs spider daily and manages output files with timestamps
 """
 import os
 import sys
-import subprocess
+import importlib.util
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
 import shutil
 import logging
-import time
+
+from command.spider_runner import SpiderJob, SpiderRunner
+from utils.jsonl import count_records, loads
 
 # Configure logging
 logging.basicConfig(
@@ -32,11 +34,8 @@ def validate_environment(enable_database=True):
         if not os.getenv('DATABASE_URL') and os.getenv('SCRAPER_MODE') != 'test':
             errors.append("DATABASE_URL environment variable not set")
     
-    # Check if scrapy is available
-    try:
-        subprocess.run([sys.executable, "-m", "scrapy", "--help"], 
-                      capture_output=True, check=True, timeout=10)
-    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+    # Check if scrapy is available (spiders run in this process)
+    if importlib.util.find_spec("scrapy") is None:
         errors.append("Scrapy is not available or not working")
     
     # Check if required directories can be created
@@ -84,7 +83,8 @@ def run_daily_scrape(mode="daily", enable_database=True, spider_name="house_spid
     
     # Define output files based on spider type
     spider_prefix = "houses" if spider_name == "house_spider" else "deals"
-    json_output = output_dir / f"{spider_prefix}_{time_str}{mode_suffix}.json"
+    # JSON Lines: counted and imported a line at a time, readable mid-crawl
+    json_output = output_dir / f"{spider_prefix}_{time_str}{mode_suffix}.jsonl"
     log_output = output_dir / f"scrape_{time_str}{mode_suffix}.log"
     
     logging.info(f"Output directory: {output_dir}")
@@ -93,100 +93,72 @@ def run_daily_scrape(mode="daily", enable_database=True, spider_name="house_spid
     logging.info(f"Monitoring mode: {mode}")
     logging.info(f"Database enabled: {enable_database}")
     
-    # Prepare scrapy command with enhanced anti-bot settings
-    cmd = [
-        sys.executable, "-m", "scrapy", "crawl", spider_name,
-        "-a", f"mode={mode}",  # Pass mode to spider
-        "-L", "INFO",
-        "-o", str(json_output),
-        "--logfile", str(log_output),
-        # Enhanced consistent anti-bot protection settings
-    "-s", "DOWNLOAD_DELAY=5",  # Conservative delay
-        "-s", "CONCURRENT_REQUESTS=1",
-        "-s", "AUTOTHROTTLE_ENABLED=True",
-        "-s", "AUTOTHROTTLE_TARGET_CONCURRENCY=0.3",
-        "-s", "RETRY_TIMES=5",  # Reasonable retry count
-    "-s", "DOWNLOAD_TIMEOUT=45"  # 45s per-request timeout
-    ]
+    # Spider settings on top of settings.py (concurrency and delays adapt per domain)
+    spider_settings = {
+        "RETRY_TIMES": 5,  # Reasonable retry count
+        "DOWNLOAD_TIMEOUT": 45,  # 45s per-request timeout
+    }
     
     # Conditionally disable pipelines for testing
     if not enable_database:
-        cmd.extend(["-s", "ITEM_PIPELINES={}"])
+        spider_settings["ITEM_PIPELINES"] = {}
         logging.warning("Database pipelines disabled for testing")
     
     # Add Chrome options for CI environments
     if os.getenv('CI') or os.getenv('GITHUB_ACTIONS'):
-        cmd.extend([
-            "-s", "SELENIUM_DRIVER_NAME=chrome",
-            "-s", "SELENIUM_DRIVER_ARGUMENTS=['--headless', '--no-sandbox', '--disable-dev-shm-usage']"
-        ])
+        spider_settings["SELENIUM_DRIVER_NAME"] = "chrome"
+        spider_settings["SELENIUM_DRIVER_ARGUMENTS"] = ['--headless', '--no-sandbox', '--disable-dev-shm-usage']
         logging.info("CI environment detected, using headless Chrome")
     
-    logging.info(f"Running command: {' '.join(cmd)}")
+    job = SpiderJob(
+        spider_name,
+        spider_kwargs={"mode": mode},  # Pass mode to spider
+        settings=spider_settings,
+        output=json_output,
+        timeout=180,  # 3 minute overall spider timeout
+        retries=max_retries,
+        retry_delay=30,  # Wait before retry
+    )
+    logging.info(f"Running {spider_name} in-process (mode={mode})")
     
-    # Retry mechanism
-    for attempt in range(max_retries + 1):
-        if attempt > 0:
-            logging.info(f"Retry attempt {attempt}/{max_retries}")
-            time.sleep(30)  # Wait before retry
-        
-        try:
-            # Run the spider with extended timeout for stability
-            result = subprocess.run(
-                cmd, 
-                cwd=Path(__file__).parent,
-                capture_output=True, 
-                text=True, 
-                timeout=180  # 3 minute overall spider timeout (process-level)
-            )
-            
-            # Check results
-            if result.returncode == 0:
-                logging.info("Spider completed successfully!")
-                
-                # Check if data was scraped
-                if json_output.exists():
-                    return process_results(json_output, spider_name, mode, enable_database, mode_suffix, date_str)
-                else:
-                    logging.warning("No output file created, but spider returned success")
-                    if attempt < max_retries:
-                        continue
-                    return False
-            else:
-                logging.error(f"Spider failed with return code: {result.returncode}")
-                if result.stderr:
-                    logging.error(f"Error output: {result.stderr}")
-                if attempt < max_retries:
-                    continue
-                return False
-                
-        except subprocess.TimeoutExpired:
-            logging.error(f"Spider timed out (>5 minutes) - site may be unresponsive")
-            if attempt < max_retries:
-                continue
-            return False
-        except Exception as e:
-            logging.error(f"Unexpected error: {e}")
-            if attempt < max_retries:
-                continue
-            return False
+    try:
+        result = SpiderRunner(log_file=log_output).run([job])[job.name]
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        return False
+    
+    if not result['success']:
+        logging.error(f"Spider failed after {result['attempts']} attempt(s): "
+                      f"{result['error'] or result['finish_reason']}")
+        return False
     
-    logging.error(f"All {max_retries + 1} attempts failed")
-    return False
+    logging.info(f"Spider completed successfully! ({result['items']} items in {result['duration']:.0f}s)")
+    
+    # Check if data was scraped
+    if not json_output.exists():
+        logging.warning("No output file created, but spider returned success")
+        return False
+    return process_results(json_output, spider_name, mode, enable_database, mode_suffix, date_str)
 
 
 def process_results(json_output, spider_name, mode, enable_database, mode_suffix, date_str):
     """Process spider results and handle output"""
     try:
-        with open(json_output, 'r', encoding='utf-8') as f:
+        with open(json_output, 'rb') as f:
             try:
-                data = json.load(f)
-                item_count = len(data) if data else 0
+                # One pass, one parsed record: memory stays flat however big the feed
+                item_count = 0
+                sample = None
+                for line in f:
+                    if not line.strip():
+                        continue
+                    if sample is None:
+                        sample = loads(line)
+                    item_count += 1
                 logging.info(f"New deals found: {item_count}")
                 
                 if item_count > 0:
                     # Show sample data based on spider type
-                    sample = data[0]
                     if spider_name == "house_spider":
                         logging.info(f"Sample: {sample.get('estate_name_zh', 'N/A')} - {sample.get('house_type', 'N/A')}")
                         logging.info(f"Price: ¥{sample.get('deal_price', 'N/A'):,}")
@@ -202,7 +174,8 @@ def process_results(json_output, spider_name, mode, enable_database, mode_suffix
                         logging.info("Data saved to JSON file only")
                     
                     # Create symlink to latest
-                    latest_link = Path("daily_output") / f"latest{mode_suffix}.json"
+                    latest_name = f"latest{mode_suffix}{json_output.suffix}"
+                    latest_link = Path("daily_output") / latest_name
                     try:
                         if latest_link.exists() or latest_link.is_symlink():
                             latest_link.unlink()
@@ -210,12 +183,12 @@ def process_results(json_output, spider_name, mode, enable_database, mode_suffix
                         # Use relative path for symlink
                         relative_path = Path(date_str) / json_output.name
                         os.symlink(relative_path, latest_link)
-                        logging.info(f"Created symlink: latest{mode_suffix}.json -> {relative_path}")
+                        logging.info(f"Created symlink: {latest_name} -> {relative_path}")
                     except OSError:
                         # Fallback: copy file if symlink fails on Windows
                         try:
                             shutil.copy2(json_output, latest_link)
-                            logging.info(f"Copied to: latest{mode_suffix}.json")
+                            logging.info(f"Copied to: {latest_name}")
                         except Exception as e:
                             logging.warning(f"Failed to create symlink/copy: {e}")
                     
@@ -288,7 +261,8 @@ def generate_daily_summary():
     logging.info("=" * 40)
     
     try:
-        json_files = list(today_dir.glob("deals_*.json"))
+        # .jsonl feeds, plus .json arrays from older runs
+        json_files = list(today_dir.glob("deals_*.json")) + list(today_dir.glob("deals_*.jsonl"))
         
         if not json_files:
             logging.info("No deal files found for today")
@@ -300,19 +274,17 @@ def generate_daily_summary():
         
         for json_file in json_files:
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    count = len(data) if data else 0
-                    total_items += count
-                    
-                    # Track latest file
-                    file_time = json_file.stat().st_mtime
-                    if file_time > latest_time:
-                        latest_time = file_time
-                        latest_file = json_file
-                    
-                    run_time = datetime.fromtimestamp(file_time).strftime("%H:%M")
-                    logging.info(f"  {run_time}: {count} items")
+                count = count_records(json_file)
+                total_items += count
+                
+                # Track latest file
+                file_time = json_file.stat().st_mtime
+                if file_time > latest_time:
+                    latest_time = file_time
+                    latest_file = json_file
+                
+                run_time = datetime.fromtimestamp(file_time).strftime("%H:%M")
+                logging.info(f"  {run_time}: {count} items")
                     
             except json.JSONDecodeError as e:
                 logging.error(f"Error reading {json_file.name}: Invalid JSON - {e}")
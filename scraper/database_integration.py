@@ -1,12 +1,15 @@
 import psycopg2
 import json
 import os
+import sys
 from datetime import datetime
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 import hashlib
 import re
 
+from utils.jsonl import iter_jsonl, until_finished
+
 class PropertyDatabaseIntegration:
     """
     Database integration pipeline for scraped property data
@@ -278,12 +281,34 @@ class PropertyDatabaseIntegration:
                 self.connection.rollback()
             return False
     
-    def import_scraping_results(self, file_path: str) -> Dict[str, int]:
-        """Import scraped property data from JSON file"""
+    def load_properties(self, file_path: str) -> List[Dict[str, Any]]:
+        """Properties from a JSON scraper output file (loaded whole)"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        properties = []
+        
+        # Handle different file formats
+        if isinstance(data, list):
+            properties = data
+        elif 'properties' in data:
+            properties = data['properties']
+        elif 'results' in data:
+            # Handle expanded scraper format
+            for city_data in data['results'].values():
+                if isinstance(city_data, dict) and 'properties' in city_data:
+                    properties.extend(city_data['properties'])
+        
+        return properties
+    
+    def import_scraping_results(self, file_path: str, follow: Optional[Callable[[], bool]] = None) -> Dict[str, int]:
+        """
+        Import scraped property data from a JSON or JSON Lines file.
+        JSON Lines files are streamed a record at a time; with follow (true
+        while a spider is still writing the file) the import keeps pace
+        with the crawl instead of waiting for it to finish.
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
             stats = {
                 'total_processed': 0,
                 'inserted': 0,
@@ -291,20 +316,12 @@ class PropertyDatabaseIntegration:
                 'errors': 0
             }
             
-            properties = []
-            
-            # Handle different file formats
-            if 'properties' in data:
-                properties = data['properties']
-            elif 'results' in data:
-                # Handle expanded scraper format
-                for city_data in data['results'].values():
-                    if isinstance(city_data, dict) and 'properties' in city_data:
-                        properties.extend(city_data['properties'])
-            elif isinstance(data, list):
-                properties = data
-            
-            self.logger.info(f"📊 Processing {len(properties)} properties from {file_path}")
+            if file_path.endswith(('.jsonl', '.jl')):
+                properties = iter_jsonl(file_path, follow=follow)
+                self.logger.info(f"📊 Streaming properties from {file_path}")
+            else:
+                properties = self.load_properties(file_path)
+                self.logger.info(f"📊 Processing {len(properties)} properties from {file_path}")
             
             for prop in properties:
                 stats['total_processed'] += 1
@@ -463,6 +480,14 @@ def main():
         return
     
     try:
+        if len(sys.argv) > 2 and sys.argv[1] == '--follow':
+            # Import a feed while its spider writes it; done once the spider has closed it
+            feed_path = sys.argv[2]
+            print(f"\n📡 Following {feed_path}...")
+            import_stats = db_integration.import_scraping_results(feed_path, follow=until_finished(feed_path))
+            print(f"\n📊 IMPORT RESULTS: {import_stats}")
+            return
+        
         # Create tables
         print("\n📋 Creating database tables...")
         if db_integration.create_tables():
@@ -5,7 +5,6 @@ Enhanced Lianjia Daily Scraper
 Integrates the waugustus/lianjia-spider approach with existing property-finder infrastructure
 """
 
-import subprocess
 import sys
 import os
 import json
@@ -14,6 +13,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import argparse
 
+from command.spider_runner import SpiderJob, SpiderRunner
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -73,42 +74,73 @@ class EnhancedLianjiaDailyScraper:
 
     def scrape_city(self, city_config, city_name):
         """Scrape a single city with all its districts"""
-        logger.info(f"🏙️  Starting {city_name} scraping")
-        
-        city_results = {
-            'city': city_name,
-            'start_time': datetime.now().isoformat(),
-            'districts': [],
-            'total_properties': 0,
-            'success': False
-        }
-        
+        return self.scrape_cities({city_name: city_config})[0]
+
+    def scrape_cities(self, city_configs):
+        """
+        Scrape several cities in one in-process run. Cities run side by
+        side; the districts of one city run one after another, so each
+        Lianjia subdomain still sees a single crawler at a time.
+        """
+        jobs = []
+        for city_name, city_config in city_configs.items():
+            logger.info(f"🏙️  Starting {city_name} scraping")
+            for district in city_config['districts']:
+                jobs.append(self.district_job(city_config, city_name, district))
+            # Also scrape city-wide (no district filter) for comparison
+            jobs.append(self.district_job(city_config, city_name, None, is_citywide=True))
+
+        start_time = datetime.now().isoformat()
+        results, error = {}, None
         try:
-            # Scrape each district
+            results = SpiderRunner().run(jobs)
+        except Exception as e:
+            logger.error(f"❌ Error scraping {', '.join(city_configs)}: {e}")
+            error = str(e)
+
+        all_city_results = []
+        for city_name, city_config in city_configs.items():
+            city_results = {
+                'city': city_name,
+                'start_time': start_time,
+                'districts': [],
+                'total_properties': 0,
+                'success': False
+            }
+            if error:
+                city_results['error'] = error
+                city_results['end_time'] = datetime.now().isoformat()
+                all_city_results.append(city_results)
+                continue
+
             for district in city_config['districts']:
-                district_result = self.scrape_district(city_config, city_name, district)
+                district_result = self.district_result(results[f"{city_name}/{district}"])
                 city_results['districts'].append(district_result)
-                city_results['total_properties'] += district_result.get('properties_scraped', 0)
-            
-            # Also scrape city-wide (no district filter) for comparison
-            citywide_result = self.scrape_district(city_config, city_name, None, is_citywide=True)
+                city_results['total_properties'] += district_result['properties_scraped']
+
+            citywide_result = self.district_result(results[f"{city_name}/{city_name}_citywide"])
             city_results['citywide'] = citywide_result
-            city_results['total_properties'] += citywide_result.get('properties_scraped', 0)
-            
+            city_results['total_properties'] += citywide_result['properties_scraped']
+
             city_results['success'] = True
             city_results['end_time'] = datetime.now().isoformat()
-            
             logger.info(f"✅ {city_name} completed: {city_results['total_properties']} properties")
-            
-        except Exception as e:
-            logger.error(f"❌ Error scraping {city_name}: {e}")
-            city_results['error'] = str(e)
-            city_results['end_time'] = datetime.now().isoformat()
-        
-        return city_results
+            all_city_results.append(city_results)
+
+        return all_city_results
 
     def scrape_district(self, city_config, city_name, district=None, is_citywide=False):
         """Scrape a specific district or citywide"""
+        job = self.district_job(city_config, city_name, district, is_citywide)
+        try:
+            return self.district_result(SpiderRunner().run([job])[job.name])
+        except Exception as e:
+            logger.error(f"💥 Error scraping {job.name}: {e}")
+            return {'district': job.name.split('/', 1)[1], 'properties_scraped': 0,
+                    'success': False, 'error': str(e)}
+
+    def district_job(self, city_config, city_name, district=None, is_citywide=False):
+        """Spider job for a specific district or citywide (based on waugustus approach)"""
         district_name = district or f"{city_name}_citywide"
         max_items = city_config['max_items_per_district']
         
@@ -117,77 +149,48 @@ class EnhancedLianjiaDailyScraper:
         
         logger.info(f"📍 Scraping {district_name} (max {max_items} items)")
         
+        spider_kwargs = {
+            'city': city_name,
+            'house_type': city_config["house_types"],
+            'min_price': city_config["price_range"]["min"],
+            'max_price': city_config["price_range"]["max"],
+        }
+        
+        # Add district filter if specified
+        if district and not is_citywide:
+            spider_kwargs['district'] = district
+        
+        return SpiderJob(
+            'enhanced_lianjia',
+            name=f"{city_name}/{district_name}",
+            spider_kwargs=spider_kwargs,
+            settings={'CLOSESPIDER_ITEMCOUNT': max_items, 'LOG_LEVEL': 'INFO'},
+            timeout=300,  # 5 minutes per district
+            group=city_name,
+        )
+
+    def district_result(self, result):
+        """District summary from a SpiderRunner result"""
+        district_name = result['name'].split('/', 1)[1]
         district_result = {
             'district': district_name,
-            'start_time': datetime.now().isoformat(),
-            'properties_scraped': 0,
-            'success': False
+            'start_time': result['stats'].get('start_time'),
+            'end_time': result['stats'].get('finish_time'),
+            'properties_scraped': result['items'],
+            'success': result['success']
         }
         
-        try:
-            # Build command (based on waugustus approach)
-            command = [
-                'python', '-m', 'scrapy', 'crawl', 'enhanced_lianjia',
-                '-a', f'city={city_name}',
-                '-a', f'house_type={city_config["house_types"]}',
-                '-a', f'min_price={city_config["price_range"]["min"]}',
-                '-a', f'max_price={city_config["price_range"]["max"]}',
-                '-s', f'CLOSESPIDER_ITEMCOUNT={max_items}',
-                '-L', 'INFO'
-            ]
-            
-            # Add district filter if specified
-            if district and not is_citywide:
-                command.extend(['-a', f'district={district}'])
-            
-            # Run scraper
-            logger.info(f"🚀 Running: {' '.join(command)}")
-            
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                timeout=300,  # 5 minutes per district
-                cwd=self.scraper_dir
-            )
-            
-            # Parse results
-            if result.returncode == 0:
-                # Extract items scraped
-                items_scraped = self.extract_items_scraped(result.stdout)
-                district_result['properties_scraped'] = items_scraped
-                district_result['success'] = True
-                
-                logger.info(f"✅ {district_name}: {items_scraped} properties scraped")
-            else:
-                logger.error(f"❌ {district_name} failed with return code: {result.returncode}")
-                if result.stderr:
-                    logger.error(f"💥 Error: {result.stderr[:200]}...")
-                district_result['error'] = f"Return code: {result.returncode}"
-            
-        except subprocess.TimeoutExpired:
+        if result['success']:
+            logger.info(f"✅ {district_name}: {result['items']} properties scraped")
+        elif result['finish_reason'] == 'closespider_timeout':
             logger.warning(f"⏰ {district_name} timed out after 5 minutes")
             district_result['error'] = "Timeout"
-        except Exception as e:
-            logger.error(f"💥 Error scraping {district_name}: {e}")
-            district_result['error'] = str(e)
+        else:
+            logger.error(f"❌ {district_name} failed: {result['error'] or result['finish_reason']}")
+            district_result['error'] = result['error'] or result['finish_reason']
         
-        district_result['end_time'] = datetime.now().isoformat()
         return district_result
 
-    def extract_items_scraped(self, output):
-        """Extract number of items scraped from Scrapy output"""
-        lines = output.split('\n')
-        for line in lines:
-            if 'item_scraped_count' in line:
-                try:
-                    # Extract number from line like "item_scraped_count': 25"
-                    count = int(line.split('item_scraped_count')[1].split(':')[1].split('}')[0].strip())
-                    return count
-                except:
-                    continue
-        return 0
-
     def run_daily_scraping(self, cities=None):
         """Run daily scraping for specified cities"""
         if cities is None:
@@ -198,28 +201,24 @@ class EnhancedLianjiaDailyScraper:
         logger.info(f"📅 Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         logger.info("=" * 60)
         
-        # Scrape each city
+        city_configs = {}
         for city in cities:
             if city not in self.default_configs:
                 logger.warning(f"⚠️  Unsupported city: {city}")
                 continue
+            city_configs[city] = self.default_configs[city]
+        
+        # Scrape all cities in one in-process run
+        for city_result in self.scrape_cities(city_configs) if city_configs else []:
+            self.results['cities_scraped'].append(city_result)
+            self.results['total_properties'] += city_result['total_properties']
             
-            try:
-                city_config = self.default_configs[city]
-                city_result = self.scrape_city(city_config, city)
-                
-                self.results['cities_scraped'].append(city_result)
-                self.results['total_properties'] += city_result['total_properties']
-                
-                if city_result['success']:
-                    self.results['successful_cities'] += 1
-                else:
-                    self.results['failed_cities'] += 1
-                    
-            except Exception as e:
-                logger.error(f"❌ Failed to scrape {city}: {e}")
-                self.results['errors'].append(f"{city}: {str(e)}")
+            if city_result['success']:
+                self.results['successful_cities'] += 1
+            else:
                 self.results['failed_cities'] += 1
+                if city_result.get('error'):
+                    self.results['errors'].append(f"{city_result['city']}: {city_result['error']}")
         
         # Finalize results
         self.results['end_time'] = datetime.now().isoformat()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Adaptive per-domain concurrency for Scrapy
+Additive increase on clean responses, multiplicative decrease on blocks
+"""
+
+import logging
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.settings import SETTINGS_PRIORITIES
+
+from utils.block_detector import block_reason
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller for each downloader slot (one per domain), so every
+    site runs at the fastest rate it tolerates instead of all of them
+    crawling at the pace of the most hostile one.
+
+    Each slot climbs a ladder one step per clean window (as many clean
+    responses as its current concurrency): first its delay drops by
+    ADAPTIVE_DELAY_STEP down to min_delay, then its concurrency grows by
+    one up to max_concurrency. A block, as judged by utils.block_detector,
+    cuts concurrency by ADAPTIVE_CONCURRENCY_DECREASE, or doubles the
+    delay once concurrency is at its floor. Blocks for requests sent
+    before the last cut are ignored, so one burst only counts once.
+
+    Floors and ceilings default to ADAPTIVE_CONCURRENCY_MIN/MAX and
+    ADAPTIVE_DELAY_MIN/MAX and can be set per domain (matched as a suffix
+    of the slot's host) in ADAPTIVE_CONCURRENCY_DOMAINS:
+
+        ADAPTIVE_CONCURRENCY_DOMAINS = {
+            "lianjia.com": {"max_concurrency": 2, "min_delay": 2},
+        }
+
+    A spider's own CONCURRENT_REQUESTS_PER_DOMAIN / DOWNLOAD_DELAY (from
+    custom_settings or -s) take precedence over both: its concurrency is
+    the ceiling and its delay the floor, and its slots start there.
+
+    Slots start at their floor concurrency and DOWNLOAD_DELAY. The state is
+    also written to DOWNLOAD_SLOTS' per-slot settings, so a slot the
+    downloader creates or recreates after idling starts from it too. This
+    replaces AutoThrottle; both would set slot.delay.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_CONCURRENCY_ENABLED'):
+            raise NotConfigured
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.logger = logging.getLogger(__name__)
+        if settings.getbool('AUTOTHROTTLE_ENABLED'):
+            self.logger.warning("⚠️ AutoThrottle is also enabled; its delays are overridden per request")
+        self.defaults = {
+            'min_concurrency': settings.getint('ADAPTIVE_CONCURRENCY_MIN', 1),
+            'max_concurrency': settings.getint('ADAPTIVE_CONCURRENCY_MAX', 4),
+            'min_delay': settings.getfloat('ADAPTIVE_DELAY_MIN', 1.0),
+            'max_delay': settings.getfloat('ADAPTIVE_DELAY_MAX', 30.0),
+        }
+        self.domain_limits = settings.getdict('ADAPTIVE_CONCURRENCY_DOMAINS')
+        self.start_delay = settings.getfloat('DOWNLOAD_DELAY', 0)
+        self.spider_limits = {}
+        if self.overridden(settings, 'CONCURRENT_REQUESTS_PER_DOMAIN'):
+            self.spider_limits['max_concurrency'] = settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN')
+        if self.overridden(settings, 'DOWNLOAD_DELAY'):
+            self.spider_limits['min_delay'] = self.start_delay
+        self.delay_step = settings.getfloat('ADAPTIVE_DELAY_STEP', 0.5)
+        self.decrease_factor = settings.getfloat('ADAPTIVE_CONCURRENCY_DECREASE', 0.5)
+
+        # slot key -> limits, concurrency, delay, clean (responses this window), cut_at
+        self.slots = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        extension = cls(crawler)
+        crawler.signals.connect(extension.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(extension.response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    @staticmethod
+    def overridden(settings, name):
+        """Set by the spider or on the command line rather than in settings.py"""
+        return (settings.getpriority(name) or 0) > SETTINGS_PRIORITIES['project']
+
+    def limits_for(self, key):
+        limits = dict(self.defaults)
+        # Longest matching suffix wins, so "bj.lianjia.com" can override "lianjia.com"
+        for domain in sorted(self.domain_limits, key=len):
+            if key == domain or key.endswith('.' + domain):
+                limits.update(self.domain_limits[domain])
+        limits.update(self.spider_limits)
+        limits['max_delay'] = max(limits['max_delay'], limits['min_delay'])
+        limits['min_concurrency'] = min(limits['min_concurrency'], limits['max_concurrency'])
+        return limits
+
+    def state_for(self, key):
+        state = self.slots.get(key)
+        if state is None:
+            limits = self.limits_for(key)
+            start = limits['max_concurrency'] if 'max_concurrency' in self.spider_limits else limits['min_concurrency']
+            state = {
+                'limits': limits,
+                'concurrency': start,
+                'delay': min(max(self.start_delay, limits['min_delay']), limits['max_delay']),
+                'clean': 0,
+                'cut_at': 0.0,
+            }
+            self.slots[key] = state
+        return state
+
+    def apply(self, key, state):
+        """Push the state onto the downloader slot and the settings new slots start from"""
+        downloader = self.crawler.engine.downloader
+        downloader.per_slot_settings.setdefault(key, {}).update(
+            concurrency=state['concurrency'], delay=state['delay'])
+        slot = downloader.slots.get(key)
+        if slot is not None:
+            slot.concurrency = state['concurrency']
+            slot.delay = state['delay']
+
+    def slot_key(self, request):
+        return request.meta.get('download_slot') or self.crawler.engine.downloader.get_slot_key(request)
+
+    def request_reached_downloader(self, request, spider=None):
+        key = self.slot_key(request)
+        self.apply(key, self.state_for(key))
+
+    def response_downloaded(self, response, request, spider=None):
+        key = self.slot_key(request)
+        state = self.state_for(key)
+        if block_reason(response):
+            self.on_block(key, state, request)
+        else:
+            self.on_clean(key, state)
+        self.apply(key, state)
+
+    def on_clean(self, key, state):
+        limits = state['limits']
+        state['clean'] += 1
+        if state['clean'] < state['concurrency']:
+            return
+        state['clean'] = 0
+        if state['delay'] > limits['min_delay']:
+            state['delay'] = max(limits['min_delay'], state['delay'] - self.delay_step)
+        elif state['concurrency'] < limits['max_concurrency']:
+            state['concurrency'] += 1
+            self.inc_stat('adaptive_concurrency/increases')
+            self.logger.info(f"📈 {key}: concurrency {state['concurrency']}, delay {state['delay']:.1f}s")
+
+    def on_block(self, key, state, request):
+        self.inc_stat('adaptive_concurrency/blocks')
+        state['clean'] = 0
+        sent_at = time.time() - (request.meta.get('download_latency') or 0)
+        if sent_at < state['cut_at']:
+            # Sent at the old rate; already reacted to this burst
+            return
+
+        limits = state['limits']
+        if state['concurrency'] > limits['min_concurrency']:
+            state['concurrency'] = max(limits['min_concurrency'],
+                                       int(state['concurrency'] * self.decrease_factor))
+        else:
+            state['delay'] = min(limits['max_delay'], max(state['delay'], self.delay_step) * 2)
+        state['cut_at'] = time.time()
+        self.inc_stat('adaptive_concurrency/decreases')
+        self.logger.warning(f"📉 {key} blocked: concurrency {state['concurrency']}, delay {state['delay']:.1f}s")
+
+    def inc_stat(self, key):
+        if self.stats:
+            self.stats.inc_value(key)
+
+    def spider_closed(self, spider):
+        for key, state in self.slots.items():
+            self.logger.info(f"📊 Final rate for {key}: concurrency {state['concurrency']}, "
+                             f"delay {state['delay']:.1f}s")
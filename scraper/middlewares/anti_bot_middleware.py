@@ -3,7 +3,7 @@ import time
 import json
 import requests
 from scrapy.http import HtmlResponse
-from scrapy.downloadermiddlewares.retry import RetryMiddleware
+from .backoff_retry_middleware import BackoffRetryMiddleware
 from scrapy import signals
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -12,6 +12,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import logging
 
+from utils.block_detector import block_reason
+
 # Import our consistent scraping manager
 try:
     from .consistent_scraping import consistent_manager
@@ -145,9 +147,10 @@ class ConsistentAntiBot:
             
         else:
             # Fallback blocking detection
-            if self._is_blocked_response_fallback(response):
-                self.logger.warning(f"🚫 Fallback blocking detected: {request.url}")
-                return self._create_retry_request(request, "Fallback detected blocking")
+            reason = block_reason(response)
+            if reason:
+                self.logger.warning(f"🚫 Fallback blocking detected ({reason}): {request.url}")
+                return self._create_retry_request(request, f"Fallback detected blocking: {reason}")
         
         return response
     
@@ -171,22 +174,6 @@ class ConsistentAntiBot:
             self.logger.error(f"❌ Max retries exceeded for {request.url}")
             return None
     
-    def _is_blocked_response_fallback(self, response):
-        """Fallback blocking detection"""
-        if response.status in [403, 429, 503]:
-            return True
-        
-        if len(response.body) < 1000:
-            return True
-        
-        content_lower = response.body.lower()
-        blocking_indicators = [
-            b'access denied', b'forbidden', b'captcha',
-            '验证码'.encode('utf-8'), '人机验证'.encode('utf-8'),
-            b'robot', b'blocked'
-        ]
-        
-        return any(indicator in content_lower for indicator in blocking_indicators)
     """
     Advanced Anti-Bot Middleware implementing multiple evasion techniques:
     1. Random delays between requests (30-60 requests intervals)
@@ -363,35 +350,10 @@ class ConsistentAntiBot:
     
     def _is_blocked_response(self, response):
         """Detect if the response indicates we've been blocked"""
-        # Common indicators of being blocked
-        blocking_indicators = [
-            b'Access Denied',
-            b'Forbidden',
-            b'captcha',
-            '验证码'.encode('utf-8'),  # Chinese for verification code
-            '人机验证'.encode('utf-8'),  # Chinese for human verification
-            b'robot',
-            b'blocked',
-            b'429',  # Too Many Requests
-            b'503',  # Service Unavailable
-        ]
-        
-        response_body = response.body.lower()
-        
-        # Check status code
-        if response.status in [403, 429, 503]:
-            return True
-        
-        # Check response content
-        for indicator in blocking_indicators:
-            if indicator in response_body:
-                return True
-        
-        # Check if response is unusually small (might be a block page)
-        if len(response.body) < 1000 and response.status == 200:
-            return True
-        
-        return False
+        reason = block_reason(response)
+        if reason:
+            self.logger.debug(f"Block reason: {reason}")
+        return reason is not None
     
     def _handle_blocking_detected(self):
         """Handle detection of blocking - implement more aggressive measures"""
@@ -480,23 +442,13 @@ class ShadowUserAgentMiddleware:
         return None
 
 
-class EnhancedRetryMiddleware(RetryMiddleware):
+class EnhancedRetryMiddleware(BackoffRetryMiddleware):
     """
     Enhanced retry middleware with intelligent backoff for anti-bot scenarios
+    Backs off on 403/429/503 without blocking the reactor (see BackoffRetryMiddleware)
+    Bans clear slowly, so its cap is ENHANCED_RETRY_BACKOFF_MAX, not RETRY_BACKOFF_MAX
     """
     
     def __init__(self, settings):
         super().__init__(settings)
-        self.backoff_factor = 2
-        self.max_backoff = 300  # 5 minutes max backoff
-    
-    def process_response(self, request, response, spider):
-        if response.status in [403, 429, 503]:
-            # Calculate backoff delay
-            retries = request.meta.get('retry_times', 0)
-            delay = min(self.backoff_factor ** retries, self.max_backoff)
-            
-            spider.logger.info(f"Anti-bot response detected, backing off for {delay} seconds")
-            time.sleep(delay)
-        
-        return super().process_response(request, response, spider)
+        self.backoff_max = settings.getfloat('ENHANCED_RETRY_BACKOFF_MAX', 300)
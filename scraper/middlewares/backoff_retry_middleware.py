@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Backoff Retry Middleware for Scrapy
+Retries with exponential backoff and jitter without blocking the reactor
+"""
+
+import logging
+import random
+from urllib.parse import urlparse
+
+from scrapy.downloadermiddlewares.retry import RetryMiddleware, get_retry_request
+from scrapy.utils.response import response_status_message
+
+
+class BackoffRetryMiddleware(RetryMiddleware):
+    """
+    Retries go back to the scheduler at once, carrying their backoff in
+    meta['delay']: DelayedRequestScheduler queues each one only once its
+    backoff has passed, so it holds no downloader slot and other requests
+    and domains keep flowing while it waits - instead of time.sleep(),
+    which froze the whole crawl.
+
+    The n-th retry waits RETRY_BACKOFF_BASE * 2**n seconds, capped at
+    RETRY_BACKOFF_MAX and scaled by a random 0.5-1.5 jitter so retries of
+    one burst don't return together.
+
+    Each domain may spend RETRY_DOMAIN_BUDGET_MIN retries plus
+    RETRY_DOMAIN_BUDGET_RATIO retries per request seen; beyond that its
+    failures are given up on instead of retried, so a dying site can't
+    crowd out the rest of the crawl.
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.logger = logging.getLogger(__name__)
+        self.backoff_base = settings.getfloat('RETRY_BACKOFF_BASE', 1.0)
+        self.backoff_max = settings.getfloat('RETRY_BACKOFF_MAX', 60.0)
+        self.budget_ratio = settings.getfloat('RETRY_DOMAIN_BUDGET_RATIO', 0.2)
+        self.budget_min = settings.getint('RETRY_DOMAIN_BUDGET_MIN', 10)
+
+        # domain -> requests seen, retries spent
+        self.domain_requests = {}
+        self.domain_retries = {}
+
+    def process_response(self, request, response, spider=None):
+        self.count_request(request)
+        if request.meta.get('dont_retry', False) or response.status not in self.retry_http_codes:
+            return response
+        return self.retry_with_backoff(request, response_status_message(response.status)) or response
+
+    def process_exception(self, request, exception, spider=None):
+        self.count_request(request)
+        if isinstance(exception, self.exceptions_to_retry) and not request.meta.get('dont_retry', False):
+            return self.retry_with_backoff(request, exception)
+        return None
+
+    def count_request(self, request):
+        domain = urlparse(request.url).netloc
+        self.domain_requests[domain] = self.domain_requests.get(domain, 0) + 1
+
+    def has_budget(self, domain):
+        budget = self.budget_min + self.budget_ratio * self.domain_requests.get(domain, 0)
+        return self.domain_retries.get(domain, 0) < budget
+
+    def backoff(self, retries):
+        """Seconds to hold back the given retry attempt (1 for the first retry)"""
+        delay = min(self.backoff_base * 2 ** retries, self.backoff_max)
+        return min(delay * random.uniform(0.5, 1.5), self.backoff_max)
+
+    def retry_with_backoff(self, request, reason):
+        domain = urlparse(request.url).netloc
+        if not self.has_budget(domain):
+            self.logger.warning(f"💸 Retry budget for {domain} spent, giving up on {request.url} ({reason})")
+            self.crawler.stats.inc_value('retry/budget_exhausted')
+            return None
+
+        retry_request = get_retry_request(
+            request,
+            spider=self.crawler.spider,
+            reason=reason,
+            max_retry_times=request.meta.get('max_retry_times', self.max_retry_times),
+            priority_adjust=request.meta.get('priority_adjust', self.priority_adjust),
+        )
+        if retry_request is None:
+            return None
+
+        self.domain_retries[domain] = self.domain_retries.get(domain, 0) + 1
+        delay = self.backoff(retry_request.meta['retry_times'])
+        retry_request.meta['delay'] = max(delay, request.meta.get('delay') or 0)
+        self.logger.info(f"⏱️ Retry {retry_request.meta['retry_times']} for {request.url} "
+                         f"in {retry_request.meta['delay']:.1f}s ({reason})")
+        return retry_request
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Per-domain Circuit Breaker Middleware for Scrapy
+Parks requests to dead sites and caps retries across the whole crawl
+"""
+
+import logging
+from collections import deque
+
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider, IgnoreRequest, NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
+
+from utils.block_detector import block_reason
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreakerMiddleware:
+    """
+    Tracks the outcome of the last CIRCUIT_BREAKER_WINDOW downloads per
+    domain. A failure is a download exception, a 5xx or a block
+    (utils.block_detector). Once at least CIRCUIT_BREAKER_MIN_REQUESTS
+    outcomes are in and the failure ratio reaches CIRCUIT_BREAKER_THRESHOLD,
+    the domain's circuit opens:
+
+    - requests for it are parked instead of sent: new ones as they are
+      scheduled, queued ones when they come out of the scheduler. Parked
+      requests are held here, not failed, so no errback fires;
+    - after CIRCUIT_BREAKER_COOLDOWN seconds one parked request goes out
+      as a probe. Success closes the circuit and releases everything
+      parked; failure re-opens it with the cooldown doubled;
+    - after CIRCUIT_BREAKER_MAX_PROBES failed probes the domain is given
+      up on: parked and future requests for it are dropped.
+
+    Requests the downloader had already taken (up to CONCURRENT_REQUESTS)
+    when the circuit opened still go out.
+
+    Independently, retries (requests with meta['retry_times']) across all
+    domains are capped at RETRY_BUDGET_MIN plus RETRY_BUDGET_RATIO of the
+    first attempts scheduled, whatever middleware produced them.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('CIRCUIT_BREAKER_ENABLED'):
+            raise NotConfigured
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.logger = logging.getLogger(__name__)
+        self.window = settings.getint('CIRCUIT_BREAKER_WINDOW', 20)
+        self.min_requests = settings.getint('CIRCUIT_BREAKER_MIN_REQUESTS', 5)
+        self.threshold = settings.getfloat('CIRCUIT_BREAKER_THRESHOLD', 0.5)
+        self.cooldown = settings.getfloat('CIRCUIT_BREAKER_COOLDOWN', 30)
+        self.max_probes = settings.getint('CIRCUIT_BREAKER_MAX_PROBES', 3)
+        self.retry_budget_min = settings.getint('RETRY_BUDGET_MIN', 20)
+        self.retry_budget_ratio = settings.getfloat('RETRY_BUDGET_RATIO', 0.1)
+
+        # domain -> state, outcomes, parked, failed_probes, cooldown, probe_call
+        self.domains = {}
+        self.first_attempts = 0
+        self.retries = 0
+        self.clock = None  # Schedules probes; the reactor unless a test sets a Clock
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(middleware.response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(middleware.request_left_downloader, signal=signals.request_left_downloader)
+        crawler.signals.connect(middleware.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def domain_state(self, request):
+        domain = urlparse_cached(request).hostname or ''
+        state = self.domains.get(domain)
+        if state is None:
+            state = {
+                'state': CLOSED,
+                'outcomes': deque(maxlen=self.window),
+                'parked': [],
+                'failed_probes': 0,
+                'cooldown': self.cooldown,
+                'probe_call': None,
+            }
+            self.domains[domain] = state
+        return domain, state
+
+    def inc_stat(self, key, count=1):
+        if self.stats:
+            self.stats.inc_value(f'circuit_breaker/{key}', count)
+
+    # Gates
+
+    def process_request(self, request, spider=None):
+        """Queued before the circuit opened: send it back to be parked"""
+        domain, state = self.domain_state(request)
+        if state['state'] == CLOSED or request.meta.get('circuit_probe'):
+            return None
+        parked = request.replace(dont_filter=True)
+        parked.meta['circuit_parked'] = True
+        return parked
+
+    def request_scheduled(self, request, spider=None):
+        domain, state = self.domain_state(request)
+
+        if request.meta.pop('circuit_parked', False) or request.meta.get('delay_released'):
+            # Released from parking or a delay; already counted against the budget
+            pass
+        elif request.meta.get('retry_times'):
+            if self.retries >= self.retry_budget_min + self.retry_budget_ratio * self.first_attempts:
+                self.inc_stat('retry_budget_exhausted')
+                self.logger.debug(f"💸 Global retry budget spent, dropping retry of {request.url}")
+                raise IgnoreRequest("Global retry budget spent")
+            self.retries += 1
+        else:
+            self.first_attempts += 1
+
+        if state['state'] == CLOSED or request.meta.get('circuit_probe'):
+            return
+        if state['failed_probes'] >= self.max_probes:
+            self.inc_stat('dropped')
+            raise IgnoreRequest(f"Circuit for {domain} is open")
+        request.meta['circuit_parked'] = True
+        state['parked'].append(request)
+        self.inc_stat('parked')
+        raise IgnoreRequest(f"Circuit for {domain} is open, request parked")
+
+    # Outcomes
+
+    def response_downloaded(self, response, request, spider=None):
+        request.meta['circuit_outcome'] = True
+        failed = response.status >= 500 or block_reason(response) is not None
+        self.record(request, failed)
+
+    def request_left_downloader(self, request, spider=None):
+        # No response_downloaded before this: the download raised
+        if not request.meta.pop('circuit_outcome', False):
+            self.record(request, failed=True)
+
+    def record(self, request, failed):
+        domain, state = self.domain_state(request)
+
+        if request.meta.get('circuit_probe'):
+            request.meta.pop('circuit_probe', None)
+            if failed:
+                self.probe_failed(domain, state)
+            else:
+                self.close_circuit(domain, state)
+            return
+
+        if state['state'] != CLOSED:
+            return
+        state['outcomes'].append(failed)
+        failures = sum(state['outcomes'])
+        if len(state['outcomes']) >= self.min_requests and failures / len(state['outcomes']) >= self.threshold:
+            self.logger.warning(f"🔌 Circuit open for {domain}: {failures}/{len(state['outcomes'])} "
+                                f"recent requests failed, probing in {state['cooldown']:.0f}s")
+            self.inc_stat('opened')
+            self.open_circuit(domain, state)
+
+    # State changes
+
+    def open_circuit(self, domain, state):
+        state['state'] = OPEN
+        clock = self.clock
+        if clock is None:
+            # Imported here so loading this module never installs a reactor
+            from twisted.internet import reactor as clock
+        state['probe_call'] = clock.callLater(state['cooldown'], self.send_probe, domain)
+
+    def send_probe(self, domain):
+        state = self.domains[domain]
+        state['probe_call'] = None
+        if not state['parked']:
+            # Nothing waiting on this domain; the next request for it is the probe
+            state['state'] = CLOSED
+            state['outcomes'].clear()
+            return
+        state['state'] = HALF_OPEN
+        probe = state['parked'].pop(0)
+        probe.meta['circuit_probe'] = True
+        self.inc_stat('probes')
+        self.logger.info(f"🩺 Probing {domain} with {probe.url}")
+        self.crawler.engine.crawl(probe)
+
+    def probe_failed(self, domain, state):
+        state['failed_probes'] += 1
+        if state['failed_probes'] >= self.max_probes:
+            self.logger.error(f"⛔ Giving up on {domain} after {state['failed_probes']} failed probes, "
+                              f"dropping {len(state['parked'])} parked requests")
+            self.inc_stat('dropped', len(state['parked']))
+            state['state'] = OPEN
+            state['parked'] = []
+            return
+        state['cooldown'] *= 2
+        self.logger.warning(f"🔌 Probe for {domain} failed, next probe in {state['cooldown']:.0f}s")
+        self.open_circuit(domain, state)
+
+    def close_circuit(self, domain, state):
+        parked, state['parked'] = state['parked'], []
+        state.update(state=CLOSED, failed_probes=0, cooldown=self.cooldown)
+        state['outcomes'].clear()
+        self.inc_stat('closed')
+        self.logger.info(f"✅ {domain} recovered, releasing {len(parked)} parked requests")
+        for request in parked:
+            self.crawler.engine.crawl(request)
+
+    # Lifecycle
+
+    def spider_idle(self, spider=None):
+        # Parked requests are still pending work while a probe is due
+        if any(state['parked'] and state['probe_call'] for state in self.domains.values()):
+            raise DontCloseSpider
+
+    def spider_closed(self, spider=None):
+        for domain, state in self.domains.items():
+            if state['probe_call'] and state['probe_call'].active():
+                state['probe_call'].cancel()
+            if state['state'] != CLOSED:
+                self.logger.info(f"📊 {domain} ended with its circuit {state['state']}, "
+                                 f"{len(state['parked'])} requests parked")
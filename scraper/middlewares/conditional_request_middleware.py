@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Conditional Request Middleware for Scrapy
+Skips listing pages that have not changed since the previous run
+"""
+
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured, NotSupported
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class ConditionalRequestMiddleware:
+    """
+    Remembers ETag / Last-Modified and a normalized hash of the rows region
+    for every listing page. On the next run it sends If-None-Match /
+    If-Modified-Since and drops the response before it reaches the spider
+    when the server answers 304 or the rows hash is unchanged.
+
+    Spiders opt in per request with meta['rows_xpath'] (the XPath of the
+    listing rows); requests without it only get header validators.
+
+    Pages are keyed by meta['page_key'] when given, else by the URL without
+    the query parameters in CONDITIONAL_VOLATILE_PARAMS (date windows that
+    move every run). Validators and hashes seen in this run are only
+    committed at spider close, and not for pages whose callback raised, so
+    a parse failure is retried next run instead of being marked unchanged.
+    Pages not seen for PAGE_FINGERPRINT_MAX_AGE_DAYS are pruned on save.
+
+    Responses served from the HTTP cache are passed through untouched:
+    a replayed page is by definition identical to the recorded one.
+    """
+
+    def __init__(self, crawler, state_file, volatile_params=('daterang',), max_age_days=30):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.state_file = Path(state_file)
+        self.volatile_params = set(volatile_params)
+        self.max_age = timedelta(days=max_age_days)
+        self.logger = logging.getLogger(__name__)
+        self.pages = self.load_state()
+        self.pending = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('CONDITIONAL_REQUESTS_ENABLED', True):
+            raise NotConfigured
+        middleware = cls(
+            crawler,
+            crawler.settings.get('PAGE_FINGERPRINT_FILE', 'page_fingerprints.json'),
+            volatile_params=crawler.settings.getlist('CONDITIONAL_VOLATILE_PARAMS', ['daterang']),
+            max_age_days=crawler.settings.getfloat('PAGE_FINGERPRINT_MAX_AGE_DAYS', 30),
+        )
+        crawler.signals.connect(middleware.spider_error, signal=signals.spider_error)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def page_key(self, request):
+        """meta['page_key'], else the URL minus its volatile query parameters"""
+        if request.meta.get('page_key'):
+            return request.meta['page_key']
+        parts = urlsplit(request.url)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                 if k not in self.volatile_params]
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+    def load_state(self):
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('pages', {})
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ Could not load page fingerprints: {e}")
+            return {}
+
+    def spider_error(self, failure, response, spider):
+        """The callback raised: keep last run's state for this page"""
+        key = response.meta.get('conditional_key')
+        if key and self.pending.pop(key, None) is not None:
+            self.logger.info(f"↩️  Not fingerprinting {response.url}: callback failed")
+
+    def prune(self):
+        cutoff = (datetime.now() - self.max_age).isoformat()
+        stale = [key for key, page in self.pages.items()
+                 if (page.get('seen_at') or page.get('checked_at', '')) < cutoff]
+        for key in stale:
+            del self.pages[key]
+        return len(stale)
+
+    def spider_closed(self, spider):
+        for key, update in self.pending.items():
+            self.pages.setdefault(key, {}).update(update)
+        self.pending = {}
+        pruned = self.prune()
+        if pruned:
+            self.logger.info(f"🧹 Pruned {pruned} page fingerprints not seen in {self.max_age.days} days")
+        try:
+            with open(self.state_file, 'w', encoding='utf-8') as f:
+                json.dump({'pages': self.pages}, f, ensure_ascii=False, indent=2)
+            self.logger.info(f"💾 Saved fingerprints for {len(self.pages)} pages")
+        except OSError as e:
+            self.logger.warning(f"⚠️ Could not save page fingerprints: {e}")
+
+    def process_request(self, request, spider):
+        if request.method != 'GET' or request.meta.get('dont_condition'):
+            return None
+
+        page = self.pages.get(self.page_key(request))
+        if not page:
+            return None
+
+        if page.get('etag') and b'If-None-Match' not in request.headers:
+            request.headers['If-None-Match'] = page['etag']
+        if page.get('last_modified') and b'If-Modified-Since' not in request.headers:
+            request.headers['If-Modified-Since'] = page['last_modified']
+        return None
+
+    def process_response(self, request, response, spider):
+        if request.method != 'GET' or request.meta.get('dont_condition'):
+            return response
+        if 'cached' in response.flags:
+            return response
+
+        if response.status == 304:
+            self.stats.inc_value('conditional/not_modified')
+            self.logger.info(f"⏭️  Not modified (304): {request.url}")
+            raise IgnoreRequest(f"Not modified: {request.url}")
+
+        if response.status != 200:
+            return response
+
+        key = self.page_key(request)
+        page = self.pages.get(key, {})
+        now = datetime.now().isoformat()
+        update = {'seen_at': now}
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag:
+            update['etag'] = etag.decode('latin-1')
+        if last_modified:
+            update['last_modified'] = last_modified.decode('latin-1')
+
+        rows_xpath = request.meta.get('rows_xpath')
+        content_hash = self.rows_hash(response, rows_xpath) if rows_xpath else None
+        if content_hash is not None:
+            update.update({'content_hash': content_hash, 'checked_at': now})
+            if page.get('content_hash') == content_hash:
+                page['seen_at'] = now
+                self.stats.inc_value('conditional/unchanged_content')
+                self.logger.info(f"⏭️  Rows unchanged since last run: {request.url}")
+                raise IgnoreRequest(f"Unchanged content: {request.url}")
+
+        # Committed at close unless the spider's callback fails on this page
+        self.pending[key] = update
+        request.meta['conditional_key'] = key
+        return response
+
+    def rows_hash(self, response, rows_xpath):
+        """Hash of the rows region text with whitespace collapsed; None if no rows"""
+        try:
+            rows = response.xpath(rows_xpath)
+        except (AttributeError, ValueError, NotSupported):
+            return None
+        if not rows:
+            return None
+
+        digest = hashlib.sha1()
+        for row in rows:
+            text = _WHITESPACE_RE.sub(' ', ' '.join(row.xpath('.//text()').getall())).strip()
+            digest.update(text.encode('utf-8'))
+            digest.update(b'\n')
+        return digest.hexdigest()
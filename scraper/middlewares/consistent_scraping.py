@@ -12,17 +12,22 @@ from typing import List, Dict, Optional
 import threading
 from datetime import datetime, timedelta
 
+from .proxy_scorer import ProxyScorer, domain_of
+from utils.block_detector import block_reason
+
 
 class ProxyPool:
     """
     Advanced proxy pool management with health monitoring and rotation
+    Proxies are picked by the shared ProxyScorer
     """
     
-    def __init__(self):
+    def __init__(self, scores_file='proxy_scores.json'):
         self.logger = logging.getLogger(__name__)
         self.proxies = []
         self.failed_proxies = set()
         self.proxy_stats = {}
+        self.scorer = ProxyScorer.shared(scores_file)
         self.last_health_check = datetime.now() - timedelta(hours=1)
         self.health_check_interval = 300  # 5 minutes
         self.lock = threading.Lock()
@@ -55,8 +60,6 @@ class ProxyPool:
                     self.proxy_stats[proxy] = {
                         'success_count': 0,
                         'failure_count': 0,
-                        'last_used': None,
-                        'avg_response_time': 0,
                         'consecutive_failures': 0
                     }
         
@@ -177,6 +180,7 @@ class ProxyPool:
         
         self.logger.info(f"Health check complete: {len(healthy_proxies)} healthy proxies")
         self.last_health_check = datetime.now()
+        self.scorer.save()
     
     def test_proxy(self, proxy: str, test_url: str, timeout: int = 10) -> bool:
         """Test if a proxy is working"""
@@ -191,12 +195,8 @@ class ProxyPool:
             
             if response.status_code == 200:
                 with self.lock:
-                    stats = self.proxy_stats[proxy]
-                    stats['success_count'] += 1
-                    stats['avg_response_time'] = (
-                        (stats['avg_response_time'] * (stats['success_count'] - 1) + response_time) /
-                        stats['success_count']
-                    )
+                    self.proxy_stats[proxy]['success_count'] += 1
+                self.scorer.record_success(proxy, domain_of(test_url), response_time)
                 return True
             
         except Exception:
@@ -204,11 +204,12 @@ class ProxyPool:
         
         with self.lock:
             self.proxy_stats[proxy]['failure_count'] += 1
+        self.scorer.record_failure(proxy, domain_of(test_url))
         
         return False
     
-    def get_best_proxy(self) -> Optional[str]:
-        """Get the best performing proxy"""
+    def get_best_proxy(self, domain: Optional[str] = None) -> Optional[str]:
+        """Get the better of two healthy proxies for this domain"""
         with self.lock:
             available_proxies = [
                 p for p in self.proxies 
@@ -221,34 +222,27 @@ class ProxyPool:
                 available_proxies = self.proxies
                 self.logger.warning("All proxies failed, resetting failed proxy list")
             
-            if not available_proxies:
-                return None
-            
-            # Sort by success rate and response time
-            def proxy_score(proxy):
-                stats = self.proxy_stats[proxy]
-                total_requests = stats['success_count'] + stats['failure_count']
-                if total_requests == 0:
-                    return 0.5  # Neutral score for untested proxies
-                
-                success_rate = stats['success_count'] / total_requests
-                response_penalty = min(stats['avg_response_time'] / 10, 0.3)  # Max 30% penalty
-                
-                return success_rate - response_penalty
-            
-            # Get top 5 proxies and randomly select one
-            top_proxies = sorted(available_proxies, key=proxy_score, reverse=True)[:5]
-            selected_proxy = random.choice(top_proxies)
-            
-            self.proxy_stats[selected_proxy]['last_used'] = datetime.now()
-            return selected_proxy
+        return self.scorer.choose(available_proxies, domain)
     
-    def mark_proxy_failed(self, proxy: str):
+    def record_success(self, proxy: str, domain: Optional[str] = None, latency: Optional[float] = None):
+        """Record a good response through a proxy"""
+        with self.lock:
+            if proxy in self.proxy_stats:
+                self.proxy_stats[proxy]['success_count'] += 1
+                self.proxy_stats[proxy]['consecutive_failures'] = 0
+        self.scorer.record_success(proxy, domain, latency)
+    
+    def mark_proxy_failed(self, proxy: str, domain: Optional[str] = None, blocked: bool = False):
         """Mark a proxy as failed"""
         with self.lock:
             self.failed_proxies.add(proxy)
-            self.proxy_stats[proxy]['failure_count'] += 1
-            self.proxy_stats[proxy]['consecutive_failures'] += 1
+            if proxy in self.proxy_stats:
+                self.proxy_stats[proxy]['failure_count'] += 1
+                self.proxy_stats[proxy]['consecutive_failures'] += 1
+        if blocked:
+            self.scorer.record_block(proxy, domain)
+        else:
+            self.scorer.record_failure(proxy, domain)
     
     def get_proxy_stats(self) -> Dict:
         """Get proxy pool statistics"""
@@ -302,7 +296,8 @@ class ConsistentScrapingManager:
         time.sleep(delay)
         
         # Get best proxy
-        proxy = self.proxy_pool.get_best_proxy()
+        domain = domain_of(url)
+        proxy = self.proxy_pool.get_best_proxy(domain)
         
         # Prepare headers
         headers = {
@@ -341,12 +336,14 @@ class ConsistentScrapingManager:
                 if self.is_blocked_response(response):
                     self.logger.warning(f"Blocked response detected for {url}")
                     if proxy:
-                        self.proxy_pool.mark_proxy_failed(proxy)
+                        self.proxy_pool.mark_proxy_failed(proxy, domain, blocked=True)
                     self.handle_blocking()
                     continue
                 
                 # Success
                 if response.status_code == 200:
+                    if proxy:
+                        self.proxy_pool.record_success(proxy, domain, response.elapsed.total_seconds())
                     self.success_count += 1
                     self.consecutive_failures = 0
                     self.adjust_delay_on_success()
@@ -355,10 +352,10 @@ class ConsistentScrapingManager:
             except Exception as e:
                 self.logger.warning(f"Request failed (attempt {attempt + 1}): {e}")
                 if proxy:
-                    self.proxy_pool.mark_proxy_failed(proxy)
+                    self.proxy_pool.mark_proxy_failed(proxy, domain)
                 
                 # Get new proxy for retry
-                proxy = self.proxy_pool.get_best_proxy()
+                proxy = self.proxy_pool.get_best_proxy(domain)
                 if proxy:
                     kwargs['proxies'] = {'http': proxy, 'https': proxy}
         
@@ -369,16 +366,7 @@ class ConsistentScrapingManager:
     
     def is_blocked_response(self, response: requests.Response) -> bool:
         """Check if response indicates blocking"""
-        if response.status_code in [403, 429, 503]:
-            return True
-        
-        content = response.text.lower()
-        blocking_indicators = [
-            'access denied', 'forbidden', 'captcha', '验证码', 
-            '人机验证', 'robot', 'blocked', 'temporarily unavailable'
-        ]
-        
-        return any(indicator in content for indicator in blocking_indicators)
+        return block_reason(response) is not None
     
     def handle_blocking(self):
         """Handle blocking detection"""
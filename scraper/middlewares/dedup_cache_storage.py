@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Compressed, deduplicating HTTP cache storage for Scrapy
+Records crawls once and replays them offline at parse speed
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from time import time
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+
+# zstd is optional: prefer the zstandard package, then the stdlib/backport module, else gzip
+try:
+    import zstandard
+
+    def _compress(data):
+        return zstandard.ZstdCompressor(level=10).compress(data)
+
+    def _decompress(data):
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    BODY_SUFFIX = '.zst'
+except ImportError:
+    try:
+        try:
+            from compression import zstd
+        except ImportError:
+            from backports import zstd
+
+        def _compress(data):
+            return zstd.compress(data, level=10)
+
+        def _decompress(data):
+            return zstd.decompress(data)
+
+        BODY_SUFFIX = '.zst'
+    except ImportError:
+        logging.warning("zstd not available - HTTP cache bodies will be gzip compressed")
+
+        def _compress(data):
+            return gzip.compress(data)
+
+        def _decompress(data):
+            return gzip.decompress(data)
+
+        BODY_SUFFIX = '.gz'
+
+
+class DedupCacheStorage:
+    """
+    HTTPCACHE_STORAGE backend.
+
+    Layout under HTTPCACHE_DIR:
+        objects/<sha[:2]>/<sha>.zst   compressed bodies, addressed by the sha1
+                                      of the raw body and shared by every
+                                      spider, URL and date that served it
+        <spider>/index.jsonl          one JSON line per stored response,
+                                      keyed by request fingerprint; loaded
+                                      into memory on open for O(1) lookups
+
+    Per-spider behaviour comes from HTTPCACHE_SPIDER_POLICIES, e.g.
+        {"store_spider": {"mode": "replay"}, "lianjia": {"mode": "off"}}
+    where mode is one of readwrite (default), replay (never store), record
+    (never serve from cache) or off, and expiration_secs overrides
+    HTTPCACHE_EXPIRATION_SECS for that spider.
+    """
+
+    MODES = ('readwrite', 'replay', 'record', 'off')
+
+    def __init__(self, settings):
+        self.cachedir = Path(data_path(settings['HTTPCACHE_DIR'], createdir=True))
+        self.objects_dir = self.cachedir / 'objects'
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.policies = settings.getdict('HTTPCACHE_SPIDER_POLICIES')
+        self.logger = logging.getLogger(__name__)
+        self.index = {}
+        self.index_path = None
+        self.index_lines = 0
+        self.mode = 'readwrite'
+
+    def open_spider(self, spider):
+        policy = self.policies.get(spider.name, {})
+        self.mode = policy.get('mode', 'readwrite')
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown HTTP cache mode {self.mode!r} for spider {spider.name}")
+        self.expiration_secs = int(policy.get('expiration_secs', self.expiration_secs))
+        self._fingerprinter = spider.crawler.request_fingerprinter
+
+        spider_dir = self.cachedir / spider.name
+        spider_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = spider_dir / 'index.jsonl'
+        self.index = {}
+        self.index_lines = 0
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn write from an interrupted run
+                    self.index[entry['key']] = entry
+                    self.index_lines += 1
+
+        self.logger.info(f"🗄️  HTTP cache for {spider.name}: {len(self.index)} entries, mode={self.mode}")
+
+    def close_spider(self, spider):
+        # Rewrite the append-only index when superseded entries pile up
+        if self.index_path and self.index_lines > len(self.index):
+            tmp_path = self.index_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in self.index.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.index_path)
+
+    def retrieve_response(self, spider, request):
+        if self.mode in ('record', 'off'):
+            return None
+
+        entry = self.index.get(self._fingerprinter.fingerprint(request).hex())
+        if entry is None:
+            return None
+        if 0 < self.expiration_secs < time() - entry['timestamp']:
+            return None
+
+        body_path = self._body_path(entry['body_sha'])
+        if not body_path.exists():
+            return None
+        body = _decompress(body_path.read_bytes())
+
+        headers = Headers({k: v for k, v in entry['headers']}, encoding='latin-1')
+        url = entry['response_url']
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        request.meta['cache_timestamp'] = entry['timestamp']
+        return respcls(url=url, headers=headers, status=entry['status'], body=body)
+
+    def store_response(self, spider, request, response):
+        if self.mode in ('replay', 'off'):
+            return
+
+        body_sha = hashlib.sha1(response.body).hexdigest()
+        body_path = self._body_path(body_sha)
+        if not body_path.exists():
+            body_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = body_path.with_suffix('.tmp')
+            tmp_path.write_bytes(_compress(response.body))
+            os.replace(tmp_path, body_path)
+
+        entry = {
+            'key': self._fingerprinter.fingerprint(request).hex(),
+            'url': request.url,
+            'method': request.method,
+            'status': response.status,
+            'response_url': response.url,
+            'headers': [
+                (k.decode('latin-1'), [v.decode('latin-1') for v in values])
+                for k, values in response.headers.items()
+            ],
+            'body_sha': body_sha,
+            'timestamp': time(),
+        }
+        self.index[entry['key']] = entry
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.index_lines += 1
+
+    def _body_path(self, body_sha):
+        return self.objects_dir / body_sha[:2] / f"{body_sha}{BODY_SUFFIX}"
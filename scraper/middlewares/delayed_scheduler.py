@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Delayed Request Scheduler for Scrapy
+Honours a per-request meta['delay'] before the request reaches the downloader
+"""
+
+import logging
+
+from scrapy.core.scheduler import Scheduler
+
+
+class DelayedRequestScheduler(Scheduler):
+    """
+    SCHEDULER for requests that carry their own pause:
+
+        yield scrapy.Request(url, meta={'delay': random.uniform(2, 4)})
+
+    BackoffRetryMiddleware attaches its backoff the same way. Such a
+    request is not queued until its delay has passed: a reactor callLater
+    hands it back to engine.crawl() then, with meta['delay'] consumed. It
+    holds no downloader slot while it waits, so a burst of delayed retries
+    for one failing domain can't take the CONCURRENT_REQUESTS that other
+    domains need. The delay comes on top of the slot's DOWNLOAD_DELAY.
+
+    Requests still waiting when the spider closes are dropped; they are
+    not written to JOBDIR.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.logger = logging.getLogger(__name__)
+        self.waiting = {}  # id(request) -> IDelayedCall
+        self.clock = None  # Releases delayed requests; the reactor unless a test sets a Clock
+
+    def enqueue_request(self, request):
+        if request.meta.pop('delay_released', False):
+            return super().enqueue_request(request)
+        delay = request.meta.pop('delay', None)
+        if not delay or delay <= 0:
+            return super().enqueue_request(request)
+
+        clock = self.clock
+        if clock is None:
+            # Imported here so loading this module never installs a reactor
+            from twisted.internet import reactor as clock
+        self.logger.debug(f"⏳ Delaying {request.url} by {delay:.1f}s")
+        if self.stats:
+            self.stats.inc_value('request_delay/count')
+            self.stats.inc_value('request_delay/seconds', delay)
+        self.waiting[id(request)] = clock.callLater(delay, self.release, request)
+        return True
+
+    def release(self, request):
+        del self.waiting[id(request)]
+        # Tells request_scheduled handlers (the circuit breaker) it was counted already
+        request.meta['delay_released'] = True
+        self.crawler.engine.crawl(request)
+
+    def has_pending_requests(self):
+        return bool(self.waiting) or super().has_pending_requests()
+
+    def __len__(self):
+        return super().__len__() + len(self.waiting)
+
+    def close(self, reason):
+        for call in self.waiting.values():
+            if call.active():
+                call.cancel()
+        if self.waiting:
+            self.logger.info(f"⏳ Dropped {len(self.waiting)} requests still waiting out their delay")
+        self.waiting = {}
+        return super().close(reason)
@@ -8,46 +8,75 @@ import random
 import logging
 import requests
 import time
-from scrapy.downloadermiddlewares.retry import RetryMiddleware
-from scrapy.utils.response import response_status_message
 from scrapy import signals
+from twisted.internet.defer import DeferredList
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
 import os
 
+from .backoff_retry_middleware import BackoffRetryMiddleware
+from .proxy_scorer import ProxyScorer, domain_of
+
 
 class EnhancedProxyMiddleware:
     """
     Enhanced proxy middleware with intelligent rotation and health checking
+    
+    Health checks run concurrently on a dedicated thread pool in the
+    background: startup and process_request never wait for them. Until the
+    first check finishes every loaded proxy is used; each check then swaps
+    in a new working list in one assignment.
+    
+    Each request gets a proxy from the shared ProxyScorer, which weighs
+    EWMA latency, success rate and block rate for the request's domain.
+    Scores are saved to PROXY_SCORES_FILE when the spider closes.
     """
     
-    def __init__(self):
+    HEALTH_CHECK_THREADS = 10
+    HEALTH_CHECK_URL = "http://httpbin.org/ip"
+    
+    def __init__(self, settings=None):
+        settings = settings or {}
         self.logger = logging.getLogger(__name__)
         self.proxies = []
         self.working_proxies = []
         self.failed_proxies = set()
         self.proxy_stats = {}
-        self.current_proxy_index = 0
+        self.scorer = ProxyScorer.shared(settings.get('PROXY_SCORES_FILE', 'proxy_scores.json'))
         
         # Performance settings
         self.health_check_interval = 50  # Check proxy health every 50 requests
         self.request_count = 0
         self.max_failures_per_proxy = 3
         
-        # Load proxies
-        self.load_proxies()
+        # Background health checks
+        self.health_pool = None
+        self.health_check_running = False
         
-        # Test proxies on startup
-        if self.proxies:
-            self.test_proxy_health()
+        # Load proxies; all are used until the first health check reports
+        self.load_proxies()
+        self.working_proxies = list(self.proxies)
     
     @classmethod
     def from_crawler(cls, crawler):
-        middleware = cls()
+        middleware = cls(crawler.settings)
         crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
         return middleware
     
     def spider_opened(self, spider):
         self.logger.info(f"🔗 Enhanced Proxy Middleware activated for {spider.name}")
         self.logger.info(f"📊 Loaded {len(self.working_proxies)} working proxies")
+        
+        # Test proxies on startup, in the background
+        if self.proxies:
+            self.test_proxy_health()
+    
+    def spider_closed(self, spider):
+        self.scorer.save()
+        if self.health_pool:
+            self.health_pool.stop()
+            self.health_pool = None
     
     def load_proxies(self):
         """Load proxies ONLY from proxy_list.txt - NO free proxies for ScraperAPI-only mode"""
@@ -137,25 +166,71 @@ class EnhancedProxyMiddleware:
         # Remove duplicates
         self.proxies = list(set(self.proxies))
     
-    def test_proxy_health(self):
-        """Test proxy health on startup"""
+    def check_proxies(self, proxies):
+        """
+        Test proxies concurrently off the reactor thread.
+        Returns a Deferred firing with the list of proxies that passed.
+        """
+        # Imported here so loading this module never installs a reactor
+        from twisted.internet import reactor
+        
+        if self.health_pool is None:
+            self.health_pool = ThreadPool(minthreads=0, maxthreads=self.HEALTH_CHECK_THREADS, name='proxy-health')
+            self.health_pool.start()
+        
+        checks = [
+            deferToThreadPool(reactor, self.health_pool, self.test_single_proxy, proxy, self.HEALTH_CHECK_URL)
+            for proxy in proxies
+        ]
+        results = DeferredList(checks, consumeErrors=True)
+        results.addCallback(
+            lambda outcomes: [proxy for proxy, (ok, passed) in zip(proxies, outcomes) if ok and passed]
+        )
+        return results
+    
+    def run_health_check(self, proxies, on_done):
+        """Start a background check unless one is already running"""
+        if self.health_check_running or not proxies:
+            return None
+        self.health_check_running = True
         
-        self.logger.info("🔍 Testing proxy health...")
-        test_url = "http://httpbin.org/ip"
+        def finished(result):
+            self.health_check_running = False
+            return result
         
-        for proxy in self.proxies[:20]:  # Test first 20 proxies
-            if self.test_single_proxy(proxy, test_url):
-                self.working_proxies.append(proxy)
-                self.proxy_stats[proxy] = {'success': 1, 'failures': 0}
-            else:
-                self.failed_proxies.add(proxy)
+        d = self.check_proxies(proxies)
+        d.addCallback(on_done)
+        d.addErrback(lambda failure: self.logger.warning(f"⚠️ Proxy health check failed: {failure.value}"))
+        d.addBoth(finished)
+        return d
+    
+    def test_proxy_health(self):
+        """Test proxy health on startup (background; returns a Deferred)"""
         
-        self.logger.info(f"✅ {len(self.working_proxies)} proxies are working")
+        self.logger.info("🔍 Testing proxy health in the background...")
+        candidates = self.proxies[:20]  # Test first 20 proxies
         
-        # If no working proxies, add some proxies to working list anyway
-        if not self.working_proxies and self.proxies:
-            self.working_proxies = self.proxies[:10]  # Try first 10
-            self.logger.warning("⚠️ No proxies passed health check, using first 10 anyway")
+        def apply(passed):
+            working = [proxy for proxy in candidates if proxy in passed]
+            for proxy in candidates:
+                if proxy in passed:
+                    self.proxy_stats[proxy] = {'success': 1, 'failures': 0}
+                else:
+                    self.failed_proxies.add(proxy)
+            
+            self.logger.info(f"✅ {len(working)} proxies are working")
+            
+            # If no working proxies, add some proxies to working list anyway
+            if not working:
+                working = self.proxies[:10]  # Try first 10
+                self.logger.warning("⚠️ No proxies passed health check, using first 10 anyway")
+            self.set_working_proxies(working)
+        
+        return self.run_health_check(candidates, apply)
+    
+    def set_working_proxies(self, proxies):
+        """Swap in a new working set in one step"""
+        self.working_proxies = list(proxies)
     
     def test_single_proxy(self, proxy, test_url):
         """Test a single proxy"""
@@ -167,17 +242,11 @@ class EnhancedProxyMiddleware:
         except:
             return False
     
-    def get_next_proxy(self):
-        """Get next working proxy with rotation"""
-        
-        if not self.working_proxies:
-            return None
-        
-        # Round-robin with random start
-        proxy = self.working_proxies[self.current_proxy_index]
-        self.current_proxy_index = (self.current_proxy_index + 1) % len(self.working_proxies)
+    def get_next_proxy(self, domain=None, exclude=None):
+        """Get the better of two working proxies for this domain"""
         
-        return proxy
+        candidates = [p for p in self.working_proxies if p != exclude] or self.working_proxies
+        return self.scorer.choose(candidates, domain)
     
     def process_request(self, request, spider):
         """Process request with proxy"""
@@ -189,7 +258,7 @@ class EnhancedProxyMiddleware:
             return None
         
         # Get proxy
-        proxy = self.get_next_proxy()
+        proxy = self.get_next_proxy(domain_of(request.url), request.meta.get('exclude_proxy'))
         if not proxy:
             self.logger.warning("⚠️ No working proxies available")
             return None
@@ -203,7 +272,7 @@ class EnhancedProxyMiddleware:
         
         self.logger.debug(f"🔗 Using proxy: {proxy} for {request.url}")
         
-        # Periodic health check
+        # Periodic health check (runs in the background)
         if self.request_count % self.health_check_interval == 0:
             self.refresh_proxy_health()
         
@@ -214,14 +283,21 @@ class EnhancedProxyMiddleware:
         
         proxy = request.meta.get('proxy_address')
         if proxy:
+            domain = domain_of(request.url)
+            latency = request.meta.get('download_latency')
             if response.status in [200, 201, 202]:
                 # Success
+                self.scorer.record_success(proxy, domain, latency)
                 if proxy in self.proxy_stats:
                     self.proxy_stats[proxy]['success'] += 1
                     # Reset failures on success
                     self.proxy_stats[proxy]['failures'] = 0
             else:
                 # Failure
+                if response.status in [403, 429]:
+                    self.scorer.record_block(proxy, domain, latency)
+                else:
+                    self.scorer.record_failure(proxy, domain, latency)
                 self.handle_proxy_failure(proxy, response.status)
         
         return response
@@ -231,6 +307,7 @@ class EnhancedProxyMiddleware:
         
         proxy = request.meta.get('proxy_address')
         if proxy:
+            self.scorer.record_failure(proxy, domain_of(request.url))
             self.handle_proxy_failure(proxy, f"Exception: {exception}")
         
         return None
@@ -253,41 +330,46 @@ class EnhancedProxyMiddleware:
         """Remove failed proxy from working list"""
         
         if proxy in self.working_proxies:
-            self.working_proxies.remove(proxy)
+            self.set_working_proxies([p for p in self.working_proxies if p != proxy])
             self.failed_proxies.add(proxy)
             self.logger.warning(f"🚫 Removed failed proxy: {proxy}")
-            
-            # Adjust current index if needed
-            if self.current_proxy_index >= len(self.working_proxies) and self.working_proxies:
-                self.current_proxy_index = 0
     
     def refresh_proxy_health(self):
-        """Refresh proxy health periodically"""
+        """Refresh proxy health periodically (background; returns a Deferred)"""
         
         self.logger.info("🔄 Refreshing proxy health...")
         
         # Test a few failed proxies to see if they're working again
         failed_to_test = list(self.failed_proxies)[:5]
-        for proxy in failed_to_test:
-            if self.test_single_proxy(proxy, "http://httpbin.org/ip"):
-                self.failed_proxies.remove(proxy)
-                self.working_proxies.append(proxy)
+        
+        def apply(restored):
+            restored = [proxy for proxy in restored if proxy in self.failed_proxies]
+            for proxy in restored:
+                self.failed_proxies.discard(proxy)
                 self.proxy_stats[proxy] = {'success': 1, 'failures': 0}
                 self.logger.info(f"✅ Restored proxy: {proxy}")
+            self.set_working_proxies(self.working_proxies + restored)
+            self.logger.info(f"📊 Working proxies: {len(self.working_proxies)}")
         
-        self.logger.info(f"📊 Working proxies: {len(self.working_proxies)}")
+        return self.run_health_check(failed_to_test, apply)
 
 
-class ProxyRetryMiddleware(RetryMiddleware):
+class ProxyRetryMiddleware(BackoffRetryMiddleware):
     """
     Enhanced retry middleware that works with proxy rotation
+    
+    Retries wait out an exponential backoff without blocking (see
+    BackoffRetryMiddleware). After a proxy error or connection failure the
+    retry is sent with meta['exclude_proxy'] so EnhancedProxyMiddleware
+    picks a different proxy instead of repeating the failure.
     """
     
+    PROXY_ERROR_CODES = [407, 502, 503, 504]
+    
     def __init__(self, settings):
         super().__init__(settings)
-        self.logger = logging.getLogger(__name__)
         # Define exceptions to retry
-        self.EXCEPTIONS_TO_RETRY = (
+        self.exceptions_to_retry = (
             ConnectionRefusedError,
             ConnectionResetError,
             TimeoutError,
@@ -295,28 +377,33 @@ class ProxyRetryMiddleware(RetryMiddleware):
             Exception  # Catch-all for proxy-related errors
         )
     
-    def process_response(self, request, response, spider):
+    def process_response(self, request, response, spider=None):
         """Process response with proxy-aware retry logic"""
         
-        if response.status in self.retry_http_codes:
-            reason = response_status_message(response.status)
-            
-            # For proxy-related errors, try different proxy
-            if response.status in [407, 502, 503, 504]:
-                self.logger.info(f"🔄 Proxy error {response.status}, will retry with different proxy")
-                # Force proxy rotation on next request
-                request.meta.pop('proxy_address', None)
-            
-            return self._retry(request, reason, spider) or response
+        retry = super().process_response(request, response, spider)
         
-        return response
+        # For proxy-related errors, try different proxy
+        if retry is not response and response.status in self.PROXY_ERROR_CODES:
+            self.logger.info(f"🔄 Proxy error {response.status}, will retry with different proxy")
+            self.switch_proxy(request, retry)
+        
+        return retry
     
-    def process_exception(self, request, exception, spider):
+    def process_exception(self, request, exception, spider=None):
         """Process exception with proxy-aware retry logic"""
         
-        if isinstance(exception, self.EXCEPTIONS_TO_RETRY):
+        retry = super().process_exception(request, exception, spider)
+        
+        if retry is not None:
             # For connection errors, try different proxy
             self.logger.info(f"🔄 Connection error, will retry with different proxy: {exception}")
-            request.meta.pop('proxy_address', None)
-            
-            return self._retry(request, str(exception), spider)
+            self.switch_proxy(request, retry)
+        
+        return retry
+    
+    def switch_proxy(self, request, retry):
+        failed_proxy = request.meta.get('proxy_address')
+        retry.meta.pop('proxy_address', None)
+        retry.meta.pop('proxy', None)
+        if failed_proxy:
+            retry.meta['exclude_proxy'] = failed_proxy
@@ -1,23 +1,28 @@
 import random
 import requests
 import logging
+from scrapy import signals
 from scrapy.downloadermiddlewares.retry import RetryMiddleware
 from scrapy.utils.response import response_status_message
 
+from .proxy_scorer import DIRECT, ProxyScorer, domain_of
+
 
 class ProxyRotationMiddleware:
     """
     Proxy rotation middleware for IP rotation to bypass anti-bot detection
     Supports both free and premium proxy providers
+    Proxies are picked by the shared ProxyScorer
     """
     
     def __init__(self, crawler):
         self.crawler = crawler
         self.settings = crawler.settings
         self.proxy_list = []
-        self.current_proxy_index = 0
         self.failed_proxies = set()
+        self.scorer = ProxyScorer.shared(self.settings.get('PROXY_SCORES_FILE', 'proxy_scores.json'))
         self.logger = logging.getLogger(__name__)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
         
         # Load proxies from settings or external source
         self.load_proxies()
@@ -30,6 +35,9 @@ class ProxyRotationMiddleware:
     def from_crawler(cls, crawler):
         return cls(crawler)
     
+    def spider_closed(self, spider):
+        self.scorer.save()
+    
     def load_proxies(self):
         """Load proxy list from various sources"""
         
@@ -74,8 +82,8 @@ class ProxyRotationMiddleware:
         except Exception as e:
             self.logger.error(f"Failed to load free proxies: {e}")
     
-    def get_random_proxy(self):
-        """Get a random proxy that hasn't failed"""
+    def get_random_proxy(self, domain=None):
+        """Get the better of two proxies that haven't failed"""
         available_proxies = [p for p in self.proxy_list if p not in self.failed_proxies]
         
         if not available_proxies:
@@ -84,9 +92,7 @@ class ProxyRotationMiddleware:
             available_proxies = self.proxy_list
             self.logger.warning("All proxies failed, resetting failed proxy list")
         
-        if available_proxies:
-            return random.choice(available_proxies)
-        return None
+        return self.scorer.choose(available_proxies, domain)
     
     def process_request(self, request, spider):
         """Apply proxy rotation to requests"""
@@ -99,7 +105,7 @@ class ProxyRotationMiddleware:
         if (self.request_count % self.rotate_after_requests == 0 or 
             'proxy' not in request.meta):
             
-            proxy = self.get_random_proxy()
+            proxy = self.get_random_proxy(domain_of(request.url))
             if proxy:
                 request.meta['proxy'] = proxy
                 self.logger.debug(f"Using proxy: {proxy}")
@@ -109,24 +115,40 @@ class ProxyRotationMiddleware:
     def process_response(self, request, response, spider):
         """Handle response and mark failed proxies"""
         
+        proxy = request.meta.get('proxy')
+        domain = domain_of(request.url)
+        latency = request.meta.get('download_latency')
+        
         # Check if proxy failed
         if response.status in [403, 407, 429, 503]:
-            proxy = request.meta.get('proxy')
             if proxy:
+                if response.status in [403, 429]:
+                    self.scorer.record_block(proxy, domain, latency)
+                else:
+                    self.scorer.record_failure(proxy, domain, latency)
                 self.failed_proxies.add(proxy)
                 self.logger.warning(f"Proxy failed: {proxy} (Status: {response.status})")
                 
                 # Retry with different proxy
                 return self.retry_with_new_proxy(request, spider)
+        elif proxy:
+            self.scorer.record_success(proxy, domain, latency)
         
         return response
     
+    def process_exception(self, request, exception, spider):
+        """Count connection errors against the proxy"""
+        proxy = request.meta.get('proxy')
+        if proxy:
+            self.scorer.record_failure(proxy, domain_of(request.url))
+        return None
+    
     def retry_with_new_proxy(self, request, spider):
         """Retry request with a new proxy"""
         retries = request.meta.get('retry_times', 0) + 1
         
         if retries <= self.crawler.settings.getint('RETRY_TIMES', 2):
-            new_proxy = self.get_random_proxy()
+            new_proxy = self.get_random_proxy(domain_of(request.url))
             if new_proxy:
                 retry_req = request.copy()
                 retry_req.meta['proxy'] = new_proxy
@@ -143,19 +165,18 @@ class SmartProxyMiddleware:
     """
     Smart proxy middleware that automatically detects and switches between
     direct connection and proxy based on success rates
+    
+    The direct connection is scored as a pseudo-proxy by the same
+    ProxyScorer as the proxies, per domain, so each request goes out the
+    better of direct and the proxy picked for it.
     """
     
     def __init__(self, crawler):
         self.crawler = crawler
         self.settings = crawler.settings
         self.proxy_middleware = ProxyRotationMiddleware(crawler)
+        self.scorer = self.proxy_middleware.scorer
         self.use_proxy = True
-        self.direct_success_rate = 0.0
-        self.proxy_success_rate = 0.0
-        self.request_count = 0
-        self.direct_success_count = 0
-        self.proxy_success_count = 0
-        self.evaluation_interval = 50  # Evaluate every 50 requests
         self.logger = logging.getLogger(__name__)
     
     @classmethod
@@ -164,59 +185,48 @@ class SmartProxyMiddleware:
     
     def process_request(self, request, spider):
         """Decide whether to use proxy or direct connection"""
-        self.request_count += 1
+        if not self.proxy_middleware.proxy_list:
+            return None
         
-        # Evaluate success rates periodically
-        if self.request_count % self.evaluation_interval == 0:
-            self.evaluate_success_rates()
+        domain = domain_of(request.url)
+        proxy = request.meta.get('proxy') or self.proxy_middleware.get_random_proxy(domain)
+        use_proxy = self.scorer.choose([DIRECT, proxy], domain) != DIRECT
         
-        # Apply proxy if enabled
-        if self.use_proxy and self.proxy_middleware.proxy_list:
-            return self.proxy_middleware.process_request(request, spider)
+        if use_proxy != self.use_proxy:
+            self.use_proxy = use_proxy
+            if use_proxy:
+                self.logger.info(f"Using proxy rotation for {domain} (score: {self.scorer.score(proxy, domain):.2f})")
+            else:
+                self.logger.info(f"Switching to direct connection for {domain} (score: {self.scorer.score(DIRECT, domain):.2f})")
         
+        if use_proxy:
+            request.meta['proxy'] = proxy
+        else:
+            request.meta.pop('proxy', None)
         return None
     
     def process_response(self, request, response, spider):
         """Track success rates and handle responses"""
-        is_success = response.status == 200 and len(response.body) > 1000
-        
-        # Track success rates
-        if 'proxy' in request.meta:
-            if is_success:
-                self.proxy_success_count += 1
-        else:
-            if is_success:
-                self.direct_success_count += 1
         
         # Handle proxy responses
         if 'proxy' in request.meta:
             return self.proxy_middleware.process_response(request, response, spider)
         
-        return response
-    
-    def evaluate_success_rates(self):
-        """Evaluate which method (direct/proxy) is more successful"""
-        if self.request_count < self.evaluation_interval:
-            return
-        
-        # Calculate success rates
-        total_requests = self.evaluation_interval
-        proxy_requests = min(total_requests // 2, len(self.proxy_middleware.proxy_list))
-        direct_requests = total_requests - proxy_requests
-        
-        if proxy_requests > 0:
-            self.proxy_success_rate = self.proxy_success_count / proxy_requests
-        if direct_requests > 0:
-            self.direct_success_rate = self.direct_success_count / direct_requests
-        
-        # Decide which method to use
-        if self.direct_success_rate > self.proxy_success_rate + 0.1:  # 10% threshold
-            self.use_proxy = False
-            self.logger.info(f"Switching to direct connection (success rate: {self.direct_success_rate:.2%})")
+        domain = domain_of(request.url)
+        latency = request.meta.get('download_latency')
+        if response.status == 200 and len(response.body) > 1000:
+            self.scorer.record_success(DIRECT, domain, latency)
+        elif response.status in [200, 403, 429]:
+            # A near-empty 200 is usually a block page
+            self.scorer.record_block(DIRECT, domain, latency)
         else:
-            self.use_proxy = True
-            self.logger.info(f"Using proxy rotation (success rate: {self.proxy_success_rate:.2%})")
+            self.scorer.record_failure(DIRECT, domain, latency)
         
-        # Reset counters
-        self.proxy_success_count = 0
-        self.direct_success_count = 0
\ No newline at end of file
+        return response
+    
+    def process_exception(self, request, exception, spider):
+        """Count connection errors against direct or the proxy used"""
+        if 'proxy' in request.meta:
+            return self.proxy_middleware.process_exception(request, exception, spider)
+        self.scorer.record_failure(DIRECT, domain_of(request.url))
+        return None
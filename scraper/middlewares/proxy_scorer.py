@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Shared proxy scoring for all proxy middlewares
+Tracks EWMA latency, success rate and block rate per (proxy, domain)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Pseudo-proxy used to score direct connections against proxies
+DIRECT = 'direct'
+
+# Stats that cover every domain a proxy has been used for
+ANY_DOMAIN = '*'
+
+
+def proxy_key(proxy):
+    """Key a proxy by host:port so credentials never end up in the scores file"""
+    if proxy == DIRECT:
+        return DIRECT
+    address = proxy.split('://', 1)[-1]
+    if '@' not in address:
+        return address
+    credentials, host = address.rsplit('@', 1)
+    # Same host with different credentials (e.g. ScraperAPI sessions) stays distinct
+    return f"{host}#{hashlib.sha1(credentials.encode('utf-8')).hexdigest()[:8]}"
+
+
+def domain_of(url):
+    return urlparse(url).netloc or ANY_DOMAIN
+
+
+class ProxyScorer:
+    """
+    One score per (proxy, domain), kept as exponentially weighted moving
+    averages so recent requests count most:
+
+        score = success_rate * (1 - block_rate) / (1 + latency / LATENCY_SCALE)
+
+    choose() uses power-of-two-choices: two random candidates are compared
+    and the better one wins. Fast, healthy proxies get most of the traffic
+    without every request piling onto the single best one, and untried
+    proxies start from an optimistic prior so they get sampled.
+
+    A domain with no history falls back to the proxy's stats over all
+    domains. Stats drift back to the prior as they age, so a proxy that
+    failed yesterday gets another chance today. Scores persist in a JSON
+    file between runs.
+
+    Middlewares get their scorer from ProxyScorer.shared(path), so every
+    crawler in a process feeds and reads one instance per scores file.
+    save() merges with the file's current contents, newest stats winning,
+    so separate processes don't overwrite each other's updates either.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    ALPHA = 0.3                # Weight of the newest observation
+    LATENCY_SCALE = 2.0        # Seconds of latency that halve a score
+    PRIOR = {'success': 1.0, 'block': 0.0, 'latency': 1.0}
+    RECOVERY_HALF_LIFE = 1800  # Seconds for old stats to move halfway back to the prior
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.scores = {}
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self.load()
+
+    @classmethod
+    def shared(cls, path):
+        """The process-wide scorer for a scores file"""
+        key = str(Path(path).resolve()) if path else None
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(path)
+            return cls._shared[key]
+
+    def read_file(self):
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('proxies', {})
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ Could not load proxy scores: {e}")
+            return {}
+
+    def load(self):
+        self.scores = self.read_file()
+
+    def merge(self, scores):
+        """Take (proxy, domain) stats from scores where they are newer than ours"""
+        for key, domains in scores.items():
+            mine = self.scores.setdefault(key, {})
+            for name, stats in domains.items():
+                if stats.get('updated', 0) > mine.get(name, {}).get('updated', 0):
+                    mine[name] = stats
+
+    def save(self):
+        if not self.path:
+            return
+        on_disk = self.read_file()
+        with self.lock:
+            self.merge(on_disk)
+            payload = json.dumps({'proxies': self.scores}, ensure_ascii=False, indent=2)
+        tmp_path = self.path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"⚠️ Could not save proxy scores: {e}")
+
+    def record_success(self, proxy, domain=None, latency=None):
+        self.record(proxy, domain, success=1.0, block=0.0, latency=latency)
+
+    def record_failure(self, proxy, domain=None, latency=None):
+        """Connection errors, timeouts and proxy errors"""
+        self.record(proxy, domain, success=0.0, block=0.0, latency=latency)
+
+    def record_block(self, proxy, domain=None, latency=None):
+        """The site answered, but with a ban, captcha or rate limit"""
+        self.record(proxy, domain, success=0.0, block=1.0, latency=latency)
+
+    def record(self, proxy, domain, success, block, latency=None):
+        if not proxy:
+            return
+        key = proxy_key(proxy)
+        now = time.time()
+        with self.lock:
+            domains = self.scores.setdefault(key, {})
+            for name in {domain or ANY_DOMAIN, ANY_DOMAIN}:
+                stats = domains.setdefault(name, dict(self.PRIOR, samples=0, updated=now))
+                # Age the stats towards the prior first, as score() sees them
+                stats.update(self.decayed(stats, now))
+                stats['success'] += self.ALPHA * (success - stats['success'])
+                stats['block'] += self.ALPHA * (block - stats['block'])
+                if latency is not None:
+                    stats['latency'] += self.ALPHA * (latency - stats['latency'])
+                stats['samples'] += 1
+                stats['updated'] = now
+
+    def score(self, proxy, domain=None):
+        with self.lock:
+            domains = self.scores.get(proxy_key(proxy), {})
+            stats = domains.get(domain or ANY_DOMAIN) or domains.get(ANY_DOMAIN)
+            stats = self.PRIOR if stats is None else self.decayed(stats, time.time())
+        return stats['success'] * (1 - stats['block']) / (1 + stats['latency'] / self.LATENCY_SCALE)
+
+    def decayed(self, stats, now):
+        """stats blended back towards the prior by their age"""
+        age = max(0.0, now - stats['updated'])
+        weight = 0.5 ** (age / self.RECOVERY_HALF_LIFE)
+        return {name: self.PRIOR[name] + weight * (stats[name] - self.PRIOR[name])
+                for name in self.PRIOR}
+
+    def choose(self, candidates, domain=None):
+        """Power-of-two-choices pick among candidates; None when there are none"""
+        candidates = list(candidates)
+        if len(candidates) < 2:
+            return candidates[0] if candidates else None
+        first, second = random.sample(candidates, 2)
+        return first if self.score(first, domain) >= self.score(second, domain) else second
+
+    def summary(self, candidates, domain=None):
+        """Candidates with their scores, best first, for logging"""
+        return sorted(((proxy, round(self.score(proxy, domain), 3)) for proxy in candidates),
+                      key=lambda item: item[1], reverse=True)
@@ -2,7 +2,9 @@ import random
 import time
 import logging
 from scrapy import signals
-from scrapy.downloadermiddlewares.retry import RetryMiddleware
+from .backoff_retry_middleware import BackoffRetryMiddleware
+
+from utils.block_detector import block_reason
 
 try:
     from .simple_antibot import simple_antibot
@@ -16,6 +18,16 @@ class ScrapySimpleAntiBot:
     """
     Scrapy middleware using simple but effective anti-bot protection
     Focus on proven techniques without complex proxy management
+    
+    Delays follow SimpleAntiBot's model (current_delay, eased on success,
+    raised on failure/blocks) but are kept per domain and set as the delay
+    of that domain's downloader slot, so Scrapy spaces its requests. A
+    blocked domain's slot is held for the 10-30s cool-down; nothing waits
+    in this middleware, so other domains keep their download slots.
+    
+    With ADAPTIVE_CONCURRENCY_ENABLED the AdaptiveConcurrency extension
+    owns per-domain pacing; only the cool-down after a block is applied
+    here, by raising the slot's delay until the cool-down ends.
     """
     
     def __init__(self, crawler):
@@ -23,6 +35,10 @@ class ScrapySimpleAntiBot:
         self.settings = crawler.settings
         self.logger = logging.getLogger(__name__)
         
+        # slot key -> current_delay, consecutive_failures, cool_until (monotonic end of a block cool-down)
+        self.domain_delays = {}
+        self.pace_requests = not self.settings.getbool('ADAPTIVE_CONCURRENCY_ENABLED')
+        
         if SIMPLE_ANTIBOT_AVAILABLE:
             self.antibot = simple_antibot
             self.use_antibot = True
@@ -44,6 +60,10 @@ class ScrapySimpleAntiBot:
         middleware = cls(crawler)
         crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
         crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        # Connected after AdaptiveConcurrency's (extensions load first), so a
+        # cool-down overrides the delay it sets
+        crawler.signals.connect(middleware.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(middleware.response_downloaded, signal=signals.response_downloaded)
         return middleware
     
     def spider_opened(self, spider):
@@ -59,17 +79,64 @@ class ScrapySimpleAntiBot:
             self.logger.info(f"   Total requests: {stats['total_requests']}")
             self.logger.info(f"   Success rate: {stats['success_rate']:.2%}")
             self.logger.info(f"   Blocked requests: {stats['blocked_requests']}")
-            self.logger.info(f"   Final delay: {stats['current_delay']:.1f}s")
+            for domain, state in self.domain_delays.items():
+                self.logger.info(f"   Final delay for {domain}: {state['current_delay']:.1f}s")
+    
+    def _slot_key(self, request):
+        return request.meta.get('download_slot') or self.crawler.engine.downloader.get_slot_key(request)
+    
+    def _domain_state(self, request):
+        domain = self._slot_key(request)
+        state = self.domain_delays.get(domain)
+        if state is None:
+            base_delay = self.antibot.base_delay if self.use_antibot else self.base_delay
+            state = {'current_delay': base_delay, 'consecutive_failures': 0, 'cool_until': 0.0}
+            self.domain_delays[domain] = state
+        return domain, state
+    
+    def _slot_delay(self, state, slot_delay):
+        """Delay for the domain's slot: its pace, held up to the end of a block cool-down"""
+        if self.pace_requests:
+            if self.use_antibot:
+                slot_delay = self.antibot.compute_delay(state['current_delay'])
+            else:
+                slot_delay = random.uniform(self.base_delay * 0.8, self.base_delay * 1.2)
+        return max(slot_delay, state['cool_until'] - time.monotonic())
     
-    def process_request(self, request, spider):
+    def _apply(self, domain, state):
+        slot = self.crawler.engine.downloader.slots.get(domain)
+        if slot is not None:
+            slot.delay = self._slot_delay(state, slot.delay)
+    
+    def request_reached_downloader(self, request, spider=None):
+        # The slot exists by now and hasn't sent the request yet
+        self._apply(*self._domain_state(request))
+    
+    def response_downloaded(self, response, request, spider=None):
+        """Adjust the domain's delay before its slot sends the next request"""
+        domain, state = self._domain_state(request)
+        if self.use_antibot:
+            reason = block_reason(response)
+            if reason:
+                # Refresh the session and back off this domain only
+                extended_delay = self.antibot.register_block(request.url)
+                state['consecutive_failures'] += 1
+                state['current_delay'] = self.antibot.delay_after_block(state['current_delay'])
+                state['cool_until'] = max(state['cool_until'], time.monotonic() + extended_delay)
+                self.logger.info(f"😴 Backing off {domain} for {extended_delay:.0f} seconds due to blocking")
+            else:
+                self.antibot.success_count += 1
+                self.antibot.consecutive_failures = 0
+                state['consecutive_failures'] = 0
+                state['current_delay'] = self.antibot.delay_after_success(state['current_delay'])
+        self._apply(domain, state)
+    
+    def process_request(self, request, spider=None):
         """Apply anti-bot protection to request"""
         
         if self.use_antibot:
             # Use simple antibot system
             
-            # Apply smart delay (done in antibot.smart_delay())
-            self.antibot.smart_delay()
-            
             # Set realistic headers
             headers = {
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
@@ -111,40 +178,18 @@ class ScrapySimpleAntiBot:
             # Fallback protection
             self.request_count += 1
             
-            # Basic delay
-            delay = random.uniform(self.base_delay * 0.8, self.base_delay * 1.2)
-            time.sleep(delay)
-            
             # Basic user agent rotation
             if self.request_count % 20 == 0:
                 request.headers['User-Agent'] = random.choice(self.user_agents)
         
         return None
     
-    def process_response(self, request, response, spider):
-        """Handle response and detect blocking"""
-        
-        if self.use_antibot:
-            # Use antibot's blocking detection
-            if self.antibot.is_blocked(response):
-                self.logger.warning(f"🚫 Blocking detected by SimpleAntiBot: {request.url}")
-                
-                # Handle blocking (this will apply delays and refresh session)
-                self.antibot.handle_blocked_response(request.url)
-                
-                # Create retry request
-                return self._create_retry_request(request, response, "SimpleAntiBot detected blocking")
-            
-            # Update success count
-            self.antibot.success_count += 1
-            self.antibot.consecutive_failures = 0
-            self.antibot.adjust_delay_on_success()
-        
-        else:
-            # Fallback blocking detection
-            if self._is_blocked_fallback(response):
-                self.logger.warning(f"🚫 Basic blocking detection: {request.url}")
-                return self._create_retry_request(request, response, "Basic blocking detection")
+    def process_response(self, request, response, spider=None):
+        """Retry blocked responses; the domain's back-off was set in response_downloaded"""
+        reason = block_reason(response)
+        if reason:
+            self.logger.warning(f"🚫 Blocking detected ({reason}): {request.url}")
+            return self._create_retry_request(request, response, f"blocked: {reason}")
         
         return response
     
@@ -163,40 +208,14 @@ class ScrapySimpleAntiBot:
         else:
             self.logger.error(f"❌ Max retries exceeded for {request.url}")
             return response
-    
-    def _is_blocked_fallback(self, response):
-        """Fallback blocking detection"""
-        if response.status in [403, 429, 503]:
-            return True
-        
-        if len(response.body) < 5000:
-            return True
-        
-        content = response.body.lower()
-        return any(keyword.encode() in content for keyword in [
-            'access denied', 'forbidden', 'captcha', 'robot', 'blocked'
-        ])
 
 
-class EnhancedRetryMiddleware(RetryMiddleware):
+class EnhancedRetryMiddleware(BackoffRetryMiddleware):
     """
     Enhanced retry middleware with exponential backoff
+    Backs off on 403/429/503 without blocking the reactor (see BackoffRetryMiddleware)
     """
     
     def __init__(self, settings):
         super().__init__(settings)
-        self.logger = logging.getLogger(__name__)
-    
-    def process_response(self, request, response, spider):
-        if response.status in [403, 429, 503]:
-            retries = request.meta.get('retry_times', 0)
-            
-            # Exponential backoff
-            backoff_delay = min(2 ** retries, 60)  # Max 60 seconds
-            jitter = random.uniform(0.5, 1.5)
-            total_delay = backoff_delay * jitter
-            
-            self.logger.info(f"⏱️ Enhanced retry backoff: {total_delay:.1f}s for {request.url}")
-            time.sleep(total_delay)
-        
-        return super().process_response(request, response, spider)
+        self.backoff_max = settings.getfloat('RETRY_BACKOFF_MAX', 60)
@@ -1,89 +1,355 @@
 """
 Selenium middleware for handling JavaScript-rendered pages
+Renders pages on a pool of headless Chrome workers without blocking the reactor
 """
+from datetime import datetime
+from pathlib import Path
+from queue import Queue
+from urllib.parse import urlparse
+import json
+import logging
+import re
+import time
+
 from scrapy import signals
 from scrapy.http import HtmlResponse
+from scrapy.utils.defer import maybe_deferred_to_future
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
-import logging
+from selenium.common.exceptions import TimeoutException
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
 
-class SeleniumMiddleware:
-    def __init__(self):
+# Resources the pages don't need for their data
+BLOCKED_RESOURCE_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.css',
+]
+
+# Markers of a page that only renders its content client-side
+DEFAULT_JS_MARKERS = [
+    'Please enable JavaScript',
+    'You need to enable JavaScript',
+    '<div id="app"></div>',
+    '<div id="root"></div>',
+]
+
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def url_pattern(url):
+    """Render decisions are shared by URLs that differ only in ids and query"""
+    parsed = urlparse(url)
+    return f"{parsed.netloc}{_DIGITS_RE.sub('{n}', parsed.path)}"
+
+
+class BrowserWorker:
+    """
+    One headless Chrome, recycled after max_pages renders. When Chrome
+    fails to start, the worker waits start_backoff seconds before trying
+    again, doubling per consecutive failure up to start_backoff_max.
+    """
+
+    def __init__(self, worker_id, max_pages, block_resources, start_backoff=30, start_backoff_max=600):
+        self.worker_id = worker_id
+        self.max_pages = max_pages
+        self.block_resources = block_resources
+        self.start_backoff = start_backoff
+        self.start_backoff_max = start_backoff_max
         self.driver = None
+        self.pages = 0
+        self.start_failures = 0
+        self.retry_at = 0.0  # time.monotonic() before which Chrome is not started again
+
+    def start(self):
+        chrome_options = Options()
+        chrome_options.add_argument('--headless')  # Run in background
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--window-size=1920,1080')
+        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        if self.block_resources:
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+                'profile.managed_default_content_settings.fonts': 2,
+            })
+
+        self.driver = webdriver.Chrome(options=chrome_options)
+        if self.block_resources:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_RESOURCE_PATTERNS})
+        self.pages = 0
+
+    def can_render(self):
+        return self.driver is not None or time.monotonic() >= self.retry_at
+
+    def ensure_started(self):
+        if self.driver is None or self.pages >= self.max_pages:
+            self.quit()
+            try:
+                self.start()
+            except Exception:
+                self.start_failures += 1
+                backoff = min(self.start_backoff * 2 ** (self.start_failures - 1), self.start_backoff_max)
+                self.retry_at = time.monotonic() + backoff
+                raise
+            self.start_failures = 0
+
+    def quit(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+
+class SeleniumMiddleware:
+    """
+    Dispatches JS pages to SELENIUM_POOL_SIZE Chrome workers on a thread
+    pool and awaits them through Deferreds, so other requests keep flowing
+    while pages render.
+
+    A page is ready once document.readyState is complete, the rows selector
+    (meta['wait_for'] or SELENIUM_READY_SELECTOR) is present and the row
+    count has stopped changing. Images, fonts and CSS are not loaded, and
+    each browser is restarted after SELENIUM_MAX_PAGES_PER_BROWSER pages.
+    A worker whose Chrome fails to start sits out SELENIUM_START_BACKOFF
+    seconds (doubling, up to SELENIUM_START_BACKOFF_MAX) while the other
+    workers keep rendering; only when every worker is sitting out does a
+    page fall back to its plain HTTP response.
+
+    Pages on SELENIUM_DOMAINS are first fetched over plain HTTP. Only when
+    the rows XPath (meta['rows_xpath'], else the ready selector) matches
+    nothing, or the body carries a "needs JS" marker, is the page rendered.
+    The outcome is remembered per URL pattern in SELENIUM_RENDER_DECISIONS_FILE
+    so later pages of that pattern go straight to the right tier. A 'js'
+    decision older than SELENIUM_RENDER_DECISION_TTL seconds is probed
+    over plain HTTP again, so a site that drops client-side rendering
+    returns to the cheap tier.
+    """
+
+    def __init__(self, settings=None):
+        settings = settings or {}
+        self.pool_size = int(settings.get('SELENIUM_POOL_SIZE', 2))
+        self.max_pages_per_browser = int(settings.get('SELENIUM_MAX_PAGES_PER_BROWSER', 50))
+        self.wait_timeout = float(settings.get('SELENIUM_WAIT_TIMEOUT', 10))
+        self.ready_selector = settings.get('SELENIUM_READY_SELECTOR', '.transaction-row, tbody tr, table tr')
+        self.block_resources = bool(settings.get('SELENIUM_BLOCK_RESOURCES', True))
+        self.domains = list(settings.get('SELENIUM_DOMAINS', ['midlandici.com']))
+        self.js_markers = list(settings.get('SELENIUM_JS_MARKERS', DEFAULT_JS_MARKERS))
+        self.decisions_file = Path(settings.get('SELENIUM_RENDER_DECISIONS_FILE', 'render_decisions.json'))
+        self.decision_ttl = float(settings.get('SELENIUM_RENDER_DECISION_TTL', 7 * 24 * 3600))
+        self.start_backoff = float(settings.get('SELENIUM_START_BACKOFF', 30))
+        self.start_backoff_max = float(settings.get('SELENIUM_START_BACKOFF_MAX', 600))
+        self.decisions = self.load_decisions()
+        self.stats = None
+        self.workers = Queue()
+        self.all_workers = []
+        self.threadpool = None
         self.logger = logging.getLogger(__name__)
-        
+
     @classmethod
     def from_crawler(cls, crawler):
-        middleware = cls()
+        middleware = cls(crawler.settings)
+        middleware.stats = crawler.stats
         crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
         crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
         return middleware
-    
+
     def spider_opened(self, spider):
-        """Initialize Chrome driver when spider opens"""
-        try:
-            chrome_options = Options()
-            chrome_options.add_argument('--headless')  # Run in background
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-            
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.logger.info("🚗 Chrome driver initialized for JavaScript sites")
-        except Exception as e:
-            self.logger.error(f"❌ Failed to initialize Chrome driver: {e}")
-            self.driver = None
-    
+        """Start the worker threads; browsers launch lazily on first use"""
+        self.threadpool = ThreadPool(minthreads=0, maxthreads=self.pool_size, name='selenium')
+        self.threadpool.start()
+        for worker_id in range(self.pool_size):
+            worker = BrowserWorker(worker_id, self.max_pages_per_browser, self.block_resources,
+                                   self.start_backoff, self.start_backoff_max)
+            self.all_workers.append(worker)
+            self.workers.put(worker)
+        self.logger.info(f"🚗 Selenium pool ready: {self.pool_size} Chrome workers "
+                         f"(recycled every {self.max_pages_per_browser} pages)")
+
     def spider_closed(self, spider):
-        """Close driver when spider closes"""
-        if self.driver:
-            self.driver.quit()
-            self.logger.info("🚗 Chrome driver closed")
-    
-    def process_request(self, request, spider):
+        """Close all drivers when spider closes"""
+        for worker in self.all_workers:
+            worker.quit()
+        if self.threadpool:
+            self.threadpool.stop()
+        self.save_decisions()
+        self.logger.info("🚗 Chrome drivers closed")
+
+    def load_decisions(self):
+        if not self.decisions_file.exists():
+            return {}
+        try:
+            with open(self.decisions_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('patterns', {})
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ Could not load render decisions: {e}")
+            return {}
+
+    def save_decisions(self):
+        try:
+            with open(self.decisions_file, 'w', encoding='utf-8') as f:
+                json.dump({'patterns': self.decisions}, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            self.logger.warning(f"⚠️ Could not save render decisions: {e}")
+
+    def remember(self, request, mode):
+        pattern = url_pattern(request.url)
+        if self.decisions.get(pattern, {}).get('mode') != mode:
+            self.logger.info(f"🧭 {pattern} -> {'browser' if mode == 'js' else 'plain HTTP'}")
+        self.decisions[pattern] = {'mode': mode, 'updated_at': datetime.now().isoformat()}
+
+    def is_js_site(self, request):
+        return any(domain in request.url for domain in self.domains) and not request.meta.get('dont_render')
+
+    def needs_rendering(self, request):
+        """Render up front only when forced or this URL pattern needed JS before"""
+        if request.meta.get('force_render'):
+            return True
+        decision = self.decisions.get(url_pattern(request.url), {})
+        if decision.get('mode') != 'js':
+            return False
+        try:
+            age = (datetime.now() - datetime.fromisoformat(decision['updated_at'])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            return True
+        # Stale: fetch over plain HTTP once more; process_response escalates if still needed
+        return age < self.decision_ttl
+
+    async def process_request(self, request, spider=None):
         """Process requests for JavaScript sites"""
-        # Only use Selenium for Midland ICI
-        if 'midlandici.com' not in request.url:
+        # Only use Selenium for configured JS sites (Midland ICI)
+        if not self.is_js_site(request) or not self.needs_rendering(request):
             return None
-            
-        if not self.driver:
+        return await self.render_response(request)
+
+    async def process_response(self, request, response, spider=None):
+        """Escalate plain HTTP responses that came back without rows"""
+        if not self.is_js_site(request) or request.meta.get('rendered'):
+            return response
+        if response.status != 200 or not hasattr(response, 'xpath'):
+            return response
+
+        if self.has_rows(request, response) and not self.has_js_marker(response):
+            self.remember(request, 'http')
+            self.inc_stat('render/plain_http')
+            return response
+
+        self.remember(request, 'js')
+        self.inc_stat('render/escalated')
+        rendered = await self.render_response(request)
+        return rendered or response
+
+    def has_rows(self, request, response):
+        rows_xpath = request.meta.get('rows_xpath')
+        if rows_xpath:
+            return bool(response.xpath(rows_xpath))
+        return bool(response.css(request.meta.get('wait_for', self.ready_selector)))
+
+    def has_js_marker(self, response):
+        return any(marker in response.text for marker in self.js_markers)
+
+    def inc_stat(self, key):
+        if self.stats:
+            self.stats.inc_value(key)
+
+    async def render_response(self, request):
+        """Render in the browser pool; None when no browser is available or it fails"""
+        if self.threadpool is None:
             self.logger.warning("⚠️ Chrome driver not available, skipping Selenium request")
             return None
-            
+
+        # Imported here so loading this module never installs a reactor
+        from twisted.internet import reactor
+
+        wait_for = request.meta.get('wait_for', self.ready_selector)
         try:
             self.logger.info(f"🔍 Loading JavaScript page: {request.url}")
-            self.driver.get(request.url)
-            
-            # Wait for the transaction table to load
-            wait = WebDriverWait(self.driver, 10)
-            
-            try:
-                # Wait for transaction data to appear
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".transaction-row, tbody tr, table tr")))
-                self.logger.info("✅ Transaction data loaded")
-            except Exception:
-                self.logger.warning("⚠️ No transaction data found, continuing anyway")
-            
-            # Additional wait for dynamic content
-            time.sleep(2)
-            
-            # Get page source after JavaScript execution
-            body = self.driver.page_source.encode('utf-8')
-            
-            # Create new response with rendered content
-            return HtmlResponse(
-                url=request.url,
-                body=body,
-                encoding='utf-8',
-                request=request
+            body = await maybe_deferred_to_future(
+                deferToThreadPool(reactor, self.threadpool, self.render, request.url, wait_for)
             )
-            
         except Exception as e:
             self.logger.error(f"❌ Selenium request failed: {e}")
             return None
+        if body is None:
+            self.logger.warning(f"⚠️ Every Chrome worker is waiting to restart, skipping Selenium for {request.url}")
+            self.inc_stat('render/no_browser')
+            return None
+
+        self.inc_stat('render/browser')
+        request.meta['rendered'] = True
+        # Create new response with rendered content
+        return HtmlResponse(
+            url=request.url,
+            body=body,
+            encoding='utf-8',
+            request=request
+        )
+
+    def take_worker(self):
+        """A worker that has a browser or may start one; None when all are backing off"""
+        for _ in range(self.pool_size):
+            worker = self.workers.get()
+            if worker.can_render():
+                return worker
+            # Back of the queue; no worker is held while looking, so threads can't deadlock
+            self.workers.put(worker)
+        return None
+
+    def render(self, url, wait_for):
+        """Runs on a pool thread with exclusive use of one browser; None when none is available"""
+        worker = self.take_worker()
+        if worker is None:
+            return None
+        try:
+            try:
+                worker.ensure_started()
+            except Exception as e:
+                self.logger.error(f"❌ Failed to start Chrome for worker {worker.worker_id} "
+                                  f"(attempt {worker.start_failures}), retrying it in "
+                                  f"{worker.retry_at - time.monotonic():.0f}s: {e}")
+                raise
+
+            worker.driver.get(url)
+            worker.pages += 1
+            self.wait_until_ready(worker.driver, wait_for)
+            # Get page source after JavaScript execution
+            return worker.driver.page_source.encode('utf-8')
+        except Exception:
+            # A failed page can leave the browser in a bad state; start fresh next time
+            worker.quit()
+            raise
+        finally:
+            self.workers.put(worker)
+
+    def wait_until_ready(self, driver, wait_for):
+        wait = WebDriverWait(driver, self.wait_timeout)
+        wait.until(lambda d: d.execute_script('return document.readyState') == 'complete')
+
+        try:
+            # Wait for transaction data to appear
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, wait_for)))
+        except TimeoutException:
+            self.logger.warning("⚠️ No transaction data found, continuing anyway")
+            return
+
+        # Rows are often appended in batches: ready once two polls see the same count
+        last_count = [-1]
+
+        def rows_settled(d):
+            count = len(d.find_elements(By.CSS_SELECTOR, wait_for))
+            settled = count == last_count[0]
+            last_count[0] = count
+            return settled
+
+        try:
+            WebDriverWait(driver, min(self.wait_timeout, 5), poll_frequency=0.3).until(rows_settled)
+            self.logger.info("✅ Transaction data loaded")
+        except TimeoutException:
+            self.logger.warning("⚠️ Rows still changing, using current page")
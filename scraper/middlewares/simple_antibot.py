@@ -11,6 +11,8 @@ import logging
 from datetime import datetime, timedelta
 import json
 
+from utils.block_detector import block_reason
+
 
 class SimpleAntiBot:
     """
@@ -89,15 +91,13 @@ class SimpleAntiBot:
         self.session_duration = random.randint(30, 60)
         self.request_count = 0
     
-    def smart_delay(self):
-        """Fast delays optimized for ScraperAPI"""
-        
-        # Calculate time since last request
-        now = time.time()
-        time_since_last = now - self.last_request_time
+    def compute_delay(self, current_delay=None, time_since_last=None):
+        """Pause before the next request under the fast ScraperAPI delay model"""
+        if current_delay is None:
+            current_delay = self.current_delay
         
         # Minimal delay with small variation for ScraperAPI
-        delay = random.uniform(self.current_delay * 0.5, self.current_delay * 1.0)
+        delay = random.uniform(current_delay * 0.5, current_delay * 1.0)
         
         # Reduced extra randomness for faster operation
         if random.random() < 0.05:  # 5% chance of slightly longer delay
@@ -105,9 +105,17 @@ class SimpleAntiBot:
         
         # Minimal time between requests
         min_delay = 0.5  # Reduced from 3 seconds to 0.5 seconds
-        if time_since_last < min_delay:
+        if time_since_last is not None and time_since_last < min_delay:
             delay += (min_delay - time_since_last)
         
+        return delay
+    
+    def smart_delay(self):
+        """Fast delays optimized for ScraperAPI (blocking; for requests-based scripts)"""
+        
+        # Calculate time since last request
+        delay = self.compute_delay(time_since_last=time.time() - self.last_request_time)
+        
         # Apply delay
         self.logger.debug(f"⏱️ Waiting {delay:.1f} seconds")
         time.sleep(delay)
@@ -160,64 +168,55 @@ class SimpleAntiBot:
             return None
     
     def is_blocked(self, response):
-        """Check if response indicates blocking"""
-        
-        # Handle both requests.Response and Scrapy Response objects
-        status_code = getattr(response, 'status_code', None) or getattr(response, 'status', None)
-        
-        # Check status codes
-        if status_code in [403, 429, 503]:
-            return True
-        
-        # For successful status codes, check content
-        if status_code != 200:
-            return False
-        
-        # Get response text/content
-        if hasattr(response, 'text'):
-            content = response.text.lower()
-        elif hasattr(response, 'body'):
-            content = response.body.decode('utf-8', errors='ignore').lower()
-        else:
-            return False
-        
-        # Check for blocking keywords in content
-        blocking_keywords = [
-            'access denied', 'forbidden', 'captcha', '验证码', 
-            '人机验证', 'robot', 'blocked', 'temporarily unavailable',
-            'service unavailable', 'too many requests', 'verification required'
-        ]
-        
-        # Only consider it blocked if we find blocking keywords
-        # Don't use content length as it varies greatly between sites
-        return any(keyword in content for keyword in blocking_keywords)
+        """Check if response indicates blocking (shared utils.block_detector rules)"""
+        return block_reason(response) is not None
     
-    def handle_blocked_response(self, url):
-        """Handle blocked response"""
+    def register_block(self, url):
+        """
+        Record a blocked response: raise the delay and refresh the session.
+        Returns the extended backoff in seconds; the caller decides how to wait.
+        """
         self.block_count += 1
         self.consecutive_failures += 1
         
         self.logger.warning(f"🚫 Blocked response detected for {url}")
         
         # Aggressive measures
-        self.current_delay = min(self.max_delay, self.current_delay * 2)
+        self.current_delay = self.delay_after_block(self.current_delay)
         
         # Force session refresh
         self.refresh_session()
         
         # Reduced delay for faster retry with ScraperAPI
-        extended_delay = random.uniform(10, 30)  # Reduced from 60-180 to 10-30 seconds
+        return random.uniform(10, 30)  # Reduced from 60-180 to 10-30 seconds
+    
+    def handle_blocked_response(self, url):
+        """Handle blocked response"""
+        extended_delay = self.register_block(url)
         self.logger.info(f"😴 Sleeping for {extended_delay:.0f} seconds due to blocking")
         time.sleep(extended_delay)
     
+    def delay_after_success(self, current_delay, consecutive_failures=0):
+        """Reduce delay gradually on success"""
+        if consecutive_failures == 0 and current_delay > self.base_delay:
+            return max(self.base_delay, current_delay * 0.95)
+        return current_delay
+    
+    def delay_after_failure(self, current_delay):
+        """Increase delay on failure"""
+        return min(self.max_delay, current_delay * 1.3)
+    
+    def delay_after_block(self, current_delay):
+        """Double delay after a block"""
+        return min(self.max_delay, current_delay * 2)
+    
     def adjust_delay_on_success(self):
         """Reduce delay gradually on success"""
-        if self.consecutive_failures == 0 and self.current_delay > self.base_delay:
-            self.current_delay = max(self.base_delay, self.current_delay * 0.95)
+        self.current_delay = self.delay_after_success(self.current_delay, self.consecutive_failures)
     
     def adjust_delay_on_failure(self):
         """Increase delay on failure"""
-        self.current_delay = min(self.max_delay, self.current_delay * 1.3)
+        self.current_delay = self.delay_after_failure(self.current_delay)
     
     def get_stats(self):
         """Get performance statistics"""
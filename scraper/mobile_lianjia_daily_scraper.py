@@ -10,7 +10,6 @@ import sys
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
-import subprocess
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
@@ -18,12 +17,27 @@ sys.path.append(str(Path(__file__).parent.parent))
 from utils.config_loader import load_config
 from utils.http_helpers import test_mobile_api_connection
 from command.metrics_tracker import MetricsTracker
+from command.spider_runner import SpiderJob, SpiderRunner
+
+PROGRESS_EVERY = 100  # Log a city's running item count this often
 
 
 class MobileLianjiaDailyScraper:
     def __init__(self):
         self.config = load_config('mobile_lianjia.yaml')
         self.metrics = MetricsTracker('mobile_lianjia_daily')
+        self.runner = SpiderRunner()
+        rate_limiting = self.config.get('rate_limiting', {})
+        self.parallel_cities = max(1, rate_limiting.get('parallel_cities', 3))
+        self.city_start_interval = rate_limiting.get('city_start_interval', 2)
+        # All cities hit the same API host and each crawler paces only itself,
+        # so the host's budget is split between the cities running at once
+        self.city_settings = {
+            'LOG_LEVEL': 'INFO',
+            'CONCURRENT_REQUESTS_PER_DOMAIN': max(1, rate_limiting.get('concurrent_requests', 8) // self.parallel_cities),
+            'DOWNLOAD_DELAY': rate_limiting.get('delay', 0.5) * self.parallel_cities,
+        }
+        self.progress = {}
         self.log_file = Path('logs') / f'mobile_lianjia_daily_{datetime.now().strftime("%Y%m%d")}.log'
         self.setup_logging()
         
@@ -61,32 +75,32 @@ class MobileLianjiaDailyScraper:
         start_time = time.time()
         
         self.logger.info(f"🏙️ Starting {city} scraping in {mode} mode...")
+        self.progress[city] = 0
+        loop = asyncio.get_running_loop()
+        
+        def on_item(job, count):
+            # Reactor thread: hand the count over to the event loop
+            if count % PROGRESS_EVERY == 0:
+                loop.call_soon_threadsafe(self.report_progress, city, count, start_time)
+        
+        job = SpiderJob(
+            'mobile_lianjia',
+            name=f'{city}_{mode}',
+            spider_kwargs={'city': city, 'mode': mode},
+            settings=self.city_settings,
+            output=f'output/mobile_lianjia_{city}_{mode}_{datetime.now().strftime("%Y%m%d")}.json',
+            on_item=on_item
+        )
         
         try:
-            # Build command
-            cmd = [
-                'python', '-m', 'scrapy', 'crawl', 'mobile_lianjia',
-                '-a', f'city={city}',
-                '-a', f'mode={mode}',
-                '-s', 'LOG_LEVEL=INFO',
-                '-o', f'output/mobile_lianjia_{city}_{mode}_{datetime.now().strftime("%Y%m%d")}.json'
-            ]
-            
-            # Run spider
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=Path(__file__).parent.parent
-            )
-            
-            stdout, stderr = process.communicate()
+            # Run spider in this process; awaiting leaves the event loop free
+            result = (await self.runner.run_async([job]))[job.name]
             duration = time.time() - start_time
             
-            if process.returncode == 0:
-                # Parse output for metrics
-                items_scraped = self.extract_item_count(stdout)
+            self.progress[city] = result['items']
+            
+            if result['success']:
+                items_scraped = result['items']
                 
                 self.logger.info(f"✅ {city} completed: {items_scraped} items in {duration:.1f}s")
                 
@@ -104,32 +118,57 @@ class MobileLianjiaDailyScraper:
                 return {'success': True, 'items': items_scraped, 'duration': duration}
                 
             else:
-                self.logger.error(f"❌ {city} failed: {stderr}")
+                error = result['error'] or result['finish_reason']
+                self.logger.error(f"❌ {city} failed: {error}")
                 
                 await self.metrics.record_scraping_session({
                     'spider': 'mobile_lianjia',
                     'city': city,
                     'mode': mode,
                     'success': False,
-                    'error': stderr[:200],
+                    'error': str(error)[:200],
                     'timestamp': datetime.now().isoformat()
                 })
                 
-                return {'success': False, 'error': stderr}
+                return {'success': False, 'error': error}
                 
         except Exception as e:
             self.logger.error(f"❌ Exception during {city} scraping: {e}")
             return {'success': False, 'error': str(e)}
     
-    def extract_item_count(self, output):
-        """Extract item count from scrapy output"""
-        for line in output.split('\n'):
-            if 'item_scraped_count' in line:
-                try:
-                    return int(line.split('item_scraped_count')[1].split()[0].strip(':'))
-                except:
-                    continue
-        return 0
+    def report_progress(self, city, count, start_time):
+        """Running item count of a city still being scraped"""
+        self.progress[city] = count
+        elapsed = time.time() - start_time
+        self.logger.info(f"📦 {city}: {count} items so far ({count / max(elapsed, 1):.1f}/s), "
+                         f"{sum(self.progress.values())} across all cities")
+    
+    async def run_cities(self, cities, mode='communities'):
+        """
+        Scrape cities concurrently, at most parallel_cities at a time, with
+        starts at least city_start_interval seconds apart. Each city gets
+        1/parallel_cities of the API host's concurrency and request rate
+        (city_settings), so together they stay within one crawler's budget.
+        Returns {city: result} in the order given.
+        """
+        semaphore = asyncio.Semaphore(self.parallel_cities)
+        start_lock = asyncio.Lock()
+        last_start = 0.0
+        
+        async def run_city(i, city):
+            nonlocal last_start
+            async with semaphore:
+                # Stagger starts instead of pausing between whole cities
+                async with start_lock:
+                    wait = last_start + self.city_start_interval - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    last_start = time.monotonic()
+                self.logger.info(f"📍 Processing city {i}/{len(cities)}: {city}")
+                return await self.run_city_scraper(city, mode)
+        
+        results = await asyncio.gather(*(run_city(i, city) for i, city in enumerate(cities, 1)))
+        return dict(zip(cities, results))
     
     async def run_daily_cycle(self, mode='communities'):
         """Run daily scraping cycle for all cities"""
@@ -141,25 +180,14 @@ class MobileLianjiaDailyScraper:
             return
         
         cities = list(self.config['cities'].keys())
-        results = {}
+        self.logger.info(f"🏙️ {len(cities)} cities, {self.parallel_cities} at a time")
         
         start_time = time.time()
-        total_items = 0
-        successful_cities = 0
+        results = await self.run_cities(cities, mode)
         
-        for i, city in enumerate(cities, 1):
-            self.logger.info(f"📍 Processing city {i}/{len(cities)}: {city}")
-            
-            result = await self.run_city_scraper(city, mode)
-            results[city] = result
-            
-            if result['success']:
-                successful_cities += 1
-                total_items += result.get('items', 0)
-            
-            # Rate limiting between cities
-            if i < len(cities):
-                await asyncio.sleep(2)
+        successful = [result for result in results.values() if result['success']]
+        successful_cities = len(successful)
+        total_items = sum(result.get('items', 0) for result in successful)
         
         total_duration = time.time() - start_time
         
@@ -201,15 +229,14 @@ class MobileLianjiaDailyScraper:
         
         self.logger.info(f"⭐ Running priority cities: {priority_cities}")
         
-        results = {}
+        known = []
         for city in priority_cities:
             if city in self.config['cities']:
-                result = await self.run_city_scraper(city, 'communities')
-                results[city] = result
+                known.append(city)
             else:
                 self.logger.warning(f"⚠️ Priority city {city} not found in config")
         
-        return results
+        return await self.run_cities(known, 'communities')
 
 
 async def main():
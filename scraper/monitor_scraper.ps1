@@ -23,7 +23,7 @@ try {
 Write-Host "`n📁 RECENT SCRAPING ACTIVITY" -ForegroundColor Yellow
 $OutputDir = "daily_output"
 if (Test-Path $OutputDir) {
-    $RecentFiles = Get-ChildItem $OutputDir -Recurse -Include "*.json" | Sort-Object LastWriteTime -Descending | Select-Object -First 5
+    $RecentFiles = Get-ChildItem $OutputDir -Recurse -Include "*.json", "*.jsonl" | Sort-Object LastWriteTime -Descending | Select-Object -First 5
     
     if ($RecentFiles) {
         Write-Host "✅ Recent output files:" -ForegroundColor Green
@@ -35,14 +35,14 @@ if (Test-Path $OutputDir) {
         Write-Host "⚠️  No output files found" -ForegroundColor Yellow
     }
     
-    # Check latest.json for deal count
-    $LatestFile = Join-Path $OutputDir "latest.json"
+    # Check latest.jsonl for deal count (one deal per line)
+    $LatestFile = Join-Path $OutputDir "latest.jsonl"
     if (Test-Path $LatestFile) {
         try {
-            $LatestData = Get-Content $LatestFile | ConvertFrom-Json
-            Write-Host "📊 Latest scrape: $($LatestData.Count) deals found" -ForegroundColor Cyan
+            $DealCount = @(Get-Content $LatestFile | Where-Object { $_.Trim() }).Count
+            Write-Host "📊 Latest scrape: $DealCount deals found" -ForegroundColor Cyan
         } catch {
-            Write-Host "⚠️  Could not read latest.json" -ForegroundColor Yellow
+            Write-Host "⚠️  Could not read latest.jsonl" -ForegroundColor Yellow
         }
     }
 } else {
@@ -50,42 +50,75 @@ AUTOTHROTTLE_ENABLED = True  # Will be configured below
 #    "store_scraper.middlewares.StoreScraperSpiderMiddleware": 543,
 #}
 
+# Per-request pauses (meta['delay'], retry backoffs) are waited out before
+# queueing, so a waiting request never holds a CONCURRENT_REQUESTS slot
+SCHEDULER = "middlewares.delayed_scheduler.DelayedRequestScheduler"
+
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 DOWNLOADER_MIDDLEWARES = {
+    # Parks requests to domains whose circuit is open; caps retries crawl-wide
+    "middlewares.circuit_breaker.CircuitBreakerMiddleware": 40,
+    
     # Enhanced proxy middleware (highest priority)
     "middlewares.enhanced_proxy_middleware.EnhancedProxyMiddleware": 100,
     
     # Simple but highly effective anti-bot protection
     "middlewares.scrapy_simple_antibot.ScrapySimpleAntiBot": 200,
     
+    # Skip listing pages that are unchanged since the last run (304 / rows hash)
+    "middlewares.conditional_request_middleware.ConditionalRequestMiddleware": 250,
+    
     # Enhanced retry with proxy-aware logic
     "middlewares.enhanced_proxy_middleware.ProxyRetryMiddleware": 300,
     
     # Disable default retry middleware (replaced by our enhanced version)
     "scrapy.downloadermiddlewares.retry.RetryMiddleware": None,
     
-    # Existing middlewares
+    # Plain HTTP first, headless Chrome only for pages that need JS
     "middlewares.selenium_middleware.SeleniumMiddleware": 543,
-    "scrapy_selenium.SeleniumMiddleware": 800,
 }
 
 # ScraperAPI Optimized settings for maximum success
-CONCURRENT_REQUESTS = 1          # Conservative with premium proxy
-CONCURRENT_REQUESTS_PER_DOMAIN = 1  # Single request per domain (ScraperAPI handles rotation)
-DOWNLOAD_DELAY = 5               # Conservative delay between requests
+CONCURRENT_REQUESTS = 8          # Ceiling across all domains together
+CONCURRENT_REQUESTS_PER_DOMAIN = 1  # Starting point; AdaptiveConcurrency tunes each domain
+DOWNLOAD_DELAY = 5               # Starting delay per domain; AdaptiveConcurrency tunes it
 RANDOMIZE_DOWNLOAD_DELAY = 0     # ScraperAPI manages request timing
 
-# AutoThrottle optimized for ScraperAPI
-AUTOTHROTTLE_ENABLED = True
-AUTOTHROTTLE_START_DELAY = 1     # Fast start with ScraperAPI
-AUTOTHROTTLE_MAX_DELAY = 10      # Lower max delay for premium proxy
-AUTOTHROTTLE_TARGET_CONCURRENCY = 0.8  # Higher concurrency with reliable proxy
-AUTOTHROTTLE_DEBUG = True        # Show throttling stats
+# Per-domain AIMD concurrency (middlewares.adaptive_concurrency) replaces AutoThrottle
+AUTOTHROTTLE_ENABLED = False
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_CONCURRENCY_MIN = 1     # Floor for concurrency per domain
+ADAPTIVE_CONCURRENCY_MAX = 4     # Ceiling for concurrency per domain
+ADAPTIVE_DELAY_MIN = 1           # Seconds; delay is lowered to this before concurrency grows
+ADAPTIVE_DELAY_MAX = 30          # Seconds; delay is doubled up to this on blocks at the floor
+ADAPTIVE_DELAY_STEP = 0.5        # Additive delay decrease per clean window
+ADAPTIVE_CONCURRENCY_DECREASE = 0.5  # Multiplicative concurrency cut on a block
+ADAPTIVE_CONCURRENCY_DOMAINS = {
+    "lianjia.com": {"max_concurrency": 2, "min_delay": 2},
+    "centanet.com": {"max_concurrency": 4},
+    "midlandici.com.hk": {"max_concurrency": 4},
+    "carparkhk.com": {"max_concurrency": 4},
+}
 
 # Fast and efficient retry settings for ScraperAPI
 RETRY_TIMES = 3                  # Reduced from 8 - fail fast with premium proxy
 RETRY_HTTP_CODES = [500, 502, 503, 504, 408, 429, 403, 407, 401]  # Include common errors
+RETRY_BACKOFF_BASE = 1           # Seconds; doubles per attempt, with 0.5-1.5x jitter
+RETRY_BACKOFF_MAX = 60           # Longest non-blocking wait before a retry
+ENHANCED_RETRY_BACKOFF_MAX = 300 # Same, for EnhancedRetryMiddleware (anti-bot bans)
+RETRY_DOMAIN_BUDGET_MIN = 10     # Retries any domain may spend...
+RETRY_DOMAIN_BUDGET_RATIO = 0.2  # ...plus this many per request sent to it
+RETRY_BUDGET_MIN = 20            # Retries the whole crawl may spend...
+RETRY_BUDGET_RATIO = 0.1         # ...plus this many per first attempt, across all domains
+
+# Per-domain circuit breaker (middlewares.circuit_breaker) parks requests to dead sites
+CIRCUIT_BREAKER_ENABLED = True
+CIRCUIT_BREAKER_WINDOW = 20      # Recent outcomes kept per domain
+CIRCUIT_BREAKER_MIN_REQUESTS = 5 # Outcomes needed before the circuit can open
+CIRCUIT_BREAKER_THRESHOLD = 0.5  # Failure ratio that opens the circuit
+CIRCUIT_BREAKER_COOLDOWN = 60    # Seconds before the first probe; doubles per failed probe
+CIRCUIT_BREAKER_MAX_PROBES = 3   # Failed probes before a domain is dropped for the run
 
 # Session management
 COOKIES_ENABLED = True
@@ -99,6 +132,25 @@ DOWNLOAD_DELAY_EXPOSURE_RANDOMIZE = False  # Consistent timing with ScraperAPI
 PROXY_POOL_SIZE = 1             # Only one ScraperAPI proxy needed
 PROXY_HEALTH_CHECK_INTERVAL = 100  # Less frequent health checks for reliable proxy
 PROXY_MAX_FAILURES = 5         # More tolerance for ScraperAPI temporary issues
+PROXY_SCORES_FILE = "proxy_scores.json"  # EWMA latency/success/block per proxy and domain
+
+# Conditional requests: ETag/Last-Modified and rows-region hashes per listing URL
+CONDITIONAL_REQUESTS_ENABLED = True
+PAGE_FINGERPRINT_FILE = "page_fingerprints.json"
+CONDITIONAL_VOLATILE_PARAMS = ["daterang"]  # Query params left out of page keys (moving date windows)
+PAGE_FINGERPRINT_MAX_AGE_DAYS = 30  # Pages not seen for this long are dropped from the file
+
+# Pooled headless Chrome for JS-rendered sites (middlewares.selenium_middleware)
+SELENIUM_POOL_SIZE = 2                 # Concurrent browser workers
+SELENIUM_MAX_PAGES_PER_BROWSER = 50    # Restart each browser after this many pages
+SELENIUM_WAIT_TIMEOUT = 10             # Seconds to wait for the rows selector
+SELENIUM_READY_SELECTOR = ".transaction-row, tbody tr, table tr"
+SELENIUM_BLOCK_RESOURCES = True        # Skip images, fonts and CSS
+SELENIUM_DOMAINS = ["midlandici.com"]
+SELENIUM_RENDER_DECISIONS_FILE = "render_decisions.json"  # Per URL pattern: plain HTTP or browser
+SELENIUM_RENDER_DECISION_TTL = 7 * 24 * 3600  # Seconds before a 'browser' pattern is re-probed over plain HTTP
+SELENIUM_START_BACKOFF = 30            # Seconds a worker whose Chrome failed to start waits; doubles per failure
+SELENIUM_START_BACKOFF_MAX = 600       # Longest such wait
 
 # Selenium configuration for Lianjia spider with anti-detection
 from selenium import webdriver
@@ -120,9 +172,9 @@ SELENIUM_DRIVER_ARGUMENTS = [
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+EXTENSIONS = {
+    "middlewares.adaptive_concurrency.AdaptiveConcurrency": 500,
+}
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
@@ -144,13 +196,29 @@ ITEM_PIPELINES = {
 #AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
 # Enable showing throttling stats for every response received:
 #AUTOTHROTTLE_DEBUG = False
-# Enable and configure HTTP caching (disabled by default)
+# HTTP cache for record/replay crawling (off unless SCRAPER_HTTPCACHE=1)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
-#HTTPCACHE_ENABLED = True
-#HTTPCACHE_EXPIRATION_SECS = 0
-#HTTPCACHE_DIR = "httpcache"
-#HTTPCACHE_IGNORE_HTTP_CODES = []
-#HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+# Bodies are zstd-compressed and stored once per distinct content; set
+# HTTPCACHE_IGNORE_MISSING=True to replay a recorded crawl fully offline.
+HTTPCACHE_ENABLED = os.getenv("SCRAPER_HTTPCACHE", "0") == "1"
+HTTPCACHE_EXPIRATION_SECS = 0
+HTTPCACHE_DIR = "httpcache"
+# 304s answer our conditional headers and have no body worth replaying
+HTTPCACHE_IGNORE_HTTP_CODES = [304, 403, 407, 429, 500, 502, 503, 504]
+HTTPCACHE_IGNORE_MISSING = os.getenv("SCRAPER_HTTPCACHE_OFFLINE", "0") == "1"
+HTTPCACHE_STORAGE = "middlewares.dedup_cache_storage.DedupCacheStorage"
+# Per-spider cache mode: readwrite (default), replay, record or off
+HTTPCACHE_SPIDER_POLICIES = {
+    "store_spider": {"mode": "readwrite"},
+    "house_spider": {"mode": "readwrite"},
+}
 
 # Set settings whose default value is deprecated to a future-proof value
 FEED_EXPORT_ENCODING = "utf-8"
+
+# JSON Lines feeds (-o items.jsonl) go through orjson and can be read while written
+FEED_EXPORTERS = {
+    "jsonl": "utils.jsonl.OrjsonLinesItemExporter",
+    "jsonlines": "utils.jsonl.OrjsonLinesItemExporter",
+    "jl": "utils.jsonl.OrjsonLinesItemExporter",
+}
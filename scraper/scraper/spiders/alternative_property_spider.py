@@ -13,11 +13,17 @@ from selenium.webdriver.support import expected_conditions as EC
 import yaml
 import os
 import re
+import sys
+from pathlib import Path
 from urllib.parse import urljoin
 import time
 import random
 
-class AlternativePropertySpider(scrapy.Spider):
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parents[2]))
+from utils.selenium_spider import SeleniumRequestMixin
+
+class AlternativePropertySpider(SeleniumRequestMixin, scrapy.Spider):
     name = "alternative_property_spider"
     
     def __init__(self, site='58', city='beijing', *args, **kwargs):
@@ -7,13 +7,10 @@ Integrated with ScraperAPI and existing property-finder infrastructure
 
 import scrapy
 import requests
-import json
-import re
-from bs4 import BeautifulSoup
 from datetime import datetime
 import logging
-import time
 import random
+import re
 from urllib.parse import urljoin, urlparse
 import os
 import sys
@@ -21,21 +18,32 @@ from pathlib import Path
 
 # Add project root to path for imports
 sys.path.append(str(Path(__file__).parents[2]))
+from utils.lianjia_extraction import (
+    extract_district_names, extract_listings, extract_numeric_size, extract_total_count,
+    extract_total_pages, has_listing_container,
+)
+from utils.block_detector import block_reason
 
 class EnhancedLianjiaSpider(scrapy.Spider):
     name = "enhanced_lianjia"
     allowed_domains = ["lianjia.com"]
     
+    # Sharding: Lianjia lists at most 100 pages of 30 listings per query
+    LISTINGS_PER_PAGE = 30
+    ALL_ROOMS = ['l1', 'l2', 'l3', 'l4', 'l5', 'l6']
+    SHARD_PRICE_CEILING = 100000  # 万, upper bound for open-ended price bands
+    
     def __init__(self, city='beijing', district='', property_type='ershoufang', 
                  min_price=0, max_price=0, house_type='', *args, **kwargs):
         super(EnhancedLianjiaSpider, self).__init__(*args, **kwargs)
         
         # Configuration based on waugustus/lianjia-spider approach
         self.city = city
-        self.district = district or '马连洼'  # Default district
+        # Default district; 'all' crawls the whole city (sharded by district when needed)
+        self.district = '' if district == 'all' else (district or '马连洼')
         self.property_type = property_type
-        self.min_price = min_price
-        self.max_price = max_price
+        self.min_price = int(min_price) if min_price else 0
+        self.max_price = int(max_price) if max_price else 0
         self.house_type = house_type or 'l2l3l4'  # ln表示n居室
         
         # City configuration
@@ -81,6 +89,20 @@ class EnhancedLianjiaSpider(scrapy.Spider):
         self.current_page = 1
         self.max_pages = 100  # Limit for testing
         
+        # Schedule all listing pages once the total is known (page_fanout=false to walk sequentially)
+        self.page_fanout = str(kwargs.get('page_fanout', 'true')).lower() not in ('0', 'false', 'no')
+        
+        # Split queries past the page cap into district/room/price shards (sharding=false to disable)
+        self.sharding = str(kwargs.get('sharding', 'true')).lower() not in ('0', 'false', 'no')
+        self.root_shard = {
+            'district': self.district,
+            'rooms': re.findall(r'l\d', self.house_type),
+            'min_price': self.min_price,
+            'max_price': self.max_price,
+        }
+        self.seen_house_ids = set()
+        self.duplicates_skipped = 0
+        
         # Build start URLs
         self.start_urls = self._build_start_urls()
         
@@ -98,25 +120,8 @@ class EnhancedLianjiaSpider(scrapy.Spider):
 
     def _build_start_urls(self):
         """Build start URLs based on configuration"""
-        urls = []
-        
-        # Base URL with filters
-        url_parts = [self.ershoufang_url]
-        
-        # Add pagination, house type, price, and district filters
-        filter_parts = []
-        if self.house_type:
-            filter_parts.append(self.house_type)
-        if self.price_filter:
-            filter_parts.append(self.price_filter)
-        if self.district:
-            filter_parts.append(f"rs{self.district}")
-        
         # Build URL: /ershoufang/pg1l2l3l4bp0ep500rs马连洼/
-        url = f"{self.ershoufang_url}/pg{self.current_page}{''.join(filter_parts)}/"
-        urls.append(url)
-        
-        return urls
+        return [self._build_page_url(self.current_page)]
 
     def start_requests(self):
         """Generate initial requests"""
@@ -126,7 +131,8 @@ class EnhancedLianjiaSpider(scrapy.Spider):
                 callback=self.parse,
                 meta={
                     'page': self.current_page,
-                    'retry_count': 0
+                    'retry_count': 0,
+                    'shard': self.root_shard
                 },
                 errback=self.handle_error
             )
@@ -134,6 +140,8 @@ class EnhancedLianjiaSpider(scrapy.Spider):
     def parse(self, response):
         """Parse listing pages - based on waugustus approach"""
         current_page = response.meta.get('page', 1)
+        shard = response.meta.get('shard', self.root_shard)
+        last_page = response.meta.get('last_page', self.max_pages)
         self.logger.info(f"📄 Parsing page {current_page}: {response.url}")
         
         # Check if we're blocked
@@ -141,105 +149,182 @@ class EnhancedLianjiaSpider(scrapy.Spider):
             self.logger.warning(f"🚫 Blocked detected on page {current_page}")
             return
         
-        # Extract property listings using BeautifulSoup (like waugustus approach)
-        soup = BeautifulSoup(response.body, 'html.parser')
-        
-        # Get total pages on first page
+        # Get total pages on first page; each shard has its own page count
+        total_pages = None
         if current_page == 1:
-            total_pages = self._extract_total_pages(soup)
+            total_pages = extract_total_pages(response)
             if total_pages:
-                self.max_pages = min(total_pages, self.max_pages)
-                self.logger.info(f"📊 Total pages available: {total_pages}, will scrape: {self.max_pages}")
+                last_page = min(total_pages, self.max_pages)
+                self.logger.info(f"📊 Total pages available: {total_pages}, will scrape: {last_page}")
         
         # Extract property listings
-        properties = self._extract_property_listings(soup, response)
+        properties = self._extract_property_listings(response)
         
         properties_count = len(properties)
         self.logger.info(f"🏠 Found {properties_count} properties on page {current_page}")
         
-        # Yield properties
+        # Yield properties (overlapping shards can list the same house)
         for property_data in properties:
             if property_data:
+                house_id = property_data.get('house_id')
+                if house_id and house_id in self.seen_house_ids:
+                    self.duplicates_skipped += 1
+                    continue
+                if house_id:
+                    self.seen_house_ids.add(house_id)
                 self.total_scraped += 1
                 yield property_data
 
+        # Query too large for the page cap: crawl narrower shards instead
+        if current_page == 1 and self.sharding and self._exceeds_page_cap(response, total_pages):
+            sub_shards = self._split_shard(shard, response)
+            if sub_shards:
+                self.logger.info(f"🧩 {self._shard_filters(shard) or 'all'} exceeds {self.max_pages} pages, "
+                                 f"splitting into {len(sub_shards)} shards")
+                yield from self._shard_requests(sub_shards)
+                return
+            self.logger.warning(f"⚠️ Cannot split {self._shard_filters(shard)} further, "
+                                f"results truncated at {self.max_pages} pages")
+
+        # Fanned-out pages were all scheduled by page 1
+        if response.meta.get('fanned_out'):
+            return
+        
+        if self.page_fanout and total_pages and properties_count > 0:
+            yield from self._fan_out_pages(shard, last_page)
+            return
+        
         # Handle pagination
-        if current_page < self.max_pages and properties_count > 0:
+        if current_page < last_page and properties_count > 0:
             next_page = current_page + 1
-            next_url = self._build_page_url(next_page)
+            next_url = self._build_page_url(next_page, shard)
             
             self.logger.info(f"➡️  Following to page {next_page}")
             
-            # Add delay between pages
-            time.sleep(random.uniform(1, 3))
-            
+            # Delay between pages is applied by DelayedRequestScheduler
             yield scrapy.Request(
                 url=next_url,
                 callback=self.parse,
                 meta={
                     'page': next_page,
-                    'retry_count': 0
+                    'retry_count': 0,
+                    'delay': random.uniform(1, 3),
+                    'shard': shard,
+                    'last_page': last_page
                 },
                 errback=self.handle_error
             )
         else:
             self.logger.info(f"✅ Scraping completed. Total properties: {self.total_scraped}")
 
-    def _build_page_url(self, page):
+    def _fan_out_pages(self, shard, last_page):
+        """
+        Schedule pages 2..last_page at once. Each page keeps the 1-3s
+        meta['delay'] of the sequential walk, counted from the one before
+        it, so Lianjia sees the same spacing without page n waiting for
+        page n-1's response; descending priorities make earlier pages
+        download first.
+        """
+        self.logger.info(f"🚀 Scheduling pages 2-{last_page} concurrently")
+        delay = 0.0
+        for page in range(2, last_page + 1):
+            delay += random.uniform(1, 3)
+            yield scrapy.Request(
+                url=self._build_page_url(page, shard),
+                callback=self.parse,
+                priority=-page,
+                meta={
+                    'page': page,
+                    'retry_count': 0,
+                    'delay': delay,
+                    'fanned_out': True,
+                    'shard': shard
+                },
+                errback=self.handle_error
+            )
+
+    def _exceeds_page_cap(self, response, total_pages):
+        """True when a query has more listings than max_pages can show"""
+        total_count = extract_total_count(response)
+        if total_count is not None:
+            return total_count > self.max_pages * self.LISTINGS_PER_PAGE
+        return bool(total_pages) and total_pages >= self.max_pages
+
+    def _split_shard(self, shard, response):
+        """
+        Narrow a shard along district (rs), then room count (l1..l6), then
+        price band (bp/ep bisection). Returns [] when it cannot be split.
+        """
+        if not shard['district']:
+            districts = extract_district_names(response)
+            if districts:
+                return [{**shard, 'district': district} for district in districts]
+        
+        rooms = shard['rooms'] or self.ALL_ROOMS
+        if len(rooms) > 1:
+            return [{**shard, 'rooms': [room]} for room in rooms]
+        
+        low = shard['min_price']
+        high = shard['max_price'] or self.SHARD_PRICE_CEILING
+        if high - low > 1:
+            # Bands share their boundary price; house_id dedup absorbs the overlap
+            middle = (low + high) // 2
+            return [
+                {**shard, 'rooms': rooms, 'min_price': low, 'max_price': middle},
+                {**shard, 'rooms': rooms, 'min_price': middle, 'max_price': high},
+            ]
+        return []
+
+    def _shard_requests(self, shards):
+        for shard in shards:
+            yield scrapy.Request(
+                url=self._build_page_url(1, shard),
+                callback=self.parse,
+                meta={
+                    'page': 1,
+                    'retry_count': 0,
+                    'shard': shard
+                },
+                errback=self.handle_error
+            )
+
+    def _shard_filters(self, shard):
+        """Filter segment of a listing URL, e.g. 'l2bp0ep500rs马连洼'"""
+        filter_parts = list(shard['rooms'])
+        if shard['max_price'] > 0:
+            filter_parts.append(f"bp{shard['min_price']}ep{shard['max_price']}")
+        if shard['district']:
+            filter_parts.append(f"rs{shard['district']}")
+        return ''.join(filter_parts)
+
+    def _build_page_url(self, page, shard=None):
         """Build URL for specific page"""
         # Build URL: /ershoufang/pg2l2l3l4bp0ep500rs马连洼/
-        filter_parts = []
-        if self.house_type:
-            filter_parts.append(self.house_type)
-        if self.price_filter:
-            filter_parts.append(self.price_filter)
-        if self.district:
-            filter_parts.append(f"rs{self.district}")
-        
-        return f"{self.ershoufang_url}/pg{page}{''.join(filter_parts)}/"
+        return f"{self.ershoufang_url}/pg{page}{self._shard_filters(shard or self.root_shard)}/"
 
     def _is_blocked(self, response):
         """Check if we're being blocked"""
-        # Check for common blocking indicators
         if response.status != 200:
             return True
         
-        text = response.text.lower()
-        blocking_indicators = [
-            '验证', 'captcha', 'verify', 'blocked', 
-            '人机验证', '安全验证', '访问受限'
-        ]
-        
-        return any(indicator in text for indicator in blocking_indicators)
+        reason = block_reason(response)
+        if reason:
+            self.logger.debug(f"Block reason: {reason}")
+        return reason is not None
 
-    def _extract_total_pages(self, soup):
-        """Extract total pages from pagination"""
-        try:
-            # Look for pagination info
-            page_box = soup.find('div', {'class': 'page-box'})
-            if page_box and page_box.div:
-                page_data = page_box.div.get('page-data')
-                if page_data:
-                    page_info = json.loads(page_data)
-                    return page_info.get('totalPage', 1)
-        except:
-            pass
-        return None
-
-    def _extract_property_listings(self, soup, response):
+    def _extract_property_listings(self, response):
         """Extract property listings from page - based on waugustus approach"""
         properties = []
         
         # Find property list container
-        house_list = soup.find('ul', {'class': 'sellListContent'})
-        if not house_list:
+        if not has_listing_container(response):
             self.logger.warning("❌ No property list found")
             return properties
         
         # Extract each property (based on waugustus logic)
-        for house in house_list.find_all('li'):
+        for listing in extract_listings(response):
             try:
-                property_data = self._extract_single_property(house, response)
+                property_data = self._build_property(listing, response)
                 if property_data:
                     properties.append(property_data)
             except Exception as e:
@@ -248,99 +333,59 @@ class EnhancedLianjiaSpider(scrapy.Spider):
         
         return properties
 
-    def _extract_single_property(self, house_element, response):
-        """Extract single property data - based on waugustus/lianjia-spider logic"""
-        try:
-            # Find info div
-            info = house_element.find("div", {'class': 'info'})
-            if not info:
-                return None
-            
-            # Extract title and ID (based on waugustus approach)
-            house_title = info.find("div", {'class': 'title'})
-            if not house_title or not house_title.a:
-                return None
-            
-            title_link = house_title.a
-            house_id = self._extract_house_id(title_link.get('href', ''))
-            title = title_link.get_text(strip=True)
+    def _build_property(self, listing, response):
+        """Map one extracted listing to our schema - based on waugustus/lianjia-spider logic"""
+        if not listing:
+            return None
+        
+        title = listing['title']
+        location = listing['location']
+        address_info = self._parse_address_info(listing['address_parts'])
+        
+        # Build property data (matching your database schema)
+        property_data = {
+            # Core identification
+            'house_id': listing['house_id'],
+            'building_name_zh': location or title,
+            'title': title,
             
-            # Extract location (community name)
-            flood_div = info.find("div", {'class': 'flood'})
-            location = ''
-            if flood_div and flood_div.div and flood_div.div.a:
-                location = flood_div.div.a.get_text(strip=True)
+            # Location information
+            'zone': 'China',
+            'city': self.city_config[self.city]['name'],
+            'province': self.city_config[self.city]['province'],
+            'district': response.meta.get('shard', self.root_shard)['district'] or self.district,
+            'location': location,
+            'area': address_info.get('area', ''),
             
-            # Extract address details (based on waugustus logic)
-            address_div = info.find("div", {'class': 'address'})
-            address_info = self._parse_address_info(address_div)
+            # Property details
+            'type': address_info.get('house_type', ['住宅']),
+            'type_raw': address_info.get('house_type_raw', '住宅'),
+            'size': address_info.get('size', ''),
+            'floor': address_info.get('floor', ''),
+            'orientation': address_info.get('orientation', ''),
+            'year_built': address_info.get('year_built', ''),
+            'building_type': address_info.get('building_type', ''),
             
-            # Extract price info (based on waugustus approach)
-            price_info = info.find("div", {'class': 'priceInfo'})
-            price_data = self._parse_price_info(price_info)
+            # Price information
+            'deal_price': listing['total_price'],
+            'price_per_sqm': listing['unit_price'],
+            'deal_date': datetime.now().strftime('%Y-%m-%d'),
             
-            # Build property data (matching your database schema)
-            property_data = {
-                # Core identification
-                'house_id': house_id,
-                'building_name_zh': location or title,
-                'title': title,
-                
-                # Location information
-                'zone': 'China',
-                'city': self.city_config[self.city]['name'],
-                'province': self.city_config[self.city]['province'],
-                'district': self.district,
-                'location': location,
-                'area': address_info.get('area', ''),
-                
-                # Property details
-                'type': address_info.get('house_type', ['住宅']),
-                'type_raw': address_info.get('house_type_raw', '住宅'),
-                'size': address_info.get('size', ''),
-                'floor': address_info.get('floor', ''),
-                'orientation': address_info.get('orientation', ''),
-                'year_built': address_info.get('year_built', ''),
-                'building_type': address_info.get('building_type', ''),
-                
-                # Price information
-                'deal_price': price_data.get('total_price', 0),
-                'price_per_sqm': price_data.get('unit_price', 0),
-                'deal_date': datetime.now().strftime('%Y-%m-%d'),
-                
-                # Source information
-                'source_url': urljoin(response.url, title_link.get('href', '')),
-                'start_url': response.url,
-                'developer': '',
-                
-                # Status
-                'status': 'active'
-            }
+            # Source information
+            'source_url': urljoin(response.url, listing['href']),
+            'start_url': response.url,
+            'developer': '',
             
-            # Validate data
-            if self._validate_property_data(property_data):
-                return property_data
-            else:
-                return None
-                
-        except Exception as e:
-            self.logger.error(f"❌ Error extracting single property: {e}")
-            return None
-
-    def _extract_house_id(self, href):
-        """Extract house ID from href like '/ershoufang/123456789.html'"""
-        if not href:
-            return 0
-        try:
-            # Extract number from URL
-            match = re.search(r'/(\d+)\.html', href)
-            if match:
-                return int(match.group(1))
-        except:
-            pass
-        return 0
+            # Status
+            'status': 'active'
+        }
+        
+        # Validate data
+        if self._validate_property_data(property_data):
+            return property_data
+        return None
 
-    def _parse_address_info(self, address_div):
+    def _parse_address_info(self, address_parts):
         """Parse address information - based on waugustus approach"""
         info = {
             'house_type': '住宅',
@@ -353,21 +398,18 @@ class EnhancedLianjiaSpider(scrapy.Spider):
             'area': ''
         }
         
-        if not address_div:
+        if not address_parts:
             return info
         
         try:
-            # Parse address text (format: "户型 | 面积 | 朝向 | 楼层 | 年份 | 建筑类型")
-            address_text = address_div.get_text(strip=True)
-            address_parts = [part.strip() for part in address_text.split('|')]
-            
+            # Address parts (format: "户型 | 面积 | 朝向 | 楼层 | 年份 | 建筑类型")
             if len(address_parts) >= 1:
                 info['house_type_raw'] = address_parts[0]
                 info['house_type'] = [self._normalize_house_type(address_parts[0])]
             
             if len(address_parts) >= 2:
                 info['size'] = address_parts[1]
-                info['area'] = self._extract_numeric_size(address_parts[1])
+                info['area'] = extract_numeric_size(address_parts[1])
             
             if len(address_parts) >= 3:
                 info['orientation'] = address_parts[2]
@@ -402,79 +444,6 @@ class EnhancedLianjiaSpider(scrapy.Spider):
         
         return '住宅'
 
-    def _extract_numeric_size(self, size_text):
-        """Extract numeric size from text like '89.5平米'"""
-        if not size_text:
-            return 0
-        
-        try:
-            match = re.search(r'(\d+\.?\d*)', size_text)
-            if match:
-                return float(match.group(1))
-        except:
-            pass
-        return 0
-
-    def _parse_price_info(self, price_info):
-        """Parse price information - based on waugustus approach"""
-        price_data = {
-            'total_price': 0,
-            'unit_price': 0
-        }
-        
-        if not price_info:
-            return price_data
-        
-        try:
-            # Extract total price (万元)
-            total_price_div = price_info.find("div", {'class': 'totalPrice'})
-            if total_price_div and total_price_div.span:
-                total_price_text = total_price_div.span.get_text(strip=True)
-                price_data['total_price'] = self._parse_total_price(total_price_text)
-            
-            # Extract unit price (元/平米)
-            unit_price_div = price_info.find("div", {'class': 'unitPrice'})
-            if unit_price_div and unit_price_div.span:
-                unit_price_text = unit_price_div.span.get_text(strip=True)
-                price_data['unit_price'] = self._parse_unit_price(unit_price_text)
-                
-        except Exception as e:
-            self.logger.debug(f"Price parsing error: {e}")
-        
-        return price_data
-
-    def _parse_total_price(self, price_text):
-        """Parse total price from text like '300万' -> 3000000"""
-        if not price_text:
-            return 0
-        
-        try:
-            # Remove non-numeric characters except 万
-            price_clean = re.sub(r'[^\d万.]', '', price_text)
-            
-            if '万' in price_clean:
-                # Convert 万 to actual number
-                price_num = float(price_clean.replace('万', ''))
-                return int(price_num * 10000)
-            else:
-                return int(float(price_clean))
-        except:
-            return 0
-
-    def _parse_unit_price(self, price_text):
-        """Parse unit price from text like '单价33000元/平米' -> 33000"""
-        if not price_text:
-            return 0
-        
-        try:
-            # Extract numeric part
-            match = re.search(r'(\d+)', price_text)
-            if match:
-                return int(match.group(1))
-        except:
-            pass
-        return 0
-
     def _validate_property_data(self, property_data):
         """Validate property data before yielding"""
         # Check required fields
@@ -508,12 +477,10 @@ class EnhancedLianjiaSpider(scrapy.Spider):
         if retry_count < max_retries:
             self.logger.info(f"🔄 Retrying request (attempt {retry_count + 1}/{max_retries})")
             
-            # Wait before retry
-            time.sleep(random.uniform(2, 5))
-            
-            # Retry request
-            new_request = failure.request.copy()
+            # Retry request after a non-blocking wait
+            new_request = failure.request.replace(dont_filter=True)
             new_request.meta['retry_count'] = retry_count + 1
+            new_request.meta['delay'] = random.uniform(2, 5)
             
             yield new_request
         else:
@@ -523,3 +490,5 @@ class EnhancedLianjiaSpider(scrapy.Spider):
         """Spider closed callback"""
         self.logger.info(f"🕷️  Enhanced Lianjia Spider closed: {reason}")
         self.logger.info(f"📊 Total properties scraped: {self.total_scraped}")
+        if self.duplicates_skipped:
+            self.logger.info(f"🔁 Duplicate listings skipped across shards: {self.duplicates_skipped}")
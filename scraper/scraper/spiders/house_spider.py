@@ -59,6 +59,8 @@ def classify_type(record, item_type, mapping):
 
 class HouseSpider(CrawlSpider):
     name = "house_spider"
+    # Site configs under config/; also read by the combined job to find shared sites
+    config_files = ("hk_house.yaml", "cn_house.yaml")
 
     def __init__(self, mode="daily", *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -69,8 +71,8 @@ class HouseSpider(CrawlSpider):
 
         # 1. Load all config blocks (list of dicts)
         self.configs = []
-        self.configs += load_config("config/hk_house.yaml")
-        self.configs += load_config("config/cn_house.yaml")
+        for config_file in self.config_files:
+            self.configs += load_config(f"config/{config_file}")
 
         # 2. Load your type mappings from YAML
         tm_path = Path(__file__).parents[2] / "config" / "type_mapping.yaml"
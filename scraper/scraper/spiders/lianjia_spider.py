@@ -9,8 +9,16 @@ import re
 from urllib.parse import urljoin, urlparse
 import time
 import random
+import sys
+from pathlib import Path
 
-class LianjiaSpider(scrapy.Spider):
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parents[2]))
+from utils.lianjia_extraction import extract_house_id
+from utils.listing_index import ListingIndex, listing_hash
+from utils.selenium_spider import SeleniumRequestMixin
+
+class LianjiaSpider(SeleniumRequestMixin, scrapy.Spider):
     name = "lianjia_spider"
     
     def __init__(self, city='beijing', property_type='ershoufang', *args, **kwargs):
@@ -32,6 +40,11 @@ class LianjiaSpider(scrapy.Spider):
         self.field_mappings = self.config['field_mappings']
         self.type_mappings = self.config['type_mappings']
         
+        # Listings whose detail page was already rendered (refresh_details=true to refetch all)
+        self.listing_index = ListingIndex(kwargs.get('listing_index', 'lianjia_listing_index.json'))
+        self.refresh_details = str(kwargs.get('refresh_details', 'false')).lower() in ('1', 'true', 'yes')
+        self.details_skipped = 0
+        
         # Set start URLs
         if property_type == 'ershoufang':
             self.start_urls = [self.city_config['ershoufang_url']]
@@ -60,13 +73,28 @@ class LianjiaSpider(scrapy.Spider):
             property_data = self.extract_property_data(property_element, response)
             
             if property_data:
-                # Get detailed property information
+                # Get detailed property information, unless known and unchanged
                 property_url = property_data.get('property_url')
                 if property_url:
+                    house_id = extract_house_id(property_url)
+                    content_hash = listing_hash(property_data)
+                    if not self.refresh_details and not self.listing_index.needs_detail(house_id, content_hash):
+                        # Still listed: emit it with the detail fields from its last detail page
+                        self.listing_index.touch(house_id)
+                        self.details_skipped += 1
+                        item = self.build_item(property_data, self.listing_index.detail(house_id))
+                        if item:
+                            yield item
+                        continue
+                    
                     yield SeleniumRequest(
                         url=urljoin(response.url, property_url),
                         callback=self.parse_property_detail,
-                        meta={'property_data': property_data},
+                        meta={
+                            'property_data': property_data,
+                            'house_id': house_id,
+                            'listing_hash': content_hash
+                        },
                         wait_time=5
                     )
         
@@ -133,29 +161,40 @@ class LianjiaSpider(scrapy.Spider):
             property_type = response.xpath(self.selectors['detail_type']).get()
             year_built = response.xpath(self.selectors['year_built']).get()
             
-            # Update property data with detailed info
-            property_data.update({
+            detail = {
                 'building_name_zh': building_name.strip() if building_name else property_data.get('title', ''),
                 'floor': self.parse_floor(floor_info),
                 'type_raw': property_type.strip() if property_type else '住宅',
                 'type': self.map_property_type(property_type),
-                'deal_date': self.get_current_date(),
                 'developer': '',
                 'start_url': response.url,
-            })
-            
-            # Normalize and validate data
-            normalized_data = self.normalize_property_data(property_data)
+            }
             
-            if self.validate_property_data(normalized_data):
-                self.logger.info(f"✅ Extracted property: {normalized_data.get('building_name_zh', 'Unknown')}")
-                yield normalized_data
-            else:
-                self.logger.warning(f"⚠️  Invalid property data, skipping")
+            item = self.build_item(property_data, detail)
+            if item:
+                self.listing_index.record(
+                    response.meta.get('house_id'), property_data['deal_price'],
+                    response.meta.get('listing_hash'), detail
+                )
+                yield item
                 
         except Exception as e:
             self.logger.error(f"❌ Error parsing property detail: {e}")
     
+    def build_item(self, property_data, detail):
+        """List-page fields plus detail-page fields, normalized; None if invalid"""
+        property_data = dict(property_data, **detail)
+        property_data['deal_date'] = self.get_current_date()
+        
+        # Normalize and validate data
+        normalized_data = self.normalize_property_data(property_data)
+        
+        if self.validate_property_data(normalized_data):
+            self.logger.info(f"✅ Extracted property: {normalized_data.get('building_name_zh', 'Unknown')}")
+            return normalized_data
+        self.logger.warning(f"⚠️  Invalid property data, skipping")
+        return None
+    
     def parse_price(self, price_text):
         """Parse price from text (e.g., '300万' -> 3000000)"""
         if not price_text:
@@ -257,3 +296,8 @@ class LianjiaSpider(scrapy.Spider):
             return False
         
         return True
+    
+    def closed(self, reason):
+        """Persist the listing index for the next run"""
+        self.listing_index.save()
+        self.logger.info(f"⏭️  Detail pages skipped for known listings: {self.details_skipped}")
@@ -35,11 +35,23 @@ class MobileLianjiaSpider(scrapy.Spider):
         'chongqing': {'id': 500000, 'abbr': 'cq'}
     }
     
-    def __init__(self, city='beijing', mode='communities', *args, **kwargs):
+    COMMUNITY_SEARCH_URL = 'http://app.api.lianjia.com/house/community/search'
+    
+    # The mobile API tolerates parallel calls; override with -s CONCURRENT_REQUESTS_PER_DOMAIN=N
+    custom_settings = {
+        'CONCURRENT_REQUESTS': 8,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 8,
+        'DOWNLOAD_DELAY': 0.5,
+    }
+    
+    def __init__(self, city='beijing', mode='communities', page_size=100, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.city = city
         self.mode = mode  # 'communities', 'details', 'houses'
         
+        # Requested limit_count; lowered to the API's cap once a page comes back short
+        self.page_size = int(page_size)
+        
         if city not in self.CITY_MAPPINGS:
             raise ValueError(f"Unsupported city: {city}. Available: {list(self.CITY_MAPPINGS.keys())}")
             
@@ -58,7 +70,7 @@ class MobileLianjiaSpider(scrapy.Spider):
             }
         )
     
-    def create_api_request(self, url, callback, method='GET', payload=None):
+    def create_api_request(self, url, callback, method='GET', payload=None, meta=None, priority=0):
         """Create authenticated API request with proper mobile headers"""
         if payload is None:
             payload = {}
@@ -85,6 +97,8 @@ class MobileLianjiaSpider(scrapy.Spider):
                 formdata=payload,
                 headers=headers,
                 callback=callback,
+                meta=meta,
+                priority=priority,
                 dont_filter=True
             )
         else:
@@ -92,6 +106,8 @@ class MobileLianjiaSpider(scrapy.Spider):
                 url=f"{url}?{urlencode(payload)}",
                 headers=headers,
                 callback=callback,
+                meta=meta,
+                priority=priority,
                 dont_filter=True
             )
     
@@ -179,25 +195,32 @@ class MobileLianjiaSpider(scrapy.Spider):
                     'data_source': 'mobile_api'
                 }
                 
-                # Start community crawling for this business circle
+                # Start community crawling for this business circle; all circles
+                # are queued at once and run within the concurrency budget
                 if self.mode in ['communities', 'details']:
-                    yield self.create_api_request(
-                        url='http://app.api.lianjia.com/house/community/search',
-                        callback=self.parse_communities,
-                        payload={
-                            'bizcircle_id': biz_circle['bizcircle_id'],
-                            'group_type': 'community',
-                            'limit_offset': 0,
-                            'city_id': city_info['city_id'],
-                            'limit_count': 30
-                        },
-                        meta={
-                            'biz_circle_id': biz_circle['bizcircle_id'],
-                            'biz_circle_name': biz_circle['bizcircle_name'],
-                            'city_id': city_info['city_id'],
-                            'district_id': district['district_id']
-                        }
-                    )
+                    yield self.community_search_request({
+                        'biz_circle_id': biz_circle['bizcircle_id'],
+                        'biz_circle_name': biz_circle['bizcircle_name'],
+                        'city_id': city_info['city_id'],
+                        'district_id': district['district_id'],
+                        'offset': 0
+                    })
+    
+    def community_search_request(self, meta, priority=0):
+        """community/search page for a business circle at meta['offset']"""
+        return self.create_api_request(
+            url=self.COMMUNITY_SEARCH_URL,
+            callback=self.parse_communities,
+            payload={
+                'bizcircle_id': meta['biz_circle_id'],
+                'group_type': 'community',
+                'limit_offset': meta['offset'],
+                'city_id': meta['city_id'],
+                'limit_count': self.page_size
+            },
+            meta=meta,
+            priority=priority
+        )
     
     def parse_communities(self, response):
         """Parse communities in a business circle"""
@@ -240,23 +263,27 @@ class MobileLianjiaSpider(scrapy.Spider):
                     meta={'community_data': community_data}
                 )
         
-        # Handle pagination
-        if has_more:
-            current_offset = response.meta.get('offset', 0)
-            new_offset = current_offset + len(communities)
-            
-            yield self.create_api_request(
-                url='http://app.api.lianjia.com/house/community/search',
-                callback=self.parse_communities,
-                payload={
-                    'bizcircle_id': meta['biz_circle_id'],
-                    'group_type': 'community',
-                    'limit_offset': new_offset,
-                    'city_id': meta['city_id'],
-                    'limit_count': 30
-                },
-                meta={**meta, 'offset': new_offset}
-            )
+        # Offsets were all scheduled by the circle's first page
+        if meta.get('fanned_out') or not has_more or not communities:
+            return
+        
+        circle_meta = {key: meta[key] for key in ('biz_circle_id', 'biz_circle_name', 'city_id', 'district_id')}
+        current_offset = meta.get('offset', 0)
+        step = len(communities)
+        if step < self.page_size:
+            # The API capped limit_count; use its page size from now on
+            self.logger.info(f"📏 community/search returns at most {step} per page")
+            self.page_size = step
+        
+        # Fan out every remaining offset once total_count is known; finish
+        # open circles before starting new ones
+        if current_offset == 0 and total_count > step:
+            for offset in range(step, total_count, step):
+                yield self.community_search_request({**circle_meta, 'offset': offset, 'fanned_out': True}, priority=1)
+            return
+        
+        # No total_count: follow has_more_data one page at a time
+        yield self.community_search_request({**circle_meta, 'offset': current_offset + step}, priority=1)
     
     def parse_community_details(self, response):
         """Parse community detail page (HTML)"""
@@ -7,13 +7,19 @@ Optimized for ScraperAPI and simplified for reliability
 
 import scrapy
 import re
-import json
-import time
 import random
+import sys
 from datetime import datetime
+from pathlib import Path
 from urllib.parse import urljoin, urlparse
 import logging
-from bs4 import BeautifulSoup
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parents[2]))
+from utils.lianjia_extraction import (
+    extract_listings, extract_numeric_size, extract_total_pages, has_listing_container,
+)
+from utils.block_detector import block_reason
 
 class SimpleLianjiaSpider(scrapy.Spider):
     name = "simple_lianjia"
@@ -61,6 +67,9 @@ class SimpleLianjiaSpider(scrapy.Spider):
         self.current_page = 1
         self.max_pages = 5  # Limit for testing
         
+        # Schedule all listing pages once the total is known (page_fanout=false to walk sequentially)
+        self.page_fanout = str(kwargs.get('page_fanout', 'true')).lower() not in ('0', 'false', 'no')
+        
         self.logger.info(f"🏠 Simple Lianjia Spider for {self.city_name}")
         self.logger.info(f"🔗 Start URLs: {self.start_urls}")
 
@@ -120,11 +129,8 @@ class SimpleLianjiaSpider(scrapy.Spider):
             self.logger.warning(f"🚫 Page appears to be blocked: {response.url}")
             return
         
-        # Use BeautifulSoup for parsing (like waugustus approach)
-        soup = BeautifulSoup(response.body, 'html.parser')
-        
         # Extract properties using waugustus method
-        properties = self._extract_properties_waugustus_style(soup, response)
+        properties = self._extract_properties_waugustus_style(response)
         
         self.logger.info(f"🏠 Found {len(properties)} properties on page {page}")
         
@@ -134,6 +140,15 @@ class SimpleLianjiaSpider(scrapy.Spider):
                 self.properties_found += 1
                 yield prop
 
+        # Fanned-out pages were all scheduled by page 1
+        if response.meta.get('fanned_out'):
+            return
+        
+        total_pages = extract_total_pages(response) if page == 1 and self.page_fanout else None
+        if total_pages and len(properties) > 0:
+            yield from self._fan_out_pages(response.url, min(total_pages, self.max_pages))
+            return
+        
         # Handle pagination (simplified)
         if len(properties) > 0 and page < self.max_pages:
             next_page = page + 1
@@ -142,13 +157,11 @@ class SimpleLianjiaSpider(scrapy.Spider):
             if next_url:
                 self.logger.info(f"➡️  Going to page {next_page}")
                 
-                # Add delay
-                time.sleep(random.uniform(2, 4))
-                
+                # Delay is applied by DelayedRequestScheduler without blocking the crawl
                 yield scrapy.Request(
                     url=next_url,
                     callback=self.parse,
-                    meta={'page': next_page},
+                    meta={'page': next_page, 'delay': random.uniform(2, 4)},
                     dont_filter=True,
                     errback=self.handle_error
                 )
@@ -158,36 +171,25 @@ class SimpleLianjiaSpider(scrapy.Spider):
         if response.status != 200:
             return True
         
-        # Check content length (blocked pages are usually very small)
-        if len(response.body) < 5000:
-            return True
-        
-        # Check for blocking keywords
-        text = response.text.lower()
-        blocking_indicators = [
-            '验证', 'captcha', 'verify', 'blocked',
-            '人机验证', '安全验证', '访问受限'
-        ]
-        
-        return any(indicator in text for indicator in blocking_indicators)
+        # List pages are never this small (blocked pages usually are)
+        return block_reason(response, min_html_bytes=5000) is not None
 
-    def _extract_properties_waugustus_style(self, soup, response):
+    def _extract_properties_waugustus_style(self, response):
         """Extract properties using waugustus/lianjia-spider approach"""
         properties = []
         
         # Find the property list container (sellListContent is the key selector)
-        house_list = soup.find('ul', {'class': 'sellListContent'})
-        if not house_list:
+        if not has_listing_container(response):
             self.logger.warning("❌ No 'sellListContent' found - page may be blocked")
             return properties
         
         # Extract each property (following waugustus logic)
-        house_items = house_list.find_all('li')
-        self.logger.info(f"🔍 Found {len(house_items)} house items in sellListContent")
+        listings = extract_listings(response)
+        self.logger.info(f"🔍 Found {len(listings)} house items in sellListContent")
         
-        for house in house_items:
+        for listing in listings:
             try:
-                property_data = self._extract_single_property_waugustus(house, response)
+                property_data = self._build_property_waugustus(listing, response)
                 if property_data:
                     properties.append(property_data)
             except Exception as e:
@@ -195,95 +197,57 @@ class SimpleLianjiaSpider(scrapy.Spider):
         
         return properties
 
-    def _extract_single_property_waugustus(self, house_element, response):
-        """Extract single property - exact waugustus approach"""
-        try:
-            # Find info div (waugustus approach)
-            info = house_element.find("div", {'class': 'info'})
-            if not info:
-                return None
-            
-            # Extract title and house_id (waugustus method)
-            house_title = info.find("div", {'class': 'title'})
-            if not house_title or not house_title.a:
-                return None
-            
-            title_link = house_title.a
-            house_id = self._extract_house_id_waugustus(title_link.get('href', ''))
-            title = title_link.get_text(strip=True)
+    def _build_property_waugustus(self, listing, response):
+        """Map one extracted listing to our schema - waugustus field layout"""
+        if not listing:
+            return None
+        
+        house_id = listing['house_id']
+        title = listing['title']
+        house_location = listing['location']
+        address_info = self._parse_address_waugustus(listing['address_parts'])
+        
+        # Build property data (compatible with your database)
+        property_data = {
+            # Core fields
+            'house_id': house_id,
+            'building_name_zh': house_location or title,
+            'title': title,
             
-            # Extract location (community name) - waugustus method
-            house_location = ''
-            flood_div = info.find("div", {'class': 'flood'})
-            if flood_div and flood_div.div and flood_div.div.a:
-                house_location = flood_div.div.a.get_text(strip=True)
+            # Location
+            'zone': 'China',
+            'city': self.city_name,
+            'district': self.district or '',
+            'location': house_location,
             
-            # Extract address details - waugustus method
-            address = info.find("div", {'class': 'address'})
-            address_info = self._parse_address_waugustus(address)
+            # Property details (from address parsing)
+            'type': [address_info.get('house_type', '住宅')],
+            'type_raw': address_info.get('house_type', '住宅'),
+            'size': address_info.get('house_size', ''),
+            'area': address_info.get('house_size_num', 0),
+            'orientation': address_info.get('house_towards', ''),
+            'floor': address_info.get('house_flood', ''),
+            'year_built': address_info.get('house_year', ''),
+            'building_type': address_info.get('house_building', ''),
             
-            # Extract price info - waugustus method
-            price_info = info.find("div", {'class': 'priceInfo'})
-            prices = self._parse_price_waugustus(price_info)
+            # Price (converted to proper format)
+            'deal_price': listing['total_price'],
+            'price_per_sqm': listing['unit_price'],
+            'deal_date': datetime.now().strftime('%Y-%m-%d'),
             
-            # Build property data (compatible with your database)
-            property_data = {
-                # Core fields
-                'house_id': house_id,
-                'building_name_zh': house_location or title,
-                'title': title,
-                
-                # Location
-                'zone': 'China',
-                'city': self.city_name,
-                'district': self.district or '',
-                'location': house_location,
-                
-                # Property details (from address parsing)
-                'type': [address_info.get('house_type', '住宅')],
-                'type_raw': address_info.get('house_type', '住宅'),
-                'size': address_info.get('house_size', ''),
-                'area': address_info.get('house_size_num', 0),
-                'orientation': address_info.get('house_towards', ''),
-                'floor': address_info.get('house_flood', ''),
-                'year_built': address_info.get('house_year', ''),
-                'building_type': address_info.get('house_building', ''),
-                
-                # Price (converted to proper format)
-                'deal_price': prices.get('total_price', 0),
-                'price_per_sqm': prices.get('unit_price', 0),
-                'deal_date': datetime.now().strftime('%Y-%m-%d'),
-                
-                # Source
-                'source_url': urljoin(response.url, title_link.get('href', '')),
-                'start_url': response.url,
-                'developer': '',
-                'status': 'active'
-            }
-            
-            # Validate (basic checks)
-            if house_id > 0 and property_data['deal_price'] > 0:
-                return property_data
-            
-        except Exception as e:
-            self.logger.debug(f"Property extraction error: {e}")
+            # Source
+            'source_url': urljoin(response.url, listing['href']),
+            'start_url': response.url,
+            'developer': '',
+            'status': 'active'
+        }
         
+        # Validate (basic checks)
+        if house_id > 0 and property_data['deal_price'] > 0:
+            return property_data
         return None
 
-    def _extract_house_id_waugustus(self, href):
-        """Extract house ID from href - waugustus method"""
-        if not href:
-            return 0
-        try:
-            # Pattern from waugustus: '/ershoufang/123456789.html'
-            match = re.search(r'/(\d+)\.html', href)
-            if match:
-                return int(match.group(1))
-        except:
-            pass
-        return 0
-
-    def _parse_address_waugustus(self, address_div):
+    def _parse_address_waugustus(self, address_parts):
         """Parse address info - waugustus approach"""
         info = {
             'house_type': '住宅',
@@ -295,20 +259,16 @@ class SimpleLianjiaSpider(scrapy.Spider):
             'house_building': ''
         }
         
-        if not address_div:
+        if not address_parts:
             return info
         
         try:
-            # waugustus approach: split by ' | '
-            address_text = address_div.get_text(strip=True)
-            address_parts = [part.strip() for part in address_text.split('|')]
-            
             # waugustus logic for parsing address parts
             if len(address_parts) >= 1:
                 info['house_type'] = address_parts[0]
             if len(address_parts) >= 2:
                 info['house_size'] = address_parts[1]
-                info['house_size_num'] = self._extract_size_number(address_parts[1])
+                info['house_size_num'] = extract_numeric_size(address_parts[1])
             if len(address_parts) >= 3:
                 info['house_towards'] = address_parts[2]
             if len(address_parts) >= 4:
@@ -329,73 +289,21 @@ class SimpleLianjiaSpider(scrapy.Spider):
         
         return info
 
-    def _extract_size_number(self, size_text):
-        """Extract numeric size from text"""
-        if not size_text:
-            return 0
-        try:
-            match = re.search(r'(\d+\.?\d*)', size_text)
-            if match:
-                return float(match.group(1))
-        except:
-            pass
-        return 0
-
-    def _parse_price_waugustus(self, price_info):
-        """Parse price info - waugustus approach"""
-        prices = {
-            'total_price': 0,
-            'unit_price': 0
-        }
-        
-        if not price_info:
-            return prices
-        
-        try:
-            # Total price - waugustus method
-            total_price_div = price_info.find("div", {'class': 'totalPrice'})
-            if total_price_div and total_price_div.span:
-                total_price_text = total_price_div.span.get_text(strip=True)
-                prices['total_price'] = self._parse_total_price_waugustus(total_price_text)
-            
-            # Unit price - waugustus method
-            unit_price_div = price_info.find("div", {'class': 'unitPrice'})
-            if unit_price_div and unit_price_div.span:
-                unit_price_text = unit_price_div.span.get_text(strip=True)
-                prices['unit_price'] = self._parse_unit_price_waugustus(unit_price_text)
-                
-        except Exception as e:
-            self.logger.debug(f"Price parsing error: {e}")
-        
-        return prices
-
-    def _parse_total_price_waugustus(self, price_text):
-        """Parse total price - waugustus method: '300万' -> 3000000"""
-        if not price_text:
-            return 0
-        try:
-            # waugustus approach: convert 万 to actual number
-            price_clean = re.sub(r'[^\d万.]', '', price_text)
-            if '万' in price_clean:
-                price_num = float(price_clean.replace('万', ''))
-                return int(price_num * 10000)  # Convert 万 to actual price
-            else:
-                return int(float(price_clean))
-        except:
-            return 0
-
-    def _parse_unit_price_waugustus(self, price_text):
-        """Parse unit price - waugustus method"""
-        if not price_text:
-            return 0
-        try:
-            # Extract from text like '单价33000元/平米' or just numbers
-            match = re.search(r'(\d+)', price_text)
-            if match:
-                return int(match.group(1))
-        except:
-            pass
-        return 0
+    def _fan_out_pages(self, first_page_url, last_page):
+        """Schedule pages 2..last_page at once; earlier pages get higher priority"""
+        self.logger.info(f"🚀 Scheduling pages 2-{last_page} concurrently for {first_page_url}")
+        for next_page in range(2, last_page + 1):
+            next_url = self._build_next_page_url(first_page_url, next_page)
+            if not next_url:
+                continue
+            yield scrapy.Request(
+                url=next_url,
+                callback=self.parse,
+                priority=-next_page,
+                meta={'page': next_page, 'fanned_out': True},
+                dont_filter=True,
+                errback=self.handle_error
+            )
 
     def _build_next_page_url(self, current_url, next_page):
         """Build next page URL"""
@@ -3,7 +3,6 @@ import os
 import scrapy
 from scrapy.spiders import CrawlSpider
 from scrapy import signals
-from scrapy.signalmanager import dispatcher
 from datetime import datetime, timedelta
 import yaml
 from pathlib import Path
@@ -11,8 +10,10 @@ import sys
 import re
 import urllib.parse
 import json
+import hashlib
 sys.path.append(str(Path(__file__).parents[2]))
 from utils.config_loader import load_config
+from utils.watermark_store import WatermarkStore
 
 
 
@@ -176,6 +177,33 @@ def generate_fields(record, config_fields, response=None, xpath_map=None):
     return fields
 
 
+def compile_field_getters(config_fields):
+    """
+    Precompile a config `fields` mapping into a record -> fields function.
+    Same semantics as generate_fields() without an HTML fallback, but the
+    key lists are resolved once per config instead of once per record.
+    """
+    getters = []
+    for std_field, source in config_fields.items():
+        keys = source if isinstance(source, list) else [source]
+        getters.append((std_field, tuple(key for key in keys if key)))
+
+    def map_record(record):
+        get = record.get
+        fields = {}
+        for std_field, keys in getters:
+            value = None
+            for key in keys:
+                candidate = get(key)
+                if candidate not in (None, "", []):
+                    value = candidate
+                    break
+            fields[std_field] = value
+        return fields
+
+    return map_record
+
+
 def classify_type(record, item_type, mapping):
     raw_type = record.get("tx_type") or record.get("property_type")
     if item_type == "store":
@@ -185,8 +213,36 @@ def classify_type(record, item_type, mapping):
     return raw_type
 
 
+# Record keys that identify a JSON transaction on their own
+JSON_ID_KEYS = ("id", "tx_id", "txId", "transaction_id")
+# Otherwise a deal is identified by these mapped fields, like create_deal_id
+DEAL_IDENTITY_FIELDS = ("building_name_zh", "floor", "unit", "area", "deal_date", "deal_price")
+
+
+def source_key(cfg, url):
+    """
+    Watermark key for one listing feed: an explicit `source`, else the
+    feed's start URL (host, path and query). Several feeds on one host,
+    like the property.hk categories, each get their own watermark.
+    """
+    if cfg.get("source"):
+        return cfg["source"]
+    parts = urllib.parse.urlsplit(url)
+    return parts.netloc + parts.path + (f"?{parts.query}" if parts.query else "")
+
+
 class StoreSpider(CrawlSpider):
     name = "store_spider"
+    # Site configs under config/; also read by the combined job to find shared sites
+    config_files = ("hk_store.yaml", "cn_store.yaml")
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # connect summary writer to this crawler only; the global dispatcher
+        # would also fire it when another spider in the process closes
+        crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
+        return spider
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -204,19 +260,25 @@ class StoreSpider(CrawlSpider):
         self.previous_deals = self.load_previous_deals()
         self.current_deals = set()
 
+        # JSON sources: fan out cursor pages after the first one (json_fanout=false to disable)
+        self.json_fanout = str(kwargs.get('json_fanout', 'true')).lower() not in ('0', 'false', 'no')
+        self.json_pages = {}
+        self.json_mappers = {}
+
+        # Per-source watermark (newest deal date + fingerprint) from the last run
+        self.watermarks = WatermarkStore(kwargs.get('watermark_file', 'crawl_watermarks.json'))
+
         # load your site configs using absolute paths
         config_dir = Path(__file__).parents[2] / "config"
-        self.configs  = load_config(str(config_dir / "hk_store.yaml"))
-        self.configs += load_config(str(config_dir / "cn_store.yaml"))
+        self.configs = []
+        for config_file in self.config_files:
+            self.configs += load_config(str(config_dir / config_file))
 
         # load type mappings
         tm_path = config_dir / "type_mapping.yaml"
         with open(tm_path, encoding="utf-8") as f:
             self.type_mapping = yaml.safe_load(f)
 
-        # connect summary writer
-        dispatcher.connect(self.spider_closed, signals.spider_closed)
-
         # counters
         self.item_count  = 0
         self.error_count = 0
@@ -365,24 +427,31 @@ class StoreSpider(CrawlSpider):
                     url,
                     callback=self.parse_json,
                     headers={"Accept": "application/json"},
-                    meta={"config": cfg, "cursor": 0}
+                    meta={"config": cfg, "cursor": 0, "source": source_key(cfg, url)}
                 )
             else:
                 for base_url in cfg["start_urls"]:
+                    source = source_key(cfg, base_url)
                     # Generate URL based on monitoring mode
                     if self.monitoring_mode == 'weekly':
                         # Check last 14 days for newly posted deals
                         monitoring_url = self.generate_weekly_url(base_url)
                         self.logger.info(f"� Weekly check: {monitoring_url}")
                     else:
-                        # Daily mode: check broader range but filter new deals
-                        monitoring_url = self.generate_monitoring_url(base_url)
+                        # Daily mode: only ask for dates from the last watermark onwards
+                        since, _ = self.watermarks.get(source)
+                        monitoring_url = self.generate_monitoring_url(base_url, since=since)
                         self.logger.info(f"📍 Daily monitoring: {monitoring_url}")
                     
                     yield scrapy.Request(
                         monitoring_url,
                         callback=self.parse_listing_page,
-                        meta={"config": cfg},
+                        meta={
+                            "config": cfg,
+                            "source": source,
+                            # Lets ConditionalRequestMiddleware skip pages whose rows are unchanged
+                            "rows_xpath": cfg["xpaths"].get("rows", ["//tbody/tr"])[0],
+                        },
                         headers={
                             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                         }
@@ -407,10 +476,13 @@ class StoreSpider(CrawlSpider):
         
         return base_url
 
-    def generate_monitoring_url(self, base_url):
-        """Generate URL for daily monitoring (last 7 days to catch recent additions)"""
+    def generate_monitoring_url(self, base_url, since=None):
+        """
+        Generate URL for daily monitoring. Starts at the source watermark date
+        when one exists, otherwise covers the last 7 days to catch recent additions.
+        """
         today = datetime.now()
-        start_date = today - timedelta(days=7)  # Check last week for new additions
+        start_date = since or (today - timedelta(days=7))
         
         start_str = start_date.strftime("%d%%2F%m%%2F%Y")
         end_str = today.strftime("%d%%2F%m%%2F%Y")
@@ -426,8 +498,14 @@ class StoreSpider(CrawlSpider):
         
         return base_url
 
+    def has_watermark(self, source):
+        mark_date, mark_fingerprint = self.watermarks.get(source)
+        return mark_date is not None or mark_fingerprint is not None
+
     def parse_listing_page(self, response):
         cfg      = response.meta["config"]
+        source   = response.meta.get("source") or source_key(cfg, response.url)
+        use_watermark = self.monitoring_mode == 'daily' and self.has_watermark(source)
         # log out the raw xpaths you’ll try
         self.logger.debug(f"Trying xpaths for 'type': {cfg['xpaths'].get('type')}")
         raw_type = extract_first(response, cfg["xpaths"]["type"], default="").strip()
@@ -548,12 +626,18 @@ class StoreSpider(CrawlSpider):
             deal_id = self.create_deal_id(item)
             self.current_deals.add(deal_id)
             
-            # Check if this deal is from today (only in daily mode)
-            if self.monitoring_mode == 'daily':
-                deal_date = item.get('deal_date', '')
+            deal_date = item.get('deal_date', '')
+            if use_watermark:
+                # Rows are newest first: everything from the watermark down was seen last run
+                if self.watermarks.is_reached(source, deal_date, deal_id):
+                    self.logger.info(f"🛑 STOPPING: Reached watermark for {source} at {deal_date}")
+                    return
+            elif self.monitoring_mode == 'daily':
+                # No watermark yet (first run): only take today's deals
                 if not self.is_today_deal(deal_date):
                     self.logger.info(f"🛑 STOPPING: Found deal from {deal_date} (not today), stopping crawl")
                     return  # Stop processing when we hit a non-today deal
+            self.watermarks.observe(source, deal_date, deal_id)
             
             # Check if this is a newly posted deal
             if self.is_new_deal(deal_id):
@@ -572,17 +656,118 @@ class StoreSpider(CrawlSpider):
     def parse_json(self, response):
         cfg    = response.meta["config"]
         cursor = response.meta["cursor"]
-        data   = response.json()
+        source = response.meta.get("source") or source_key(cfg, response.url)
+        use_watermark = self.monitoring_mode == 'daily' and self.has_watermark(source)
+        data   = self.json_body(response)
+        if data is None:
+            return
         txs    = data.get("transactions", [])
 
+        items, reached_watermark = self.process_json_records(cfg, source, txs, use_watermark)
+        yield from items
+        if reached_watermark:
+            return
+
+        total = data.get("count", 0)
+        # The watermark bounds a sequential walk exactly, so only fan out without one
+        if self.json_fanout and cursor == 0 and txs and not use_watermark:
+            yield from self.fan_out_json_pages(response, cfg, source, len(txs), total)
+            return
+
+        next_cursor = cursor + len(txs)
+        if next_cursor < total:
+            next_url = cfg["json_url_template"].format(cursor=next_cursor)
+            yield scrapy.Request(
+                next_url,
+                callback=self.parse_json,
+                headers=response.request.headers,
+                meta={"config": cfg, "cursor": next_cursor, "source": source}
+            )
+
+    def fan_out_json_pages(self, response, cfg, source, page_size, total):
+        """
+        Schedule every remaining cursor page as soon as the first page reports
+        `count`. The scheduler keeps them within CONCURRENT_REQUESTS_PER_DOMAIN;
+        descending priorities make earlier pages download first.
+        """
+        cursors = list(range(page_size, total, page_size))
+        if not cursors:
+            return
+        self.json_pages[source] = {"config": cfg, "next": 1, "last": len(cursors), "buffer": {}}
+        self.logger.info(f"🚀 Fanning out {len(cursors)} JSON pages for {source} ({total} records)")
+        for page_index, next_cursor in enumerate(cursors, start=1):
+            yield scrapy.Request(
+                cfg["json_url_template"].format(cursor=next_cursor),
+                callback=self.parse_json_page,
+                errback=self.json_page_failed,
+                headers=response.request.headers,
+                priority=-page_index,
+                meta={"config": cfg, "cursor": next_cursor, "source": source, "page_index": page_index}
+            )
+
+    def parse_json_page(self, response):
+        source = response.meta["source"]
+        data = self.json_body(response)
+        # An undecodable page is merged as empty, like a failed download
+        txs = data.get("transactions", []) if data is not None else []
+        self.json_pages[source]["buffer"][response.meta["page_index"]] = txs
+        yield from self.flush_json_pages(source)
+
+    def json_body(self, response):
+        """The decoded JSON object of a response; None for an HTML or error body"""
+        try:
+            data = response.json()
+        except (ValueError, AttributeError) as e:
+            data = e
+        if isinstance(data, dict):
+            return data
+        self.error_count += 1
+        self.logger.warning(f"WARNING: Not a JSON transactions page ({response.status}): {response.url}")
+        return None
+
+    def json_page_failed(self, failure):
+        meta = failure.request.meta
+        self.error_count += 1
+        self.logger.warning(f"WARNING: JSON page {meta['page_index']} failed for {meta['source']}: {failure.value}")
+        # An empty page keeps the in-order merge moving past the failure
+        self.json_pages[meta["source"]]["buffer"][meta["page_index"]] = []
+        yield from self.flush_json_pages(meta["source"])
+
+    def flush_json_pages(self, source):
+        """Emit buffered fan-out pages in cursor order, as far as they are contiguous"""
+        state = self.json_pages[source]
+        buffer = state["buffer"]
+        while state["next"] in buffer:
+            txs = buffer.pop(state["next"])
+            items, _ = self.process_json_records(state["config"], source, txs, use_watermark=False)
+            yield from items
+            state["next"] += 1
+        if state["next"] > state["last"]:
+            del self.json_pages[source]
+
+    def process_json_records(self, cfg, source, txs, use_watermark):
+        """Map one page of JSON transactions to items; returns (items, reached_watermark)"""
+        mapper = self.json_mappers.get(id(cfg))
+        if mapper is None:
+            mapper = self.json_mappers[id(cfg)] = compile_field_getters(cfg["fields"])
+
+        items = []
         for rec in txs:
-            # Check if deal is from today
             deal_date = rec.get("tx_date", "")  # Use tx_date field from JSON
-            if not self.is_today_deal(deal_date):
-                self.logger.debug(f"⏭️  Skipping JSON deal from {deal_date} (not today)")
-                continue
-                
-            item = generate_fields(rec, cfg["fields"])
+            if use_watermark:
+                fingerprint = self.json_deal_id(cfg, rec)
+                if self.watermarks.is_reached(source, deal_date, fingerprint):
+                    self.logger.info(f"🛑 STOPPING: Reached watermark for {source} at {deal_date}")
+                    return items, True
+                self.watermarks.observe(source, deal_date, fingerprint)
+            else:
+                # Check if deal is from today
+                if not self.is_today_deal(deal_date):
+                    self.logger.debug(f"⏭️  Skipping JSON deal from {deal_date} (not today)")
+                    continue
+                self.watermarks.observe(source, deal_date, self.json_deal_id(cfg, rec))
+
+            item = mapper(rec)
             item["zone"]     = cfg["zone"]
             item["type_raw"] = rec.get("tx_type")
             item["type"]     = classify_type(rec, cfg["type"], self.type_mapping)
@@ -594,22 +779,36 @@ class StoreSpider(CrawlSpider):
             
             self.logger.info(f"✅ Found today's JSON deal: {item.get('building_name_zh', 'N/A')}")
             self.item_count += 1
-            yield item
+            items.append(item)
+        return items, False
 
-        total = data.get("count", 0)
-        next_cursor = cursor + len(txs)
-        if next_cursor < total:
-            next_url = cfg["json_url_template"].format(cursor=next_cursor)
-            yield scrapy.Request(
-                next_url,
-                callback=self.parse_json,
-                headers=response.request.headers,
-                meta={"config": cfg, "cursor": next_cursor}
-            )
+    @staticmethod
+    def json_deal_id(cfg, rec):
+        """
+        Fingerprint a raw JSON transaction by what identifies the deal: the
+        record's own id when it has one, else its building, floor, unit,
+        area, date and price. Other fields (view counts, agent details) can
+        change between runs without changing the fingerprint.
+        """
+        for key in JSON_ID_KEYS:
+            if rec.get(key) not in (None, ""):
+                return f"id:{rec[key]}"
+        values = []
+        for field in DEAL_IDENTITY_FIELDS:
+            source = cfg["fields"].get(field)
+            keys = source if isinstance(source, list) else [source]
+            values.append(next((str(rec[key]).strip() for key in keys
+                                if key and rec.get(key) not in (None, "")), ""))
+        return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
 
     def spider_closed(self, spider):
         # Save current deals for next comparison
         self.save_current_deals()
+        try:
+            self.watermarks.save()
+            self.logger.info(f"💾 Saved crawl watermarks to {self.watermarks.path}")
+        except Exception as e:
+            self.logger.warning(f"WARNING: Could not save crawl watermarks: {e}")
         
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
         mode_info = f"Mode: {self.monitoring_mode}"
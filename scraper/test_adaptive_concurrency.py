@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test adaptive per-domain concurrency: limits, spider overrides and new slots
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy import Request, Spider
+from scrapy.http import Response
+from scrapy.utils.test import get_crawler
+
+from middlewares.adaptive_concurrency import AdaptiveConcurrency
+
+LISTING = b'<html><body>' + b'<div class="deal">ok</div>' * 200 + b'</body></html>'
+
+SETTINGS = {
+    'ADAPTIVE_CONCURRENCY_ENABLED': True,
+    'ADAPTIVE_CONCURRENCY_DOMAINS': {'lianjia.com': {'max_concurrency': 2, 'min_delay': 2}},
+    'DOWNLOAD_DELAY': 1,
+}
+
+
+class SlotDownloader:
+    """The parts of scrapy's Downloader the extension touches: slots and their per-slot settings"""
+
+    def __init__(self, settings):
+        self.slots = {}
+        self.per_slot_settings = settings.getdict('DOWNLOAD_SLOTS')
+        self.concurrency = settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN')
+        self.delay = settings.getfloat('DOWNLOAD_DELAY')
+
+    def get_slot_key(self, request):
+        return request.meta.get('download_slot') or urlparse(request.url).hostname
+
+    def new_slot(self, request):
+        """Create the request's slot the way the downloader does"""
+        key = self.get_slot_key(request)
+        if key not in self.slots:
+            slot_settings = self.per_slot_settings.get(key, {})
+            self.slots[key] = SimpleNamespace(concurrency=slot_settings.get('concurrency', self.concurrency),
+                                              delay=slot_settings.get('delay', self.delay))
+        request.meta['download_slot'] = key
+        return self.slots[key]
+
+
+class FastApiSpider(Spider):
+    name = 'fast_api'
+    custom_settings = {'CONCURRENT_REQUESTS_PER_DOMAIN': 8, 'DOWNLOAD_DELAY': 0.5}
+
+
+def build(spider_cls):
+    crawler = get_crawler(spider_cls, SETTINGS)
+    crawler.engine = SimpleNamespace(downloader=SlotDownloader(crawler.settings))
+    return AdaptiveConcurrency(crawler), crawler.engine.downloader
+
+
+def reach_downloader(extension, downloader, url):
+    """What the downloader does for a new request: create the slot, then signal"""
+    request = Request(url)
+    slot = downloader.new_slot(request)
+    extension.request_reached_downloader(request)
+    return request, slot
+
+
+def test_project_limits_apply_from_the_first_request():
+    print("🐢 Testing per-domain limits on a new slot...")
+    extension, downloader = build(Spider)
+    # Before the slot exists, as when the signal comes before download_slot is set
+    extension.request_reached_downloader(Request('https://bj.lianjia.com/chengjiao/'))
+    slot = downloader.new_slot(Request('https://bj.lianjia.com/chengjiao/pg2/'))
+    assert (slot.concurrency, slot.delay) == (1, 2)
+
+    request, slot = reach_downloader(extension, downloader, 'https://bj.lianjia.com/chengjiao/pg3/')
+    for _ in range(20):
+        extension.response_downloaded(Response(request.url, status=200, body=LISTING, headers={'Content-Type': 'text/html'}), request)
+    assert slot.concurrency == 2  # Domain ceiling
+    print("   ✅ Slot started at concurrency 1, delay 2s and climbed to the domain's 2")
+
+
+def test_spider_settings_take_precedence():
+    print("🚀 Testing a spider's own concurrency and delay...")
+    extension, downloader = build(FastApiSpider)
+    request, slot = reach_downloader(extension, downloader, 'https://app.api.lianjia.com/house/chengjiao')
+    assert (slot.concurrency, slot.delay) == (8, 0.5)
+
+    for _ in range(20):
+        extension.response_downloaded(Response(request.url, status=200, body=b'{"data": []}',
+                                                     headers={'Content-Type': 'application/json'}), request)
+    assert (slot.concurrency, slot.delay) == (8, 0.5)  # Never above the spider's own rate
+
+    blocked = Response(request.url, status=429, body=b'Too Many Requests')
+    extension.response_downloaded(blocked, request)
+    assert slot.concurrency == 4
+    print("   ✅ Started at the spider's 8 / 0.5s despite the lianjia.com entry, halved on a block")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing adaptive concurrency")
+    print("=" * 40)
+    test_project_limits_apply_from_the_first_request()
+    test_spider_settings_take_precedence()
+    print("\n🎉 All adaptive concurrency tests passed!")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test non-blocking retry backoff: jittered delays, per-domain budgets, proxy switching
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy import Request, Spider
+from scrapy.http import Response
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.test import get_crawler
+from twisted.internet.task import deferLater
+
+from command.spider_runner import SpiderJob, SpiderRunner
+from middlewares.backoff_retry_middleware import BackoffRetryMiddleware
+from middlewares.enhanced_proxy_middleware import EnhancedProxyMiddleware, ProxyRetryMiddleware
+from middlewares.proxy_scorer import ProxyScorer
+
+
+SENT = {}  # Request name -> seconds after start it was sent / parsed
+PARSED = {}
+
+
+def build(middleware_cls, **settings):
+    crawler = get_crawler(Spider, dict({'RETRY_TIMES': 5, 'RETRY_BACKOFF_BASE': 1,
+                                        'RETRY_BACKOFF_MAX': 60}, **settings))
+    crawler.spider = crawler._create_spider('retry_test')
+    return middleware_cls.from_crawler(crawler)
+
+
+def fail(middleware, request, status=503):
+    return middleware.process_response(request, Response(request.url, status=status, request=request))
+
+
+def test_jittered_backoff():
+    print("⏱️ Testing jittered exponential backoff...")
+    random.seed(7)
+    middleware = build(BackoffRetryMiddleware)
+    delays = []
+    request = Request('https://a.example/list')
+    for attempt in range(1, 4):
+        request = fail(middleware, request)
+        delay = request.meta['delay']
+        assert 0.5 * 2 ** attempt <= delay <= 1.5 * 2 ** attempt, (attempt, delay)
+        delays.append(delay)
+
+    samples = {round(middleware.backoff(2), 3) for _ in range(20)}
+    assert len(samples) > 10  # Retries of one burst don't come back together
+    assert all(middleware.backoff(10) <= 60 for _ in range(20))
+    print(f"   ✅ Delays {[round(d, 1) for d in delays]}, capped at 60s")
+
+
+def test_domain_retry_budget():
+    print("💸 Testing per-domain retry budgets...")
+    middleware = build(BackoffRetryMiddleware, RETRY_DOMAIN_BUDGET_MIN=2, RETRY_DOMAIN_BUDGET_RATIO=0)
+    dying = [Request(f'https://dying.example/{i}') for i in range(3)]
+    results = [fail(middleware, request) for request in dying]
+
+    assert all(isinstance(result, Request) for result in results[:2])
+    assert isinstance(results[2], Response)  # Budget spent: the failure is returned, not retried
+    assert middleware.crawler.stats.get_value('retry/budget_exhausted') == 1
+    assert isinstance(fail(middleware, Request('https://healthy.example/')), Request)
+    print("   ✅ Third failure on the dying domain given up, other domains still retried")
+
+
+def test_retry_avoids_failed_proxy():
+    print("🔄 Testing that proxy errors retry through another proxy...")
+    middleware = build(ProxyRetryMiddleware)
+    request = Request('https://a.example/list', meta={'proxy': 'http://p1:8080', 'proxy_address': 'p1:8080'})
+    retry = fail(middleware, request, status=502)
+
+    assert retry.meta['exclude_proxy'] == 'p1:8080'
+    assert 'proxy' not in retry.meta and 'proxy_address' not in retry.meta
+    assert retry.meta['delay'] > 0
+
+    pool = SimpleNamespace(working_proxies=['p1:8080', 'p2:8080', 'p3:8080'], scorer=ProxyScorer())
+    picks = {EnhancedProxyMiddleware.get_next_proxy(pool, 'a.example', retry.meta['exclude_proxy'])
+             for _ in range(50)}
+    assert picks and 'p1:8080' not in picks
+    print(f"   ✅ Retry excluded p1:8080 and went out via {sorted(picks)}")
+
+
+class FailingHostHandler(BaseHTTPRequestHandler):
+    """503 for every /fail page, 200 for everything else"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(503 if self.path.startswith('/fail') else 200)
+        self.end_headers()
+        self.wfile.write(b'<html>page</html>')
+
+
+class RetryBurstSpider(Spider):
+    name = 'retry_burst'
+    port = None
+    started = None
+    burst = 8
+
+    async def start(self):
+        from twisted.internet import reactor
+        RetryBurstSpider.started = time.monotonic()
+        for i in range(self.burst):
+            yield Request(f'http://127.0.0.1:{self.port}/fail/{i}', meta={'name': f'fail{i}'})
+        # By now every failure has come back and is waiting out its backoff
+        await maybe_deferred_to_future(deferLater(reactor, 0.5, lambda: None))
+        SENT['other'] = time.monotonic() - self.started
+        yield Request(f'http://localhost:{self.port}/ok', meta={'name': 'other'})
+
+    def parse(self, response):
+        PARSED[response.meta['name']] = time.monotonic() - self.started
+
+
+def test_waiting_retries_hold_no_download_slots():
+    print("🚦 Testing that retries waiting out their backoff don't hold up another host...")
+    settings = {
+        'DOWNLOADER_MIDDLEWARES': {
+            'scrapy.downloadermiddlewares.retry.RetryMiddleware': None,
+            'middlewares.backoff_retry_middleware.BackoffRetryMiddleware': 550,
+        },
+        'ITEM_PIPELINES': {},
+        'EXTENSIONS': {},
+        'DOWNLOAD_DELAY': 0,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 8,
+        'RETRY_TIMES': 1,
+        'RETRY_BACKOFF_BASE': 1.5,  # First retry waits 1.5-4.5s
+        'TELNETCONSOLE_ENABLED': False,
+        'LOG_LEVEL': 'WARNING',
+    }
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FailingHostHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    RetryBurstSpider.port = server.server_address[1]
+    try:
+        runner = SpiderRunner(settings=settings)
+        # Enough waiting retries to fill every global download slot
+        RetryBurstSpider.burst = runner.settings.getint('CONCURRENT_REQUESTS')
+        result = runner.run([SpiderJob(RetryBurstSpider)])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stats = result['retry_burst']['stats']
+    assert result['retry_burst']['success']
+    assert stats.get('retry/count') == RetryBurstSpider.burst
+    assert stats.get('request_delay/count') == RetryBurstSpider.burst
+    # Went out while all the retries were still waiting, not after them
+    assert PARSED['other'] - SENT['other'] < 0.5, (SENT, PARSED)
+    assert PARSED['other'] < 1.5, PARSED
+    print(f"   ✅ {RetryBurstSpider.burst} retries waiting, other host's page parsed "
+          f"{PARSED['other'] - SENT['other']:.2f}s after it was sent")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing backoff retries")
+    print("=" * 40)
+    test_jittered_backoff()
+    test_domain_retry_budget()
+    test_retry_avoids_failed_proxy()
+    test_waiting_retries_hold_no_download_slots()
+    print("\n🎉 All backoff retry tests passed!")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test the shared block detector used by the anti-bot middlewares and spiders
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_lianjia_extraction import build_sample_page
+from utils.block_detector import block_reason
+
+
+def scrapy_like(body, status=200, content_type=b'text/html; charset=utf-8'):
+    return SimpleNamespace(status=status, body=body, headers={'Content-Type': content_type})
+
+
+def test_reason_codes():
+    print("🚦 Testing block reasons...")
+    padding = b' ' * 1000
+    assert block_reason(scrapy_like(b'', status=429)) == 'status_429'
+    assert block_reason(scrapy_like(padding + '请输入验证码'.encode('utf-8'))) == 'captcha'
+    assert block_reason(scrapy_like(padding + b'<h1>Access Denied</h1>')) == 'access_denied'
+    assert block_reason(scrapy_like(padding + b'Robot detected')) == 'bot_check'
+    assert block_reason(scrapy_like(b'<html></html>')) == 'empty_page'
+    print("   ✅ Status, markers and size each give their own reason")
+
+
+def test_clean_pages_pass():
+    print("🏠 Testing pages that are not blocks...")
+    page = build_sample_page(listings=30)
+    assert block_reason(scrapy_like(page)) is None
+    assert block_reason(scrapy_like(b'<meta name="robots" content="index">' + page)) is None
+    assert block_reason(scrapy_like(b'', status=404)) is None
+    assert block_reason(scrapy_like(b'\x89PNG', content_type=b'image/png')) is None
+    assert block_reason(scrapy_like(b'{"errno":0}', content_type=b'application/json')) is None
+    # Markers past the scanned prefix are ignored
+    assert block_reason(scrapy_like(page + b' ' * 20000 + b'captcha')) is None
+    print("   ✅ Listing pages, robots meta, binaries and small JSON pass")
+
+
+def test_single_pass_markers():
+    print("🔎 Testing the compiled marker scan...")
+    padding = b' ' * 1000
+    assert block_reason(scrapy_like(padding + b'<p>Request BLOCKED.</p>')) == 'bot_check'
+    assert block_reason(scrapy_like(padding + b'<a href="/robots.txt">unblocked-ish</a>')) is None
+    assert block_reason(scrapy_like(padding + b'CAPTCHA_TOKEN')) == 'captcha'  # '_' is a boundary
+    # The earliest marker in the page gives the reason
+    assert block_reason(scrapy_like(padding + b'Too many requests - solve the captcha')) == 'rate_limited'
+    print("   ✅ Case-insensitive, whole-word ASCII markers in one search")
+
+
+def test_requests_responses():
+    print("🌐 Testing requests-style responses...")
+    response = SimpleNamespace(status_code=200, content=b' ' * 1000 + b'Too Many Requests',
+                               headers={'Content-Type': 'text/html'})
+    assert block_reason(response) == 'rate_limited'
+    print("   ✅ status_code/content responses use the same rules")
+
+
+if __name__ == "__main__":
+    test_reason_codes()
+    test_clean_pages_pass()
+    test_single_pass_markers()
+    test_requests_responses()
+    print("\n🎯 All block detector tests passed")
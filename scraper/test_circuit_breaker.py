@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test the per-domain circuit breaker and the crawl-wide retry budget
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy import Request
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+from twisted.internet.task import Clock
+
+from middlewares.circuit_breaker import CircuitBreakerMiddleware
+
+
+def build_breaker(**settings):
+    crawler = get_crawler(settings_dict={
+        'CIRCUIT_BREAKER_ENABLED': True,
+        'CIRCUIT_BREAKER_MIN_REQUESTS': 4,
+        'CIRCUIT_BREAKER_COOLDOWN': 10,
+        'CIRCUIT_BREAKER_MAX_PROBES': 2,
+        **settings,
+    })
+    crawled = []
+    crawler.engine = SimpleNamespace(crawl=crawled.append)
+    breaker = CircuitBreakerMiddleware.from_crawler(crawler)
+    breaker.clock = Clock()
+    return breaker, crawled
+
+
+def download(breaker, url, status):
+    request = Request(url)
+    breaker.request_scheduled(request)
+    response = HtmlResponse(url, status=status, body=b'<html>' + b'x' * 600 + b'</html>')
+    breaker.response_downloaded(response, request)
+    breaker.request_left_downloader(request)
+
+
+def schedule(breaker, request):
+    try:
+        breaker.request_scheduled(request)
+        return True
+    except IgnoreRequest:
+        return False
+
+
+def test_dead_domain_is_parked_and_released():
+    print("🔌 Testing circuit open, probe and release...")
+    breaker, crawled = build_breaker()
+    for i in range(4):
+        download(breaker, f'https://dead.example/{i}', 503)
+        download(breaker, f'https://ok.example/{i}', 200)
+
+    assert not schedule(breaker, Request('https://dead.example/next'))
+    assert not schedule(breaker, Request('https://dead.example/later'))
+    assert schedule(breaker, Request('https://ok.example/next'))
+    queued = Request('https://dead.example/queued')
+    assert breaker.process_request(queued).meta['circuit_parked']
+
+    # The probe goes out after the cooldown and its success releases the rest
+    breaker.clock.advance(10)
+    probe = crawled.pop()
+    assert probe.url == 'https://dead.example/next' and schedule(breaker, probe)
+    breaker.response_downloaded(HtmlResponse(probe.url, body=b'x' * 600), probe)
+    assert [r.url for r in crawled] == ['https://dead.example/later']
+    assert schedule(breaker, crawled[0])
+    print("   ✅ Dead domain parked while the healthy one kept going")
+
+
+def test_failed_probes_drop_domain():
+    print("⛔ Testing a domain that never recovers...")
+    breaker, crawled = build_breaker()
+    for i in range(4):
+        download(breaker, f'https://dead.example/{i}', 500)
+    for i in range(3):
+        schedule(breaker, Request(f'https://dead.example/parked/{i}'))
+
+    for cooldown in (10, 20):
+        breaker.clock.advance(cooldown)
+        probe = crawled.pop()
+        breaker.request_left_downloader(probe)  # Connection error
+
+    assert breaker.crawler.stats.get_value('circuit_breaker/dropped') == 1
+    assert not schedule(breaker, Request('https://dead.example/new'))
+    assert not breaker.clock.getDelayedCalls()
+    print("   ✅ Parked and new requests dropped after the last probe")
+
+
+def test_global_retry_budget():
+    print("💸 Testing the crawl-wide retry budget...")
+    breaker, _ = build_breaker(RETRY_BUDGET_MIN=2, RETRY_BUDGET_RATIO=0.5)
+    for i in range(4):
+        assert schedule(breaker, Request(f'https://ok.example/{i}'))
+    retries = [schedule(breaker, Request(f'https://ok.example/{i}', meta={'retry_times': 1}))
+               for i in range(6)]
+    assert retries == [True] * 4 + [False] * 2
+    print("   ✅ 2 + 0.5 per first attempt retries allowed, the rest dropped")
+
+
+if __name__ == "__main__":
+    test_dead_domain_is_parked_and_released()
+    test_failed_probes_drop_domain()
+    test_global_retry_budget()
+    print("🎉 All circuit breaker tests passed!")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test conditional requests: stable page keys, commit-after-parse and pruning
+"""
+
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy import Request
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import HtmlResponse
+
+from middlewares.conditional_request_middleware import ConditionalRequestMiddleware
+
+ROWS = '<table><tr class="row"><td>Deal A</td></tr><tr class="row"><td>Deal B</td></tr></table>'
+BASE = 'https://oir.centanet.com/en/transaction/?type=shop&daterang='
+
+
+class Stats:
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+
+
+def middleware(path):
+    return ConditionalRequestMiddleware(SimpleNamespace(stats=Stats()), path)
+
+
+def fetch(mw, url):
+    """Run one listing page through the middleware; the response, or None if dropped"""
+    request = Request(url, meta={'rows_xpath': '//tr[@class="row"]'})
+    mw.process_request(request, None)
+    response = HtmlResponse(url, body=ROWS.encode('utf-8'), encoding='utf-8',
+                            headers={'ETag': '"abc"'}, request=request)
+    try:
+        return mw.process_response(request, response, None)
+    except IgnoreRequest:
+        return None
+
+
+def test_moving_date_window_keeps_its_fingerprint():
+    print("📅 Testing pages whose date window moves every run...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'page_fingerprints.json')
+        first = middleware(path)
+        assert fetch(first, BASE + '01/08/2025-20/08/2025') is not None
+        first.spider_closed(None)
+
+        second = middleware(path)
+        request = Request(BASE + '02/08/2025-21/08/2025')
+        second.process_request(request, None)
+        assert request.headers.get('If-None-Match') == b'"abc"'
+        assert fetch(second, BASE + '02/08/2025-21/08/2025') is None
+        second.spider_closed(None)
+
+        with open(path, encoding='utf-8') as f:
+            pages = json.load(f)['pages']
+    assert list(pages) == ['https://oir.centanet.com/en/transaction/?type=shop']
+    print("   ✅ One fingerprint per page across runs, unchanged rows skipped")
+
+
+def test_failed_parse_is_not_fingerprinted():
+    print("💥 Testing that a page whose callback failed is fetched again...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'page_fingerprints.json')
+        first = middleware(path)
+        response = fetch(first, BASE + 'x')
+        first.spider_error(None, response, None)
+        first.spider_closed(None)
+
+        second = middleware(path)
+        assert fetch(second, BASE + 'y') is not None
+    print("   ✅ Parse failure left the page unfingerprinted")
+
+
+def test_stale_pages_pruned():
+    print("🧹 Testing pruning of pages no longer crawled...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'page_fingerprints.json')
+        old = (datetime.now() - timedelta(days=45)).isoformat()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'pages': {'https://gone.example/list': {'content_hash': 'x', 'seen_at': old}}}, f)
+        mw = middleware(path)
+        fetch(mw, BASE + 'z')
+        mw.spider_closed(None)
+        with open(path, encoding='utf-8') as f:
+            pages = json.load(f)['pages']
+    assert 'https://gone.example/list' not in pages and len(pages) == 1
+    print("   ✅ Page unseen for 45 days dropped")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing conditional requests")
+    print("=" * 40)
+    test_moving_date_window_keeps_its_fingerprint()
+    test_failed_parse_is_not_fingerprinted()
+    test_stale_pages_pruned()
+    print("\n🎉 All conditional request tests passed!")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test recording a crawl into the HTTP cache and replaying it offline
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import scrapy
+
+from command.spider_runner import SpiderJob, SpiderRunner
+
+
+class ListingHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = ('<html><table>' + ''.join(
+            f'<tr class="row"><td>Deal {i} on {self.path}</td></tr>' for i in range(3)
+        ) + '</table></html>').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ListingSpider(scrapy.Spider):
+    name = 'cache_listing'
+    port = None
+
+    async def start(self):
+        for page in range(2):
+            yield scrapy.Request(f'http://127.0.0.1:{self.port}/page/{page}',
+                                 meta={'rows_xpath': '//tr[@class="row"]'})
+
+    def parse(self, response):
+        for row in response.xpath('//tr[@class="row"]/td/text()').getall():
+            yield {'deal': row}
+
+
+def cache_settings(tmp, mode):
+    return {
+        'DOWNLOADER_MIDDLEWARES': {
+            'middlewares.conditional_request_middleware.ConditionalRequestMiddleware': 250,
+        },
+        'ITEM_PIPELINES': {},
+        'EXTENSIONS': {},
+        'DOWNLOAD_DELAY': 0,
+        'TELNETCONSOLE_ENABLED': False,
+        'LOG_LEVEL': 'WARNING',
+        'PAGE_FINGERPRINT_FILE': os.path.join(tmp, 'page_fingerprints.json'),
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_DIR': os.path.join(tmp, 'httpcache'),
+        'HTTPCACHE_STORAGE': 'middlewares.dedup_cache_storage.DedupCacheStorage',
+        'HTTPCACHE_IGNORE_HTTP_CODES': [304],
+        'HTTPCACHE_IGNORE_MISSING': mode == 'replay',
+        'HTTPCACHE_SPIDER_POLICIES': {'cache_listing': {'mode': mode}},
+    }
+
+
+def test_record_then_replay():
+    print("🗄️ Testing a recorded crawl replays with its items...")
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ListingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ListingSpider.port = server.server_address[1]
+    runner = SpiderRunner()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            recorded = runner.run([SpiderJob(ListingSpider, name='record', settings=cache_settings(tmp, 'record'))])
+        finally:
+            server.shutdown()
+            server.server_close()
+        # The server is gone: everything below comes from the cache
+        replayed = runner.run([SpiderJob(ListingSpider, name='replay', settings=cache_settings(tmp, 'replay'))])
+
+    assert recorded['record']['items'] == 6, recorded['record']
+    assert replayed['replay']['success'], replayed['replay']
+    assert replayed['replay']['items'] == 6, replayed['replay']
+    stats = replayed['replay']['stats']
+    assert stats.get('httpcache/hit') == 2
+    assert not stats.get('conditional/unchanged_content')
+    print(f"   ✅ {replayed['replay']['items']} items replayed offline from {stats['httpcache/hit']} cached pages")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing HTTP cache record/replay")
+    print("=" * 40)
+    test_record_then_replay()
+    print("\n🎉 All HTTP cache tests passed!")
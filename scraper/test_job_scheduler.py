@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test the asyncio job scheduler: overlap caps, conflicts, timeouts and catch-up
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from command.job_scheduler import JobScheduler, ScheduledJob
+
+
+def run_for(scheduler, seconds):
+    async def main():
+        asyncio.get_running_loop().call_later(seconds, scheduler.stop)
+        await scheduler.run()
+    asyncio.run(main())
+
+
+def test_overlap_and_conflicts():
+    print("🔀 Testing overlap caps and conflicting jobs...")
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduler = JobScheduler(os.path.join(tmp, "state.json"))
+        spans = {'slow': [], 'other': [], 'exclusive': []}
+
+        def job(name, seconds):
+            async def work():
+                started = time.time()
+                await asyncio.sleep(seconds)
+                spans[name].append((started, time.time()))
+            return work
+
+        # Due every 0.2s but takes 0.7s: most runs overlap a running one
+        scheduler.add_job(ScheduledJob('slow', job('slow', 0.7), every=0.2))
+        # Blocking, so it runs in a thread alongside the others
+        scheduler.add_job(ScheduledJob('other', lambda: (spans['other'].append((time.time(), None)),
+                                                         time.sleep(0.3)), every=0.5))
+        scheduler.add_job(ScheduledJob('exclusive', job('exclusive', 0.1), every=0.5, conflicts=('slow',)))
+        run_for(scheduler, 1.6)
+
+        state = scheduler.state
+        assert state['slow']['skipped'] > 0, state['slow']
+        assert state['other']['runs'] >= 2 and state['other']['failures'] == 0
+        # max_instances=1: no two slow runs overlap
+        slow = sorted(spans['slow'])
+        assert all(end <= next_start for (_, end), (next_start, _) in zip(slow, slow[1:]))
+        # exclusive only ever ran while slow was idle
+        for start, end in spans['exclusive']:
+            assert not any(s < end and start < e for s, e in slow), (start, end, slow)
+        assert spans['exclusive'], "exclusive job never got a turn"
+
+        with open(os.path.join(tmp, "state.json"), encoding='utf-8') as f:
+            saved = json.load(f)['jobs']
+        assert saved['slow']['last_status'] in ('success', 'skipped')
+        print(f"   ✅ {state['slow']['runs']} slow runs, {state['slow']['skipped']} skipped, "
+              f"{len(spans['exclusive'])} exclusive runs in the gaps")
+
+
+def test_timeout():
+    print("⏰ Testing job timeouts...")
+    with tempfile.TemporaryDirectory() as tmp:
+        alerts = []
+        scheduler = JobScheduler(os.path.join(tmp, "state.json"), alert=alerts.append)
+
+        async def hang():
+            await asyncio.sleep(30)
+
+        scheduler.add_job(ScheduledJob('hang', hang, every=0.1, timeout=0.2))
+        started = time.time()
+        run_for(scheduler, 0.5)
+
+        state = scheduler.state['hang']
+        assert time.time() - started < 2
+        assert state['last_status'] == 'timeout' and state['failures'] >= 1
+        assert alerts and 'timed out' in alerts[0]
+        print(f"   ✅ Cancelled after {scheduler.state['hang']['last_duration']}s and alerted")
+
+
+def test_error_result_counts_as_failure():
+    print("🧯 Testing jobs that report errors instead of raising...")
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduler = JobScheduler(os.path.join(tmp, "state.json"))
+        scheduler.add_job(ScheduledJob('scrape', lambda: {'error': 'spider crashed'}, every=0.2))
+        scheduler.add_job(ScheduledJob('report', lambda: {'items': 3}, every=0.2))
+        run_for(scheduler, 0.5)
+
+        state = scheduler.state
+        assert state['scrape']['last_status'] == 'failed' and state['scrape']['failures'] >= 1
+        assert state['report']['last_status'] == 'success' and state['report']['failures'] == 0
+    print("   ✅ {'error': ...} results recorded as failures")
+
+
+def test_missed_run_catch_up():
+    print("⏪ Testing catch-up of missed runs...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "state.json")
+        now = datetime.now()
+        missed = (now - timedelta(hours=1)).replace(second=0, microsecond=0)
+        # The last run handled was the day before the one missed during downtime
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': {'daily': {'last_scheduled': (missed - timedelta(days=1)).isoformat()}}}, f)
+
+        scheduler = JobScheduler(path)
+        recent = scheduler.add_job(ScheduledJob('daily', print, at=missed.strftime('%H:%M'), catch_up=3 * 3600))
+        assert scheduler.first_due(recent) == missed
+
+        recent.catch_up = 600
+        assert scheduler.first_due(recent) == missed + timedelta(days=1)
+
+        ran = []
+        catching_up = ScheduledJob('daily', lambda: ran.append(datetime.now()), at=missed.strftime('%H:%M'))
+        scheduler = JobScheduler(path)
+        scheduler.add_job(catching_up)
+        run_for(scheduler, 0.3)
+        assert len(ran) == 1
+        assert scheduler.state['daily']['last_scheduled'] == missed.isoformat()
+        print("   ✅ Missed run made up once, stale one left for tomorrow")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing job scheduler")
+    print("=" * 40)
+    test_overlap_and_conflicts()
+    test_timeout()
+    test_error_result_counts_as_failure()
+    test_missed_run_catch_up()
+    print("\n🎉 All job scheduler tests passed!")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test JSON Lines feed export and streaming reads, including reading while written
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy.utils.serialize import ScrapyJSONEncoder
+
+from utils.jsonl import OrjsonLinesItemExporter, count_records, iter_jsonl, until_finished
+
+
+def test_exporter_roundtrip():
+    print("📝 Testing the JSON Lines item exporter...")
+    buffer = io.BytesIO()
+    exporter = OrjsonLinesItemExporter(buffer)
+    exporter.start_exporting()
+    exporter.export_item({'estate_name_zh': '太古城', 'deal_price': Decimal('8800000'), 'deal_date': date(2025, 8, 25)})
+    exporter.export_item({'estate_name_zh': '美孚新邨', 'tags': {'new'},
+                          'scraped_at': datetime(2025, 8, 25, 9, 30, 5, 123456)})
+    exporter.finish_exporting()
+
+    lines = buffer.getvalue().splitlines()
+    assert len(lines) == 2
+    assert '太古城'.encode('utf-8') in lines[0]  # Written as UTF-8, not \u escapes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'houses.jsonl')
+        with open(path, 'wb') as f:
+            f.write(buffer.getvalue())
+        records = list(iter_jsonl(path))
+        assert count_records(path) == 2
+    assert records[0] == {'estate_name_zh': '太古城', 'deal_price': '8800000', 'deal_date': '2025-08-25'}
+    assert records[1]['tags'] == ['new']
+    # Written by Scrapy's own encoder, whose datetime format differs between Scrapy versions
+    assert records[1]['scraped_at'] == ScrapyJSONEncoder().default(datetime(2025, 8, 25, 9, 30, 5, 123456))
+    print("   ✅ Decimals, dates and sets exported; records read back line by line")
+
+
+def test_follow_growing_file():
+    print("📡 Testing reading a feed while it is written...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'houses.jsonl')
+        open(path, 'wb').close()
+        writing = threading.Event()
+        writing.set()
+        read_at = []
+
+        def writer():
+            with open(path, 'ab') as f:
+                for i in range(5):
+                    # Each line lands in two writes, so the reader sees partial lines
+                    f.write(b'{"id": %d, ' % i)
+                    f.flush()
+                    time.sleep(0.05)
+                    f.write(b'"ok": true}\n')
+                    f.flush()
+                    time.sleep(0.1)
+                f.write(b'{"id": 5, "ok": true}')  # Last line without a newline
+            writing.clear()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        started = time.time()
+        records = []
+        for record in iter_jsonl(path, follow=writing.is_set, poll_interval=0.02):
+            records.append(record)
+            read_at.append(time.time() - started)
+        thread.join()
+
+    assert [record['id'] for record in records] == list(range(6))
+    assert all(record['ok'] for record in records)
+    # The first record was consumed long before the writer finished
+    assert read_at[0] < read_at[-1] - 0.4, read_at
+    print(f"   ✅ First record read after {read_at[0]:.2f}s, all 6 by {read_at[-1]:.2f}s")
+
+
+def test_follow_until_spider_finishes():
+    print("🏁 Testing a follower that waits out a long pause in the crawl...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'houses.jsonl')
+        # A finished earlier run's feed and marker, about to be overwritten
+        with open(path, 'wb') as f:
+            exporter = OrjsonLinesItemExporter(f)
+            exporter.start_exporting()
+            exporter.export_item({'id': 'old'})
+            exporter.finish_exporting()
+        assert not until_finished(path)()
+        time.sleep(0.02)
+
+        f = open(path, 'wb')  # The new run truncates the feed
+        follow = until_finished(path)
+
+        def writer():
+            exporter = OrjsonLinesItemExporter(f)
+            exporter.start_exporting()
+            exporter.export_item({'id': 0})
+            f.flush()
+            time.sleep(0.6)  # Longer than the follower's poll: a backoff or cooldown
+            exporter.export_item({'id': 1})
+            exporter.finish_exporting()
+            f.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        records = list(iter_jsonl(path, follow=follow, poll_interval=0.05))
+        thread.join()
+
+    assert [record['id'] for record in records] == [0, 1]
+    print("   ✅ Followed through the pause until the exporter marked the feed done")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing JSON Lines feeds")
+    print("=" * 40)
+    test_exporter_roundtrip()
+    test_follow_growing_file()
+    test_follow_until_spider_finishes()
+    print("\n🎉 All JSON Lines tests passed!")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test the shared lxml Lianjia listing extraction against the old BeautifulSoup path
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_lianjia_extraction import build_sample_page, extract_with_beautifulsoup
+from utils.lianjia_extraction import (
+    extract_district_names, extract_listings, extract_total_count, extract_total_pages,
+    has_listing_container, parse_total_price, parse_unit_price,
+)
+
+
+def test_price_parsing():
+    print("💰 Testing price parsing...")
+    assert parse_total_price("300万") == 3000000
+    assert parse_total_price("300") == 300
+    assert parse_total_price("") == 0
+    assert parse_unit_price("单价45,000元/平米") == 45000
+    print("   ✅ Total and unit prices parsed")
+
+
+def test_matches_beautifulsoup():
+    print("🔍 Testing lxml extraction against BeautifulSoup...")
+    body = build_sample_page(listings=5)
+    keys = ('house_id', 'title', 'location', 'address_parts', 'total_price')
+    listings = extract_listings(body)
+    assert [{k: l[k] for k in keys} for l in listings] == extract_with_beautifulsoup(body)
+    assert listings[0]['unit_price'] == 45000
+    assert extract_total_pages(body) == 100
+    assert has_listing_container(body)
+    assert not has_listing_container(b"<html><body><p>blocked</p></body></html>")
+    print(f"   ✅ {len(listings)} listings identical")
+
+
+def test_shard_hints():
+    print("🧩 Testing total count and district filter extraction...")
+    body = """<html><body>
+    <div data-role="ershoufang"><div><a href="/ershoufang/dongcheng/">东城</a><a href="/ershoufang/xicheng/">西城</a></div></div>
+    <h2 class="total fl">共找到<span> 12,345 </span>套北京二手房</h2>
+    </body></html>"""
+    assert extract_total_count(body) == 12345
+    assert extract_district_names(body) == ['东城', '西城']
+    assert extract_total_count(build_sample_page(listings=1)) is None
+    print("   ✅ Shard hints extracted")
+
+
+if __name__ == "__main__":
+    test_price_parsing()
+    test_matches_beautifulsoup()
+    test_shard_hints()
+    print("\n🎯 All Lianjia extraction tests passed")
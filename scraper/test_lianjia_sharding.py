@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test enhanced_lianjia's query sharding against a simulated city past the page cap, and its page fan-out
+"""
+
+import os
+import random
+import sys
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scraper.spiders.enhanced_lianjia_spider import EnhancedLianjiaSpider
+
+DISTRICTS = ['东城', '西城', '朝阳', '海淀']
+ROOMS = ['l2', 'l3', 'l4']
+
+
+def simulated_city(listings=60000, seed=3):
+    """(district, rooms, price in 万) per listing, prices bunched like a real city"""
+    rng = random.Random(seed)
+    city = [(rng.choice(DISTRICTS), rng.choice(ROOMS), round(rng.lognormvariate(6.3, 0.6), 1))
+            for _ in range(listings)]
+    # More listings at one price than the page cap can show: can never be split enough
+    city += [('朝阳', 'l2', 500.5)] * 3100
+    return city
+
+
+def matches(shard, listing):
+    district, rooms, price = listing
+    if shard['district'] and district != shard['district']:
+        return False
+    if rooms not in shard['rooms']:
+        return False
+    if shard['max_price'] > 0:
+        return shard['min_price'] <= price <= shard['max_price']
+    return price >= shard['min_price']
+
+
+def listing_page(spider, shard, city):
+    """Page 1 of a shard's query: its total count and the district filter links"""
+    total = sum(1 for listing in city if matches(shard, listing))
+    links = ''.join(f'<a href="/ershoufang/{name}/">{name}</a>' for name in DISTRICTS)
+    return (f'<html><h2 class="total fl">共找到<span> {total} </span>套北京二手房</h2>'
+            f'<div data-role="ershoufang"><div>{links}</div></div></html>')
+
+
+def crawl_shards(spider, city):
+    """What parse() does on page 1 of every shard; returns (crawled shards, truncated shards)"""
+    leaves, truncated, queue = [], [], [spider.root_shard]
+    while queue:
+        shard = queue.pop()
+        page = listing_page(spider, shard, city)
+        if not spider._exceeds_page_cap(page, None):
+            leaves.append(shard)
+            continue
+        sub_shards = spider._split_shard(shard, page)
+        if sub_shards:
+            queue.extend(sub_shards)
+        else:
+            truncated.append(shard)
+            leaves.append(shard)
+    return leaves, truncated
+
+
+def test_shards_cover_the_price_range():
+    print("🧩 Testing shards of a 60,000-listing city...")
+    spider = EnhancedLianjiaSpider(city='beijing', district='all')
+    city = simulated_city()
+    cap = spider.max_pages * spider.LISTINGS_PER_PAGE
+    assert sum(1 for listing in city if matches(spider.root_shard, listing)) > cap
+
+    leaves, truncated = crawl_shards(spider, city)
+
+    # Every district x room combination is bisected into contiguous price bands:
+    # each band starts where the previous one ends, from 0 to the ceiling
+    groups = {}
+    for shard in leaves:
+        assert len(shard['rooms']) == 1 and shard['district'] in DISTRICTS
+        groups.setdefault((shard['district'], shard['rooms'][0]), []).append(shard)
+    assert set(groups) == {(district, rooms) for district in DISTRICTS for rooms in ROOMS}
+    for bands in groups.values():
+        bands.sort(key=lambda shard: shard['min_price'])
+        assert bands[0]['min_price'] == 0
+        assert bands[-1]['max_price'] == spider.SHARD_PRICE_CEILING
+        for lower, upper in zip(bands, bands[1:]):
+            assert lower['max_price'] == upper['min_price'], (lower, upper)  # No gap, no overlap
+            assert lower['max_price'] > lower['min_price']
+
+    # Every listing is crawled, by exactly one shard unless it sits on a band boundary
+    for listing in random.Random(1).sample(city, 2000):
+        owners = [shard for shard in leaves if matches(shard, listing)]
+        on_boundary = any(listing[2] in (shard['min_price'], shard['max_price']) for shard in owners)
+        assert len(owners) == 1 or (on_boundary and len(owners) == 2), (listing, owners)
+
+    # Only the single-price pile is left over the cap, as a one-万 band
+    assert len(truncated) == 1
+    pile = truncated[0]
+    assert (pile['district'], pile['rooms']) == ('朝阳', ['l2'])
+    assert pile['max_price'] - pile['min_price'] == 1 and pile['min_price'] < 500.5 < pile['max_price']
+    assert all(sum(1 for listing in city if matches(shard, listing)) <= cap
+               for shard in leaves if shard is not pile)
+    print(f"   ✅ {len(leaves)} shards, contiguous bands up to {spider.SHARD_PRICE_CEILING}万, "
+          f"1 unsplittable band reported")
+
+
+def test_fanned_out_pages_keep_the_page_delay():
+    print("🚀 Testing that fanned-out pages keep the sequential walk's spacing...")
+    spider = EnhancedLianjiaSpider(city='beijing')
+    requests = list(spider._fan_out_pages(spider.root_shard, 6))
+    assert [request.meta['page'] for request in requests] == [2, 3, 4, 5, 6]
+    delays = [0.0] + [request.meta['delay'] for request in requests]
+    gaps = [later - earlier for earlier, later in zip(delays, delays[1:])]
+    assert all(1 <= gap <= 3 for gap in gaps), gaps
+    print(f"   ✅ Pages 2-6 released {', '.join(f'{d:.1f}s' for d in delays[1:])} after page 1")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Lianjia query sharding")
+    print("=" * 40)
+    test_shards_cover_the_price_range()
+    test_fanned_out_pages_keep_the_page_delay()
+    print("\n🎉 All sharding tests passed!")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test the persistent listing index that lets lianjia_spider skip known detail pages
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.listing_index import ListingIndex, listing_hash
+
+
+def test_listing_index_roundtrip():
+    print("🗂️  Testing listing index save/load...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listing_index.json")
+
+        listing = {'title': 'a', 'deal_price': 3000000}
+        index = ListingIndex(path)
+        assert index.needs_detail(101100000, listing_hash(listing))
+        index.record(101100000, 3000000, listing_hash(listing), {'building_name_zh': '望京花园', 'floor': 'mid'})
+        index.save()
+
+        index = ListingIndex(path)
+        assert not index.needs_detail(101100000, listing_hash(listing))
+        assert index.detail(101100000) == {'building_name_zh': '望京花园', 'floor': 'mid'}
+        assert index.needs_detail(101100000, listing_hash(dict(listing, deal_price=2900000)))
+        assert index.needs_detail(101100000, listing_hash(dict(listing, title='b')))
+        assert index.needs_detail(101100001, listing_hash(listing))
+        # Listings without an id are always fetched
+        assert index.needs_detail(0, listing_hash(listing))
+
+        # Entries indexed before detail fields were cached are fetched once more
+        index.listings['101100000'].pop('detail')
+        assert index.needs_detail(101100000, listing_hash(listing))
+    print("   ✅ Only new or changed listings need detail pages; known ones keep their details")
+
+
+if __name__ == "__main__":
+    test_listing_index_roundtrip()
+    print("\n🎯 All listing index tests passed")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test mobile_lianjia's community/search paging: offset fan-out and the API's page size cap
+"""
+
+import json
+import os
+import sys
+from urllib.parse import parse_qs, urlparse
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import scrapy
+from scrapy.http import TextResponse
+
+from scraper.spiders.mobile_lianjia_spider import MobileLianjiaSpider
+
+CIRCLE = {
+    'biz_circle_id': 611100314,
+    'biz_circle_name': '安贞',
+    'city_id': 110000,
+    'district_id': 23008614,
+}
+
+
+def search_page(request, rows, total_count=None, has_more=True):
+    """community/search's answer to request: rows communities from the request's offset"""
+    offset = request.meta['offset']
+    data = {
+        'list': [{'community_id': offset + n, 'community_name': f'小区{offset + n}'} for n in range(rows)],
+        'has_more_data': has_more,
+    }
+    if total_count is not None:
+        data['total_count'] = total_count
+    body = json.dumps({'errno': 0, 'data': data}, ensure_ascii=False).encode('utf-8')
+    return TextResponse(request.url, body=body, encoding='utf-8', request=request)
+
+
+def query(request, key):
+    return int(parse_qs(urlparse(request.url).query)[key][0])
+
+
+def parse(spider, response):
+    output = list(spider.parse_communities(response))
+    requests = [r for r in output if isinstance(r, scrapy.Request)]
+    return [r for r in output if not isinstance(r, scrapy.Request)], requests
+
+
+def test_first_page_fans_out_every_offset():
+    print("🚀 Testing fan-out from a first page with total_count...")
+    spider = MobileLianjiaSpider(city='beijing', page_size=100)
+    first = spider.community_search_request(dict(CIRCLE, offset=0))
+
+    items, requests = parse(spider, search_page(first, rows=100, total_count=350))
+    assert len(items) == 100
+    assert [query(r, 'limit_offset') for r in requests] == [100, 200, 300]
+    assert [r.meta['offset'] for r in requests] == [100, 200, 300]
+    assert all(r.meta['fanned_out'] and query(r, 'limit_count') == 100 for r in requests)
+
+    # A fanned-out page schedules nothing more
+    items, more = parse(spider, search_page(requests[-1], rows=50, total_count=350, has_more=False))
+    assert len(items) == 50 and more == []
+    print("   ✅ Offsets 100, 200 and 300 scheduled by page 1")
+
+
+def test_short_page_lowers_page_size():
+    print("📏 Testing that a capped first page lowers the page size...")
+    spider = MobileLianjiaSpider(city='beijing', page_size=100)
+    first = spider.community_search_request(dict(CIRCLE, offset=0))
+
+    items, requests = parse(spider, search_page(first, rows=20, total_count=70))
+    assert len(items) == 20
+    assert spider.page_size == 20
+    assert [query(r, 'limit_offset') for r in requests] == [20, 40, 60]
+    assert all(query(r, 'limit_count') == 20 for r in requests)
+    print("   ✅ API returned 20 of 100: page size 20, offsets 20, 40 and 60")
+
+
+def test_without_total_count_follows_has_more():
+    print("➡️  Testing one-page-at-a-time paging without total_count...")
+    spider = MobileLianjiaSpider(city='beijing', page_size=50)
+    first = spider.community_search_request(dict(CIRCLE, offset=0))
+
+    _, requests = parse(spider, search_page(first, rows=50))
+    assert [query(r, 'limit_offset') for r in requests] == [50]
+    assert not requests[0].meta.get('fanned_out')
+    print("   ✅ Next offset only")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing mobile Lianjia community paging")
+    print("=" * 40)
+    test_first_page_fans_out_every_offset()
+    test_short_page_lowers_page_size()
+    test_without_total_count_follows_has_more()
+    print("\n🎉 All mobile Lianjia paging tests passed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test per-request meta['delay'] pauses: delayed requests don't hold up others
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import scrapy
+
+from command.spider_runner import SpiderJob, SpiderRunner
+
+DELAY = 1.5
+ARRIVALS = {}  # Request name -> seconds after start that its page was parsed
+
+# The project's SCHEDULER and CONCURRENT_REQUESTS are kept
+SETTINGS = {
+    'DOWNLOADER_MIDDLEWARES': {},
+    'ITEM_PIPELINES': {},
+    'EXTENSIONS': {},
+    'DOWNLOAD_DELAY': 0,
+    'CONCURRENT_REQUESTS_PER_DOMAIN': 8,
+    'TELNETCONSOLE_ENABLED': False,
+    'LOG_LEVEL': 'WARNING',
+}
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'<html>page</html>')
+
+
+class DelaySpider(scrapy.Spider):
+    name = 'delays'
+    port = None
+    started = None
+    delayed = 8
+
+    async def start(self):
+        DelaySpider.started = time.monotonic()
+        base = f'http://127.0.0.1:{self.port}'
+        for i in range(self.delayed):
+            yield scrapy.Request(f'{base}/delayed/{i}', meta={'delay': DELAY, 'name': f'delayed{i}'})
+        yield scrapy.Request(f'{base}/undelayed', meta={'name': 'undelayed'})
+
+    def parse(self, response):
+        ARRIVALS[response.meta['name']] = time.monotonic() - self.started
+        yield {'name': response.meta['name']}
+
+
+def test_delay_does_not_block_other_requests():
+    print("⏳ Testing that delayed requests don't hold up an undelayed one...")
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    DelaySpider.port = server.server_address[1]
+    try:
+        runner = SpiderRunner(settings=SETTINGS)
+        # At least as many delayed requests as global download slots
+        DelaySpider.delayed = runner.settings.getint('CONCURRENT_REQUESTS')
+        result = runner.run([SpiderJob(DelaySpider)])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    delayed = [ARRIVALS[f'delayed{i}'] for i in range(DelaySpider.delayed)]
+    assert result['delays']['success'] and result['delays']['items'] == DelaySpider.delayed + 1
+    assert min(delayed) >= DELAY, ARRIVALS
+    # The undelayed request went out while every delayed one was still waiting
+    assert ARRIVALS['undelayed'] < DELAY / 2, ARRIVALS
+    assert result['delays']['stats'].get('request_delay/count') == DelaySpider.delayed
+    print(f"   ✅ Undelayed page parsed at {ARRIVALS['undelayed']:.2f}s, "
+          f"{DelaySpider.delayed} delayed ones from {min(delayed):.2f}s")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing request delays")
+    print("=" * 40)
+    test_delay_does_not_block_other_requests()
+    print("\n🎉 All request delay tests passed!")
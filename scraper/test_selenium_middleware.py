@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test the Chrome worker pool, render-tier decisions and that every SeleniumRequest spider enables the driver
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy import Request
+from scrapy.settings import Settings
+
+from middlewares.selenium_middleware import SeleniumMiddleware, url_pattern
+
+
+class FakeDriver:
+    def __init__(self, worker_id):
+        self.page_source = f'<html>rendered by worker {worker_id}</html>'
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        pass
+
+
+def pool(tmp, broken_workers, size=2):
+    """A started pool whose listed workers can't launch Chrome"""
+    middleware = SeleniumMiddleware({
+        'SELENIUM_RENDER_DECISIONS_FILE': os.path.join(tmp, 'render_decisions.json'),
+        'SELENIUM_POOL_SIZE': size,
+        'SELENIUM_START_BACKOFF': 30,
+    })
+    middleware.wait_until_ready = lambda driver, wait_for: None
+    middleware.spider_opened(None)
+    for worker in middleware.all_workers:
+        def start(worker=worker):
+            if worker.worker_id in broken_workers:
+                raise RuntimeError('chrome not reachable')
+            worker.driver = FakeDriver(worker.worker_id)
+            worker.pages = 0
+        worker.start = start
+    return middleware
+
+
+def render(middleware):
+    return middleware.render('https://www.midlandici.com/transaction/1', 'tbody tr')
+
+
+def test_chrome_start_failure_sidelines_only_that_worker():
+    print("🚑 Testing that one worker's Chrome failing to start leaves the others rendering...")
+    with tempfile.TemporaryDirectory() as tmp:
+        middleware = pool(tmp, broken_workers={0})
+        try:
+            broken, healthy = middleware.all_workers
+            try:
+                render(middleware)  # Worker 0 is first in the queue
+                assert False, "start failure should fail that render"
+            except RuntimeError:
+                pass
+            assert broken.start_failures == 1 and not broken.can_render()
+
+            # Worker 0 is skipped while it backs off; worker 1 takes every page
+            for _ in range(3):
+                assert render(middleware) == b'<html>rendered by worker 1</html>'
+            assert healthy.pages == 3 and broken.start_failures == 1
+        finally:
+            middleware.spider_closed(None)
+    print("   ✅ Failed worker sat out, rendering went on")
+
+
+def test_chrome_start_retried_with_backoff():
+    print("⏳ Testing that a worker retries Chrome start-up with a growing backoff...")
+    with tempfile.TemporaryDirectory() as tmp:
+        middleware = pool(tmp, broken_workers={0}, size=1)
+        try:
+            worker = middleware.all_workers[0]
+            waits = []
+            for _ in range(3):
+                try:
+                    render(middleware)
+                    assert False, "start failure should fail that render"
+                except RuntimeError:
+                    pass
+                waits.append(worker.retry_at - time.monotonic())
+                # Backing off: the page falls back at once instead of launching Chrome
+                assert render(middleware) is None
+                worker.retry_at = 0.0  # Backoff over
+            assert 29 < waits[0] <= 30 and 59 < waits[1] <= 60 and 119 < waits[2] <= 120, waits
+
+            # Chrome is back: the next start succeeds and clears the failure count
+            def start():
+                worker.driver = FakeDriver(0)
+            worker.start = start
+            assert render(middleware) == b'<html>rendered by worker 0</html>'
+            assert worker.start_failures == 0
+        finally:
+            middleware.spider_closed(None)
+    print(f"   ✅ Start retried after {', '.join(f'{w:.0f}s' for w in waits)}, then recovered")
+
+
+def test_js_decision_expires():
+    print("🧭 Testing that 'browser' decisions are re-probed after their TTL...")
+    with tempfile.TemporaryDirectory() as tmp:
+        middleware = SeleniumMiddleware({
+            'SELENIUM_RENDER_DECISIONS_FILE': os.path.join(tmp, 'render_decisions.json'),
+            'SELENIUM_RENDER_DECISION_TTL': 3600,
+        })
+        fresh = Request('https://www.midlandici.com/transaction/1')
+        stale = Request('https://www.midlandici.com/other/2')
+        middleware.decisions[url_pattern(fresh.url)] = {
+            'mode': 'js', 'updated_at': (datetime.now() - timedelta(minutes=5)).isoformat()}
+        middleware.decisions[url_pattern(stale.url)] = {
+            'mode': 'js', 'updated_at': (datetime.now() - timedelta(hours=2)).isoformat()}
+
+        assert middleware.needs_rendering(fresh)
+        assert not middleware.needs_rendering(stale)
+        assert not middleware.needs_rendering(Request('https://www.midlandici.com/new/3'))
+        assert middleware.needs_rendering(Request(stale.url, meta={'force_render': True}))
+    print("   ✅ Fresh decision renders, stale one goes back to plain HTTP")
+
+
+def test_selenium_spiders_enable_driver():
+    print("🚗 Testing that SeleniumRequest spiders enable the driver middleware...")
+    from scrapy.spiders import Spider
+    from scraper.spiders.alternative_property_spider import AlternativePropertySpider
+    from scraper.spiders.lianjia_spider import LianjiaSpider
+
+    for spider_cls in (LianjiaSpider, AlternativePropertySpider):
+        settings = Settings({'DOWNLOADER_MIDDLEWARES': {'middlewares.circuit_breaker.CircuitBreakerMiddleware': 40}})
+        spider_cls.update_settings(settings)
+        middlewares = settings.getdict('DOWNLOADER_MIDDLEWARES')
+        assert middlewares['scrapy_selenium.SeleniumMiddleware'] == 800, spider_cls
+        # Added to the project's middlewares, not in place of them
+        assert 'middlewares.circuit_breaker.CircuitBreakerMiddleware' in middlewares
+
+    settings = Settings({'DOWNLOADER_MIDDLEWARES': {}})
+    Spider.update_settings(settings)
+    assert 'scrapy_selenium.SeleniumMiddleware' not in settings.getdict('DOWNLOADER_MIDDLEWARES')
+    print("   ✅ lianjia_spider and alternative_property enable it, other spiders don't")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Selenium rendering setup")
+    print("=" * 40)
+    test_chrome_start_failure_sidelines_only_that_worker()
+    test_chrome_start_retried_with_backoff()
+    test_js_decision_expires()
+    test_selenium_spiders_enable_driver()
+    print("\n🎉 All Selenium tests passed!")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test ScrapySimpleAntiBot's per-domain pacing: delays and block cool-downs live on downloader slots
+"""
+
+import os
+import sys
+import time
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy import Request, Spider
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from middlewares.scrapy_simple_antibot import ScrapySimpleAntiBot
+
+LISTING = b'<html><body>' + b'<div class="deal">ok</div>' * 200 + b'</body></html>'
+
+
+class SlotDownloader:
+    """The parts of scrapy's Downloader the middleware touches"""
+
+    def __init__(self, delay=0.0):
+        self.slots = {}
+        self.delay = delay
+
+    def get_slot_key(self, request):
+        return urlparse(request.url).hostname
+
+    def reach(self, middleware, url):
+        """What the downloader does for a new request: create the slot, then signal"""
+        request = Request(url)
+        key = self.get_slot_key(request)
+        slot = self.slots.setdefault(key, SimpleNamespace(delay=self.delay))
+        request.meta['download_slot'] = key
+        middleware.request_reached_downloader(request)
+        return request, slot
+
+
+def build(**settings):
+    crawler = get_crawler(Spider, dict({'ADAPTIVE_CONCURRENCY_ENABLED': False, 'RETRY_TIMES': 3}, **settings))
+    crawler.engine = SimpleNamespace(downloader=SlotDownloader(crawler.settings.getfloat('DOWNLOAD_DELAY')))
+    return ScrapySimpleAntiBot.from_crawler(crawler), crawler.engine.downloader
+
+
+def respond(middleware, request, status=200):
+    response = HtmlResponse(request.url, status=status, body=LISTING, request=request)
+    middleware.response_downloaded(response, request)
+    return middleware.process_response(request, response)
+
+
+def test_block_cools_down_only_its_own_slot():
+    print("🧊 Testing that a block holds only the blocked domain's slot...")
+    middleware, downloader = build()
+    blocked, blocked_slot = downloader.reach(middleware, 'https://blocked.example/list')
+    healthy, healthy_slot = downloader.reach(middleware, 'https://healthy.example/list')
+    pace = healthy_slot.delay
+    assert 0 < pace < 10
+
+    retry = respond(middleware, blocked, status=429)
+    assert isinstance(retry, Request) and retry.meta['retry_times'] == 1
+    assert blocked_slot.delay >= 9.9  # The 10-30s cool-down, on the slot rather than in the middleware
+    assert healthy_slot.delay == pace
+    assert respond(middleware, healthy).status == 200
+    assert healthy_slot.delay < 10
+
+    # Once the cool-down is over the blocked domain is paced again
+    middleware.domain_delays['blocked.example']['cool_until'] = time.monotonic() - 1
+    downloader.reach(middleware, 'https://blocked.example/list?page=2')
+    assert blocked_slot.delay < 10
+    print(f"   ✅ Blocked slot held, healthy slot kept its {pace:.1f}s pace")
+
+
+def test_cool_down_overrides_adaptive_delay_only_while_it_lasts():
+    print("📉 Testing block cool-downs with AdaptiveConcurrency pacing the slots...")
+    middleware, downloader = build(ADAPTIVE_CONCURRENCY_ENABLED=True, DOWNLOAD_DELAY=2)
+    request, slot = downloader.reach(middleware, 'https://bj.lianjia.com/chengjiao/')
+    assert slot.delay == 2  # Left to the extension
+
+    respond(middleware, request, status=429)
+    assert slot.delay >= 9.9
+
+    middleware.domain_delays['bj.lianjia.com']['cool_until'] = time.monotonic() - 1
+    slot.delay = 4  # What the extension set on its next signal
+    downloader.reach(middleware, 'https://bj.lianjia.com/chengjiao/pg2/')
+    assert slot.delay == 4
+    print("   ✅ Cool-down raised the extension's delay, then left it alone")
+
+
+def test_process_request_does_not_wait():
+    print("🚦 Testing that process_request returns at once...")
+    middleware, downloader = build()
+    request, _ = downloader.reach(middleware, 'https://a.example/')
+    assert middleware.process_request(request) is None
+    assert request.headers.get('Accept-Language')
+    print("   ✅ Headers set, nothing awaited")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing simple anti-bot pacing")
+    print("=" * 40)
+    test_block_cools_down_only_its_own_slot()
+    test_cool_down_overrides_adaptive_delay_only_while_it_lasts()
+    test_process_request_does_not_wait()
+    print("\n🎉 All simple anti-bot tests passed!")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test the registry-driven spider launcher with small local spiders
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import scrapy
+
+from command.spider_launcher import launch_spiders
+
+# Workers load the spiders below from this module
+SPIDER_ARGS = ['-s', 'SPIDER_MODULES=test_spider_launcher', '-s', 'ITEM_PIPELINES={}',
+               '-s', 'EXTENSIONS={}', '-s', 'DOWNLOADER_MIDDLEWARES={}', '-s', 'LOG_LEVEL=WARNING']
+
+
+class ItemSpider(scrapy.Spider):
+    name = 'launcher_items'
+
+    def __init__(self, count=2, **kwargs):
+        super().__init__(**kwargs)
+        self.count = int(count)
+
+    async def start(self):
+        for i in range(self.count):
+            yield {'n': i}
+        return
+        yield
+
+
+class BusySpider(scrapy.Spider):
+    name = 'launcher_busy'
+
+    async def start(self):
+        while True:
+            pass
+        yield
+
+
+def write_registry(directory, spiders, **launcher):
+    path = os.path.join(directory, 'registry.yaml')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'launcher': launcher, 'spiders': spiders}, f)  # JSON is valid YAML
+    return path
+
+
+def test_priorities_dependencies_and_limits():
+    print("🚀 Testing the registry launcher...")
+    with tempfile.TemporaryDirectory() as directory:
+        registry = write_registry(directory, [
+            {'id': 'late', 'name': 'launcher_items', 'args': SPIDER_ARGS + ['-a', 'count=1'],
+             'after': ['first']},
+            {'id': 'first', 'name': 'launcher_items', 'args': SPIDER_ARGS + ['-a', 'count=3'],
+             'priority': 10},
+            {'id': 'busy', 'name': 'launcher_busy', 'args': SPIDER_ARGS, 'limits': {'cpu_seconds': 2}},
+            {'id': 'after_busy', 'name': 'launcher_items', 'args': SPIDER_ARGS, 'after': ['busy']},
+            {'id': 'missing', 'name': 'no_such_spider', 'args': SPIDER_ARGS},
+        ], max_workers=2, limits={'timeout': 60, 'memory_mb': 2048})
+        summary_path = os.path.join(directory, 'summary.json')
+        summary = launch_spiders(registry, summary_path=summary_path, log_dir=directory)
+
+        with open(summary_path, encoding='utf-8') as f:
+            assert json.load(f)['spiders'] == summary['spiders']
+
+    results = {result['name']: result for result in summary['spiders']}
+    assert results['first']['status'] == 'success' and results['first']['items'] == 3
+    assert results['late']['status'] == 'success' and results['late']['items'] == 1
+    assert results['late']['started_at'] > results['first']['started_at']
+    assert results['busy']['status'] == 'cpu_limit'
+    assert results['after_busy']['status'] == 'skipped'
+    assert results['missing']['status'] == 'failed' and 'no_such_spider' in results['missing']['error']
+    assert (summary['succeeded'], summary['failed'], summary['skipped']) == (2, 2, 1)
+    print(f"   ✅ {summary['succeeded']} succeeded, {summary['failed']} failed, "
+          f"{summary['skipped']} skipped in {summary['duration']:.1f}s")
+
+
+if __name__ == "__main__":
+    test_priorities_dependencies_and_limits()
+    print("🎉 All spider launcher tests passed!")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test the in-process spider runner against a local HTTP server
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import scrapy
+
+from command.spider_runner import SpiderJob, SpiderRunner, shared_host_groups
+
+# Keep the project's middlewares, pipelines and state files out of the way
+TEST_SETTINGS = {
+    'DOWNLOADER_MIDDLEWARES': {},
+    'ITEM_PIPELINES': {},
+    'EXTENSIONS': {},
+    'DOWNLOAD_DELAY': 0,
+    'CONCURRENT_REQUESTS_PER_DOMAIN': 8,
+    'TELNETCONSOLE_ENABLED': False,
+    'LOG_LEVEL': 'WARNING',
+}
+
+
+class SlowPageHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(1.0)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'<html>page</html>')
+
+
+class PageSpider(scrapy.Spider):
+    name = 'pages'
+    port = None
+
+    def __init__(self, pages=3, **kwargs):
+        super().__init__(**kwargs)
+        self.pages = int(pages)
+
+    async def start(self):
+        for i in range(self.pages):
+            yield scrapy.Request(f'http://127.0.0.1:{self.port}/{i}', dont_filter=True)
+
+    def parse(self, response):
+        yield {'url': response.url}
+
+
+class BrokenSpider(PageSpider):
+    name = 'broken'
+
+    def __init__(self, **kwargs):
+        raise ValueError("broken config")
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowPageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    PageSpider.port = server.server_address[1]
+    return server
+
+
+def test_jobs_run_concurrently():
+    print("🕷️ Testing concurrent in-process spider jobs...")
+    server = start_server()
+    output = os.path.join(tempfile.gettempdir(), 'runner_pages.jsonl')
+    try:
+        started = time.time()
+        results = SpiderRunner(settings=TEST_SETTINGS).run([
+            SpiderJob(PageSpider, name='first', spider_kwargs={'pages': 4}, output=output),
+            SpiderJob(PageSpider, name='second'),
+            SpiderJob(BrokenSpider, retries=1, retry_delay=0),
+        ])
+        elapsed = time.time() - started
+    finally:
+        server.shutdown()
+
+    assert results['first']['success'] and results['first']['items'] == 4
+    assert results['second']['success'] and results['second']['items'] == 3
+    assert results['first']['stats']['finish_reason'] == 'finished'
+    with open(output, encoding='utf-8') as f:
+        assert len(f.readlines()) == 4
+    assert not results['broken']['success']
+    assert results['broken']['attempts'] == 2 and 'broken config' in results['broken']['error']
+    # Two 1s crawls side by side, not one after the other
+    assert elapsed < 2.0, elapsed
+    print(f"   ✅ Both spiders done in {elapsed:.1f}s, failed job retried once")
+
+
+def test_group_runs_serially_and_runner_is_reusable():
+    print("🔒 Testing grouped jobs and a second, followed run in the same process...")
+    server = start_server()
+    try:
+        runner = SpiderRunner(settings=TEST_SETTINGS)
+        started = time.time()
+        results = runner.run([SpiderJob(PageSpider, name=f'city/{i}', group='city') for i in range(2)])
+        elapsed = time.time() - started
+        counts = []
+        again = runner.run([SpiderJob(PageSpider, name='again', on_item=lambda job, count: counts.append(count))])
+    finally:
+        server.shutdown()
+
+    assert all(result['success'] for result in results.values())
+    assert elapsed >= 2.0, elapsed
+    assert again['again']['items'] == 3
+    assert counts == [1, 2, 3]
+    print(f"   ✅ Grouped jobs took {elapsed:.1f}s one after another; runner reused, items followed live")
+
+
+def test_shared_host_groups():
+    print("🔗 Testing spiders grouped by shared hosts...")
+    groups = shared_host_groups({
+        'house_spider': {'sz.centanet.com'},
+        'store_spider': {'oir.centanet.com', 'carparkhk.com'},
+        'car_spider': {'carparkhk.com', 'www.property.hk'},
+        'hk_spider': {'www.property.hk'},
+        'cn_spider': {'m.anjuke.com'},
+    })
+    assert groups['store_spider'] == groups['car_spider'] == groups['hk_spider']
+    assert len({groups['house_spider'], groups['store_spider'], groups['cn_spider']}) == 3
+    print("   ✅ Spiders sharing a host, even through another spider, share a group")
+
+
+if __name__ == "__main__":
+    test_jobs_run_concurrently()
+    test_group_runs_serially_and_runner_is_reusable()
+    test_shared_host_groups()
+    print("🎉 All spider runner tests passed!")
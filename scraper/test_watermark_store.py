@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test per-source crawl watermarks used by store_spider daily mode
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy import Spider, signals
+from scrapy.utils.test import get_crawler
+
+from utils.watermark_store import WatermarkStore, parse_deal_date
+from scraper.spiders.store_spider import StoreSpider, source_key
+
+
+def test_parse_deal_date():
+    print("🗓️  Testing deal date parsing...")
+    assert parse_deal_date("25/08/2025").isoformat() == "2025-08-25"
+    assert parse_deal_date("2025-08-11 00:00:00").isoformat() == "2025-08-11"
+    assert parse_deal_date("--") is None
+    print("   ✅ DD/MM/YYYY and JSON timestamps parsed")
+
+
+def test_watermark_roundtrip():
+    print("💾 Testing watermark save/load...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "crawl_watermarks.json")
+
+        store = WatermarkStore(path)
+        assert store.get("oir.centanet.com") == (None, None)
+        store.observe("oir.centanet.com", "25/08/2025", "deal-new")
+        store.observe("oir.centanet.com", "25/08/2025", "deal-older-same-day")
+        store.observe("oir.centanet.com", "24/08/2025", "deal-yesterday")
+        store.save()
+
+        store = WatermarkStore(path)
+        mark_date, fingerprint = store.get("oir.centanet.com")
+        assert mark_date.isoformat() == "2025-08-25"
+        assert fingerprint == "deal-new"
+
+        # Newer rows are above the watermark, the fingerprinted row and older dates are not
+        assert not store.is_reached("oir.centanet.com", "26/08/2025", "deal-next")
+        assert not store.is_reached("oir.centanet.com", "25/08/2025", "deal-later-today")
+        assert store.is_reached("oir.centanet.com", "25/08/2025", "deal-new")
+        assert store.is_reached("oir.centanet.com", "24/08/2025", "deal-yesterday")
+        assert not store.is_reached("carparkhk.com", "01/01/2020", "anything")
+    print("   ✅ Watermark persisted and honoured")
+
+
+def test_feeds_on_one_host_keep_separate_watermarks():
+    print("🔑 Testing watermark keys for feeds sharing a host...")
+    keys = {source_key({}, f"https://www.property.hk/tran/{feed}/") for feed in ("t3", "t4", "t5")}
+    assert len(keys) == 3
+    assert source_key({"source": "midland"}, "https://www.midlandici.com.hk/x") == "midland"
+    # The fragment is not part of the feed
+    assert source_key({}, "https://carparkhk.com/t.php?area=#gsc.tab=0") == "carparkhk.com/t.php?area="
+    print("   ✅ property.hk categories keyed apart")
+
+
+def test_json_fingerprint_ignores_unrelated_fields():
+    print("🧬 Testing JSON deal fingerprints...")
+    cfg = {"fields": {"building_name_zh": "name", "floor": "floor", "unit": "flat",
+                      "deal_date": "tx_date", "deal_price": ["price", "sell"]}}
+    rec = {"name": "太古城", "floor": "12", "flat": "A", "tx_date": "2025-08-25", "sell": 880, "views": 10}
+    fingerprint = StoreSpider.json_deal_id(cfg, rec)
+    assert StoreSpider.json_deal_id(cfg, dict(rec, views=99, agent="x")) == fingerprint
+    assert StoreSpider.json_deal_id(cfg, dict(rec, flat="B")) != fingerprint
+    assert StoreSpider.json_deal_id(cfg, dict(rec, tx_id=7)) == "id:7"
+    print("   ✅ Only identifying fields count")
+
+
+def test_watermarks_saved_only_when_own_crawl_closes():
+    print("🔌 Testing that another crawler closing doesn't save store_spider's watermarks...")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # deal_tracking.json and logs/summary.txt are written to the cwd
+        try:
+            path = os.path.join(tmp, "crawl_watermarks.json")
+            crawler = get_crawler(StoreSpider)
+            spider = crawler._create_spider(watermark_file=path)
+            spider.watermarks.observe("oir.centanet.com", "25/08/2025", "deal-new")
+
+            # house_spider finishing first in the combined daily run
+            other = get_crawler(Spider)
+            other.signals.send_catch_log(signals.spider_closed, spider=other._create_spider("house_spider"),
+                                         reason="finished")
+            assert not os.path.exists(path) and not os.path.exists("logs/summary.txt")
+
+            crawler.signals.send_catch_log(signals.spider_closed, spider=spider, reason="finished")
+            assert WatermarkStore(path).get("oir.centanet.com")[1] == "deal-new"
+            with open("logs/summary.txt", encoding="utf-8") as f:
+                assert len(f.readlines()) == 1
+        finally:
+            os.chdir(cwd)
+    print("   ✅ Watermarks and summary written once, when store_spider itself closed")
+
+
+if __name__ == "__main__":
+    test_parse_deal_date()
+    test_watermark_roundtrip()
+    test_feeds_on_one_host_keep_separate_watermarks()
+    test_json_fingerprint_ignores_unrelated_fields()
+    test_watermarks_saved_only_when_own_crawl_closes()
+    print("\n🎯 All watermark tests passed")
@@ -0,0 +1,101 @@
+"""
+Shared block-page detection for the anti-bot middlewares and spiders.
+
+Decides from the status, content type, size and the first SCAN_BYTES of
+the body whether a response is a block, captcha or interstitial rather
+than content, and says why. All markers are matched by one regex
+compiled at import, in a single pass over the prefix.
+"""
+
+import re
+
+# Block pages are small and say so near the top; never scan past this
+SCAN_BYTES = 16384
+
+# A 200 HTML page this short is an interstitial, not content
+MIN_HTML_BYTES = 512
+
+BLOCK_STATUSES = {403: 'status_403', 429: 'status_429', 503: 'status_503'}
+
+# Content types that are never block pages and are not scanned
+BINARY_TYPES = ('image/', 'audio/', 'video/', 'font/', 'application/pdf',
+                'application/octet-stream', 'application/zip')
+
+# reason -> markers; ASCII markers match case-insensitively on word boundaries
+BLOCK_MARKERS = {
+    'captcha': ['captcha', '验证码', '人机验证', '人机认证', '安全验证', '滑块验证'],
+    'verification': ['verification required', 'verify you are human', 'unusual traffic'],
+    'access_denied': ['access denied', 'forbidden', '访问受限', '访问被拒绝'],
+    'rate_limited': ['too many requests', 'rate limit exceeded'],
+    'unavailable': ['temporarily unavailable', 'service unavailable'],
+    'bot_check': ['robot', 'blocked'],
+}
+
+
+def _marker_pattern(marker):
+    pattern = re.escape(marker.encode('utf-8'))
+    if marker.isascii():
+        # 'robot' must not match 'robots' in a <meta name="robots"> tag
+        pattern = rb'(?<![a-z0-9])' + pattern + rb'(?![a-z0-9])'
+    return pattern
+
+
+# One named group per reason; ASCII-only IGNORECASE, so the body is neither decoded nor lowercased
+_MARKERS = re.compile(
+    b'|'.join(b'(?P<%s>%s)' % (reason.encode('ascii'), b'|'.join(map(_marker_pattern, markers)))
+              for reason, markers in BLOCK_MARKERS.items()),
+    re.IGNORECASE,
+)
+
+
+def _status(response):
+    status = getattr(response, 'status', None)
+    return status if isinstance(status, int) else getattr(response, 'status_code', None)
+
+
+def _body(response):
+    """Raw bytes of a Scrapy (body) or requests (content) response"""
+    body = getattr(response, 'body', None)
+    if not isinstance(body, bytes):
+        body = getattr(response, 'content', None)
+    return body if isinstance(body, bytes) else b''
+
+
+def _content_type(response):
+    headers = getattr(response, 'headers', None)
+    value = headers.get('Content-Type') if headers is not None else None
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    return value.lower() if isinstance(value, str) else ''
+
+
+def block_reason(response, min_html_bytes=MIN_HTML_BYTES):
+    """
+    Why a response looks like a block, or None when it looks like content.
+    Works on Scrapy and requests responses.
+
+    Checks the status first, then the content type, then the size, and
+    finally searches the first SCAN_BYTES bytes for the markers once; the
+    earliest marker in the page gives the reason.
+    """
+    status = _status(response)
+    if status in BLOCK_STATUSES:
+        return BLOCK_STATUSES[status]
+    if status != 200:
+        return None
+
+    content_type = _content_type(response)
+    if content_type.startswith(BINARY_TYPES):
+        return None
+
+    body = _body(response)
+    is_html = not content_type or 'html' in content_type
+    if is_html and len(body) < min_html_bytes:
+        return 'empty_page'
+
+    match = _MARKERS.search(body, 0, SCAN_BYTES)
+    return match.lastgroup if match else None
+
+
+def is_blocked(response, min_html_bytes=MIN_HTML_BYTES):
+    return block_reason(response, min_html_bytes) is not None
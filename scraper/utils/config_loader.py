@@ -1,6 +1,7 @@
 import yaml
 import os
 from pathlib import Path
+from urllib.parse import urlparse
 
 def load_config(path, source=None):
     with open(path, "r", encoding="utf-8") as f:
@@ -30,6 +31,15 @@ def load_config(path, source=None):
 
     return filtered_configs
 
+def config_hosts(path):
+    """Hostnames of every start URL in a site config file"""
+    return {
+        urlparse(url).hostname
+        for cfg in load_config(path)
+        for url in cfg.get("start_urls", [])
+        if urlparse(url).hostname
+    }
+
 def load_mapping_config(path):
     """
     Load a YAML mapping file (e.g. type_mapping.yaml or key_mapping.yaml)
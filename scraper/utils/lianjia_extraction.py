@@ -0,0 +1,182 @@
+"""
+Shared Lianjia listing-page extraction on Scrapy's lxml-backed selectors.
+
+Both Lianjia list spiders read the same `ul.sellListContent` markup
+(layout from waugustus/lianjia-spider). Extraction runs on the selector
+Scrapy already built for the response instead of re-parsing the body
+with BeautifulSoup, and all regexes are compiled once at import.
+"""
+
+import json
+import re
+
+from lxml import etree
+from parsel import Selector
+
+HOUSE_ID_RE = re.compile(r'/(\d+)\.html')
+NUMBER_RE = re.compile(r'(\d+\.?\d*)')
+INTEGER_RE = re.compile(r'(\d+)')
+PRICE_CLEAN_RE = re.compile(r'[^\d万.]')
+
+
+def _has_class(name):
+    """XPath predicate matching a class token, like BeautifulSoup's class_ lookup"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Page-level lookups run once per response, so compiled XPath is fine there
+LISTING_CONTAINER = etree.XPath(f"(//ul[{_has_class('sellListContent')}])[1]")
+PAGE_DATA = etree.XPath(
+    f"((//div[{_has_class('page-box')}])[1]/div)[1]/@page-data", smart_strings=False
+)
+# "共找到 <span> 12345 </span>套北京二手房" above the listing
+TOTAL_COUNT = etree.XPath(f"(//h2[{_has_class('total')}]/span)[1]/text()", smart_strings=False)
+# District links of the position filter, e.g. 东城 西城 朝阳
+DISTRICT_LINKS = etree.XPath("//div[@data-role='ershoufang']/div[1]/a/text()", smart_strings=False)
+
+
+def root_for(response_or_html):
+    """lxml root for a Scrapy response, a parsel Selector or raw HTML"""
+    if isinstance(response_or_html, (bytes, str)):
+        if isinstance(response_or_html, bytes):
+            response_or_html = response_or_html.decode('utf-8', errors='ignore')
+        return Selector(text=response_or_html).root
+    if isinstance(response_or_html, Selector):
+        return response_or_html.root
+    # Scrapy responses cache their selector, so the body is parsed only once
+    return response_or_html.selector.root
+
+
+def stripped_text(element):
+    """Equivalent of BeautifulSoup get_text(strip=True): stripped text nodes joined"""
+    if element is None:
+        return ''
+    return ''.join(text.strip() for text in element.itertext())
+
+
+def _first(xpath, element):
+    found = xpath(element)
+    return found[0] if found else None
+
+
+def find_descendant(element, tag, class_name=None):
+    """
+    First descendant `tag` carrying `class_name`, like BeautifulSoup's
+    find(tag, {'class': ...}). Per-listing lookups walk the tree directly;
+    descendant XPaths with class predicates cost ~3x more per listing.
+    """
+    if element is None:
+        return None
+    for candidate in element.iterdescendants(tag):
+        if class_name is None:
+            return candidate
+        classes = candidate.get('class')
+        if classes and class_name in classes.split():
+            return candidate
+    return None
+
+
+def extract_house_id(href):
+    """'/ershoufang/123456789.html' -> 123456789 (0 when absent)"""
+    if not href:
+        return 0
+    match = HOUSE_ID_RE.search(href)
+    return int(match.group(1)) if match else 0
+
+
+def parse_total_price(price_text):
+    """'300万' -> 3000000; plain numbers are returned as-is"""
+    if not price_text:
+        return 0
+    price_clean = PRICE_CLEAN_RE.sub('', price_text)
+    try:
+        if '万' in price_clean:
+            return int(float(price_clean.replace('万', '')) * 10000)
+        return int(float(price_clean))
+    except ValueError:
+        return 0
+
+
+def parse_unit_price(price_text):
+    """'单价33000元/平米' -> 33000"""
+    if not price_text:
+        return 0
+    match = INTEGER_RE.search(price_text.replace(',', ''))
+    return int(match.group(1)) if match else 0
+
+
+def extract_numeric_size(size_text):
+    """'89.5平米' -> 89.5"""
+    if not size_text:
+        return 0
+    match = NUMBER_RE.search(size_text)
+    return float(match.group(1)) if match else 0
+
+
+def extract_total_pages(response_or_html):
+    """totalPage from the page-box `page-data` JSON, or None"""
+    page_data = _first(PAGE_DATA, root_for(response_or_html))
+    if not page_data:
+        return None
+    try:
+        return json.loads(page_data).get('totalPage', 1)
+    except ValueError:
+        return None
+
+
+def extract_total_count(response_or_html):
+    """Number of listings matching the query, or None when not shown"""
+    count_text = _first(TOTAL_COUNT, root_for(response_or_html))
+    if not count_text:
+        return None
+    match = INTEGER_RE.search(count_text.replace(',', ''))
+    return int(match.group(1)) if match else None
+
+
+def extract_district_names(response_or_html):
+    """District names offered by the page's position filter"""
+    return [name.strip() for name in DISTRICT_LINKS(root_for(response_or_html)) if name.strip()]
+
+
+def has_listing_container(response_or_html):
+    return _first(LISTING_CONTAINER, root_for(response_or_html)) is not None
+
+
+def extract_listing(house):
+    """
+    Raw fields of one `li` listing element, or None when it has no
+    info/title block. address_parts is the '|'-separated address line;
+    spiders map its positions to their own schema.
+    """
+    info = find_descendant(house, 'div', 'info')
+    if info is None:
+        return None
+    title_link = find_descendant(find_descendant(info, 'div', 'title'), 'a')
+    if title_link is None:
+        return None
+
+    href = title_link.get('href', '')
+    flood = find_descendant(info, 'div', 'flood')
+    location_link = find_descendant(find_descendant(flood, 'div'), 'a')
+    address = find_descendant(info, 'div', 'address')
+    price_info = find_descendant(info, 'div', 'priceInfo')
+    total_price = find_descendant(find_descendant(price_info, 'div', 'totalPrice'), 'span')
+    unit_price = find_descendant(find_descendant(price_info, 'div', 'unitPrice'), 'span')
+
+    return {
+        'house_id': extract_house_id(href),
+        'href': href,
+        'title': stripped_text(title_link),
+        'location': stripped_text(location_link),
+        'address_parts': [part.strip() for part in stripped_text(address).split('|')] if address is not None else [],
+        'total_price': parse_total_price(stripped_text(total_price)) if total_price is not None else 0,
+        'unit_price': parse_unit_price(stripped_text(unit_price)) if unit_price is not None else 0,
+    }
+
+
+def extract_listings(response_or_html):
+    """All listings on a list page, in page order (entries may be None)"""
+    container = _first(LISTING_CONTAINER, root_for(response_or_html))
+    if container is None:
+        return []
+    return [extract_listing(house) for house in container.iterchildren('li')]
@@ -0,0 +1,65 @@
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+
+def listing_hash(listing):
+    """Stable hash of the list-page fields of a listing"""
+    payload = json.dumps(listing, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ListingIndex:
+    """
+    Persistent index of listings whose detail page has been fetched, keyed
+    by house id, with the list-page hash and price seen at that time and the
+    fields parsed from the detail page. A known listing whose list-page
+    fields (price included) are unchanged is emitted from the cached detail
+    fields instead of fetching the detail page again.
+    """
+
+    def __init__(self, path="listing_index.json"):
+        self.path = Path(path)
+        self.listings = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.listings = data.get('listings', {})
+        except (OSError, ValueError):
+            self.listings = {}
+
+    def needs_detail(self, house_id, content_hash):
+        """True for unknown or changed listings, and ones indexed without their detail fields"""
+        if not house_id:
+            return True
+        entry = self.listings.get(str(house_id))
+        return entry is None or entry.get('hash') != content_hash or 'detail' not in entry
+
+    def detail(self, house_id):
+        """Detail-page fields cached for a listing"""
+        return dict(self.listings[str(house_id)]['detail'])
+
+    def touch(self, house_id):
+        """Record that a known listing is still on the list pages"""
+        entry = self.listings.get(str(house_id))
+        if entry is not None:
+            entry['last_seen'] = datetime.now().isoformat()
+
+    def record(self, house_id, price, content_hash, detail):
+        """Store a listing and its detail-page fields after the detail page was parsed"""
+        if not house_id:
+            return
+        now = datetime.now().isoformat()
+        entry = self.listings.setdefault(str(house_id), {'first_seen': now})
+        entry.update({'price': price, 'hash': content_hash, 'detail': detail,
+                      'last_seen': now, 'detail_fetched': now})
+
+    def save(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'listings': self.listings}, f, ensure_ascii=False, indent=2)
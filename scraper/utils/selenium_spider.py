@@ -0,0 +1,15 @@
+class SeleniumRequestMixin:
+    """
+    For spiders that yield scrapy-selenium SeleniumRequests. Its driver
+    middleware launches Chrome when constructed, so it is not enabled
+    project-wide; spiders that need it mix this in ahead of scrapy.Spider.
+    update_settings is used rather than custom_settings, which would
+    replace the project's DOWNLOADER_MIDDLEWARES instead of adding to it.
+    """
+
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+        middlewares = settings.getdict('DOWNLOADER_MIDDLEWARES')
+        middlewares['scrapy_selenium.SeleniumMiddleware'] = 800
+        settings.set('DOWNLOADER_MIDDLEWARES', middlewares, priority='spider')
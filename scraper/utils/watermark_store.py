@@ -0,0 +1,95 @@
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+
+_DMY_RE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+_YMD_RE = re.compile(r'(\d{4})[-/](\d{1,2})[-/](\d{1,2})')
+
+
+def parse_deal_date(text):
+    """
+    Parse a listing deal date into a date object.
+    Handles '25/08/2025' (HK sites), '2025-08-25 00:00:00' (JSON feeds)
+    and '2025/08/25'. Returns None when the text has no recognisable date.
+    """
+    if not text:
+        return None
+    text = str(text).strip()
+    try:
+        match = _YMD_RE.search(text)
+        if match:
+            y, m, d = match.groups()
+            return datetime(int(y), int(m), int(d)).date()
+        match = _DMY_RE.search(text)
+        if match:
+            d, m, y = match.groups()
+            return datetime(int(y), int(m), int(d)).date()
+    except ValueError:
+        return None
+    return None
+
+
+class WatermarkStore:
+    """
+    Per-source crawl watermark: the newest deal date and the fingerprint of
+    the newest deal seen on the previous run. Listing pages are ordered newest
+    first, so a crawl can stop as soon as it reaches the watermarked row.
+    """
+
+    def __init__(self, path="crawl_watermarks.json"):
+        self.path = Path(path)
+        self.watermarks = {}
+        self.pending = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.watermarks = data.get('sources', {})
+        except (OSError, ValueError):
+            self.watermarks = {}
+
+    def get(self, source):
+        """Return (deal_date, fingerprint) for a source, or (None, None)"""
+        mark = self.watermarks.get(source)
+        if not mark:
+            return None, None
+        return parse_deal_date(mark.get('deal_date')), mark.get('fingerprint')
+
+    def is_reached(self, source, deal_date_text, fingerprint):
+        """True once a row is at or below the stored watermark for its source"""
+        mark_date, mark_fingerprint = self.get(source)
+        if mark_date is None and mark_fingerprint is None:
+            return False
+        if mark_fingerprint and fingerprint == mark_fingerprint:
+            return True
+        deal_date = parse_deal_date(deal_date_text)
+        return bool(mark_date and deal_date and deal_date < mark_date)
+
+    def observe(self, source, deal_date_text, fingerprint):
+        """Remember the newest row seen this run; committed on save()"""
+        deal_date = parse_deal_date(deal_date_text)
+        if deal_date is None:
+            return
+        current = self.pending.get(source)
+        # Rows arrive newest first, so only a strictly newer date replaces the candidate
+        if current is None or deal_date > current[0]:
+            self.pending[source] = (deal_date, fingerprint)
+
+    def save(self):
+        for source, (deal_date, fingerprint) in self.pending.items():
+            mark_date, _ = self.get(source)
+            if mark_date and deal_date < mark_date:
+                continue
+            self.watermarks[source] = {
+                'deal_date': deal_date.isoformat(),
+                'fingerprint': fingerprint,
+                'updated_at': datetime.now().isoformat(),
+            }
+        self.pending = {}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'sources': self.watermarks}, f, ensure_ascii=False, indent=2)